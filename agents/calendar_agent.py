@@ -1,24 +1,12 @@
-from crewai import Agent, LLM
-import os
+from crewai import Agent
+from utils.llm_router import agent_llm
 
-# OpenRouter configuration using CrewAI LLM
-model_name = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
-api_key = os.getenv("OPENAI_API_KEY")  # OpenRouter key stored as OPENAI_API_KEY
-base_url = "https://openrouter.ai/api/v1"  # OpenRouter endpoint
-
-if api_key:
-    llm = LLM(
-        model=f"openrouter/{model_name}",  # MODEL IDENTIFIER with openrouter/ prefix
-        api_key=api_key,                   # STORED IN .env as OPENAI_API_KEY
-        base_url=base_url                  # OPENROUTER ENDPOINT
-    )
-else:
-    llm = None
+llm = agent_llm("calendar")
 
 calendar_agent = Agent(
     role="Calendar Analyzer",
     goal="""
-        List all events scheduled for today. Recognize if there are any overlaps, or free time gaps. 
+        List all events scheduled for today and point out the overlaps and free time gaps listed in the input. 
     """,
     backstory="""
         You are a calendar assistant. You receive a list of calendar events for today.
@@ -28,6 +16,7 @@ calendar_agent = Agent(
         - Preserve the title and time as written
         - Optionally rephrase for readability, but NEVER remove or invent content
         - Do not make events, descriptions or times up
+        - Overlaps and free time have already been calculated for you: report them as given, do not recompute them
         - You speak and understand both english and spanish
     """,
     allow_delegation=False,
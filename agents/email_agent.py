@@ -1,19 +1,7 @@
-from crewai import Agent, LLM
-import os
+from crewai import Agent
+from utils.llm_router import agent_llm
 
-# OpenRouter configuration using CrewAI LLM
-model_name = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
-api_key = os.getenv("OPENAI_API_KEY")  # OpenRouter key stored as OPENAI_API_KEY
-base_url = "https://openrouter.ai/api/v1"  # OpenRouter endpoint
-
-if api_key:
-    llm = LLM(
-        model=f"openrouter/{model_name}",  # MODEL IDENTIFIER with openrouter/ prefix
-        api_key=api_key,                   # STORED IN .env as OPENAI_API_KEY
-        base_url=base_url                  # OPENROUTER ENDPOINT
-    )
-else:
-    llm = None
+llm = agent_llm("email")
 
 email_agent = Agent(
     role="Email Summarizer",
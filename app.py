@@ -1,21 +1,41 @@
 from flask import Flask, jsonify, redirect, session, request, render_template, Response
 from dotenv import load_dotenv
-from crew import crew
-from utils.google_auth import get_google_flow, store_credentials_in_session, fetch_calendar_summary, fetch_gmail_summary, fetch_token_safely
+from pipeline import run_briefing, PIPELINE_MODES, PIPELINE_MODE
+from utils.google_auth import get_google_flow, store_credentials_in_session, fetch_token_safely
+from utils.jobs import BriefingJobQueue, QueueFullError, FINISHED_STATUSES, JOB_EVENTS_RETRY_MS
+from utils.google_services import preload_discovery_documents
+from utils.log_stream import log_broadcaster, log_context, format_events, LOG_STREAM_HOLD
+from utils.scheduler import ScheduleStore, BriefingScheduler, session_user_key, SCHEDULER_ENABLED
+from utils.credential_store import credential_store, TokenRefresher
+from utils.fast_path import fast_path_stats, LANGUAGES
+from utils.briefing_history import briefing_history
+from utils.upstream_monitor import upstream_monitor, UpstreamUnavailableError, UPSTREAM_MONITOR_ENABLED
+from utils.push_notifications import PushStore, PushManager, PUSH_NOTIFICATIONS_ENABLED, PUSH_WEBHOOK_TOKEN
+from utils import metrics
+from google.oauth2.credentials import Credentials
 import os
+import json
 import time
+import uuid
+import hmac
 import logging
+import threading
 import sys
-import requests
 from datetime import datetime
+from logging.handlers import RotatingFileHandler
 
-# Configure logging
+# Configure logging: stdout, a size-capped rotating file and the shared table behind /logs
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler('/tmp/app.log')
+        RotatingFileHandler(
+            os.getenv("LOG_FILE", "/tmp/app.log"),
+            maxBytes=int(os.getenv("LOG_FILE_MAX_BYTES", str(5 * 1024 * 1024))),
+            backupCount=int(os.getenv("LOG_FILE_BACKUPS", "3"))
+        ),
+        log_broadcaster
     ]
 )
 logger = logging.getLogger(__name__)
@@ -29,8 +49,76 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 
-# Simple in-memory store to prevent duplicate callback processing
-processed_codes = {}
+# Parse the Gmail/Calendar discovery documents once per process
+preload_discovery_documents()
+
+# OAuth credentials live server-side; the refresher renews access tokens before they expire
+token_refresher = TokenRefresher(credential_store())
+
+def run_scheduled_briefing(session_data):
+    """Scheduled and pushed briefings, in the language and engine of the user's last on-demand one"""
+    user_key = session_data["user_key"]
+    if credential_store().get(user_key) is None:
+        raise RuntimeError("No stored Google credentials, the user has to sign in again")
+    return run_briefing({**credential_store().preferences(user_key), **session_data})
+
+# Scheduled pre-generation and the latest briefing per user, shared by all workers
+briefing_store = ScheduleStore()
+briefing_scheduler = BriefingScheduler(run_scheduled_briefing, briefing_store)
+
+# Gmail/Calendar change notifications: mark stored briefings stale and optionally regenerate them
+push_store = PushStore()
+push_manager = PushManager(run_scheduled_briefing, push_store, briefing_store, credential_store())
+
+def start_background_services():
+    """Start this process's background threads.
+
+    Called at import, or with GUNICORN_PRELOAD from gunicorn's post_worker_init
+    in each worker, since threads started in the master do not survive the fork.
+    """
+    token_refresher.start()
+    # Each worker shares its stage and LLM metrics with the others for /metrics
+    metrics.start_flushing()
+    # Probes OpenRouter in the background for /api-status and the briefing circuit breaker
+    if UPSTREAM_MONITOR_ENABLED:
+        upstream_monitor.start()
+    if SCHEDULER_ENABLED:
+        briefing_scheduler.start()
+    if PUSH_NOTIFICATIONS_ENABLED:
+        push_manager.start()
+
+if os.getenv("GUNICORN_PRELOAD", "false").lower() != "true":
+    start_background_services()
+
+def run_and_store_briefing(session_data, *callbacks):
+    """Generate a briefing on demand and keep it so the next visit can reuse it"""
+    result = run_briefing(session_data, *callbacks)
+    user_key = session_user_key(session_data)
+    if user_key:
+        credential_store().save_preferences(user_key, session_data.get("language"), session_data.get("pipeline_mode"))
+        # Timings describe this run only, not later visits served from the store
+        briefing_store.save_briefing(user_key, {k: v for k, v in result.items() if k != "timings"}, "on_demand",
+                                     result["ingestion"].get("started_at"))
+    return result
+
+# Background briefing generation, shared by all workers through a SQLite job table
+briefing_jobs = BriefingJobQueue(run_and_store_briefing)
+
+def prepare_session(session, accept_languages):
+    """Session upkeep before a route runs; asgi.py calls it for its native routes too"""
+    if "credentials" in session:
+        # Sessions from before the server-side store carried the credentials in the cookie
+        store_credentials_in_session(session, Credentials(**session.pop("credentials")))
+    if "user_key" in session:
+        # Visitors' access tokens are refreshed ahead of expiry (see TOKEN_REFRESH_IDLE_SECONDS)
+        credential_store().touch(session["user_key"])
+    if "language" not in session:
+        # Browser language for templated briefings (see utils/fast_path.py)
+        session["language"] = accept_languages.best_match(LANGUAGES) or "en"
+
+@app.before_request
+def prepare_request_session():
+    prepare_session(session, request.accept_languages)
 
 @app.route('/')
 def index():
@@ -91,20 +179,14 @@ def callback():
     auth_code = request.args.get('code')
     if auth_code:
         logger.info(f"Processing authorization code: {auth_code[:10]}...")
-        current_time = time.time()
-        # Clean old entries (older than 10 minutes)
-        processed_codes.clear()  # Simple cleanup for this demo
-        
-        if auth_code in processed_codes:
+        # Shared by all workers, and codes expire after OAUTH_CODE_TTL
+        if not credential_store().claim_code(auth_code):
             logger.warning("Duplicate authorization code detected")
             return '''
             <h2>Duplicate Request</h2>
             <p>This authorization code has already been processed. Please start over.</p>
             <p><a href="/login">Click here to login again</a></p>
             ''', 400
-        
-        # Mark this code as being processed
-        processed_codes[auth_code] = current_time
     
     flow = get_google_flow()
     
@@ -120,9 +202,9 @@ def callback():
         # Clear session on error to prevent stale state
         session.clear()
         
-        # Remove from processed codes on error
-        if auth_code and auth_code in processed_codes:
-            del processed_codes[auth_code]
+        # Let the user retry with the same code if the exchange itself failed
+        if auth_code:
+            credential_store().release_code(auth_code)
         
         # Provide user-friendly error messages
         if "expired or invalid" in error_msg.lower() or "invalid_grant" in error_msg.lower() or "already used" in error_msg.lower():
@@ -176,6 +258,10 @@ def callback():
 
     # Use the credentials directly instead of getting them from flow
     store_credentials_in_session(session, creds)
+    if PUSH_NOTIFICATIONS_ENABLED:
+        # Off the request path: the watch calls are a few Google round-trips
+        threading.Thread(target=push_manager.subscribe, args=(session["user_key"], creds),
+                         name="push-subscribe", daemon=True).start()
     
     # Clear OAuth flow state since we're done
     session.pop("state", None)
@@ -185,49 +271,275 @@ def callback():
     logger.info("OAuth flow completed successfully, redirecting to briefing UI")
     return redirect("/briefing-ui")
 
+def stored_briefing(session_data, refresh=False):
+    """The user's recent stored briefing, unless ?refresh=1 asks for a new one,
+    the request wants timings or another engine than the one that wrote it, or
+    a push notification says their mail or calendar changed since"""
+    if refresh or session_data.get("timings"):
+        return None
+    user_key = session_user_key(session_data)
+    stored = briefing_store.latest_briefing(user_key) if user_key else None
+    mode = session_data.get("pipeline_mode") or PIPELINE_MODE
+    # A templated briefing (nothing to analyze) is what either engine would return
+    if stored is not None and stored.get("pipeline", {}).get("mode") not in (mode, "template"):
+        return None
+    if stored is not None and PUSH_NOTIFICATIONS_ENABLED:
+        changed = push_store.changed_since(user_key, stored["generated_at"])
+        if changed:
+            logger.info(f"Stored briefing is stale, {' and '.join(changed)} changed since")
+            return None
+    return stored
+
+def briefing_payload():
+    """Session copy for the pipeline plus the engine picked with ?mode= (None if that is unknown)
+    and the per-stage breakdown asked for with ?timings=1"""
+    mode = request.args.get("mode")
+    if mode is not None and mode not in PIPELINE_MODES:
+        return None
+    return {**session, "pipeline_mode": mode, "timings": request.args.get("timings") == "1"}
+
+def upstream_unavailable_response(e):
+    logger.warning(f"Refusing briefing: {e}")
+    return jsonify({"error": f"{e}. Please try again shortly."}), 503, {"Retry-After": str(e.retry_after)}
+
+def unknown_mode_response():
+    return jsonify({"error": f"Unknown mode, expected one of: {', '.join(PIPELINE_MODES)}"}), 400
+
 @app.route('/briefing')
 def briefing():
+    payload = briefing_payload()
+    if payload is None:
+        return unknown_mode_response()
+    stored = stored_briefing(payload, request.args.get("refresh") == "1")
+    if stored is not None:
+        logger.info(f"Serving stored briefing ({stored['age_seconds']}s old)")
+        return jsonify(stored)
+
     logger.info("Starting briefing generation...")
     
     try:
-        logger.info("Fetching email summary...")
-        email_summary = fetch_gmail_summary(session)
-        logger.info(f"Email summary retrieved: {len(email_summary)} characters")
-
-        logger.info("Fetching calendar summary...")
-        calendar_summary = fetch_calendar_summary(session)
-        logger.info(f"Calendar summary retrieved: {len(calendar_summary)} characters")
-
-        logger.info("🟡 EMAIL SUMMARY INPUT TO AGENT:")
-        logger.info(email_summary[:500] + "..." if len(email_summary) > 500 else email_summary)
-
-        logger.info("🔵 CALENDAR SUMMARY INPUT TO AGENT:")
-        logger.info(calendar_summary)
-        
-        logger.info("Starting CrewAI processing...")
-        start_time = time.time()
-        
-        result = crew.kickoff(inputs={
-            "emails_data": email_summary,
-            "calendar_data": calendar_summary
-        })
-        
-        processing_time = time.time() - start_time
-        logger.info(f"CrewAI processing completed in {processing_time:.2f} seconds")
-        logger.info(f"Crew Result type: {type(result)}")
-        logger.info(f"Crew Result: {str(result)[:500]}...")
-
-        return jsonify({
-            "briefing": str(result),
-            "processing_time": f"{processing_time:.2f}s"
-        })
+        # Tagged with a throwaway id so this user's data stays out of the shared /logs stream
+        with log_context(f"request-{uuid.uuid4().hex}"):
+            return jsonify(run_and_store_briefing(payload))
         
+    except UpstreamUnavailableError as e:
+        return upstream_unavailable_response(e)
     except Exception as e:
         logger.error(f"Error during briefing generation: {str(e)}", exc_info=True)
         return jsonify({
             "error": f"Failed to generate briefing: {str(e)}"
         }), 500
 
+def get_session_owner():
+    """Random per-browser id so users can only see their own briefing jobs"""
+    if "briefing_owner" not in session:
+        session["briefing_owner"] = uuid.uuid4().hex
+    return session["briefing_owner"]
+
+def job_response(job):
+    body = {
+        "id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+    if "queue_position" in job:
+        body["queue_position"] = job["queue_position"]
+    if job["status"] == "running" and job.get("partial"):
+        body["partial"] = job["partial"]
+    if job["status"] == "succeeded":
+        body["result"] = job["result"]
+    elif job["status"] == "failed":
+        body["error"] = f"Failed to generate briefing: {job['error']}"
+    return body
+
+@app.route('/briefing/jobs', methods=['POST'])
+def create_briefing_job():
+    payload = briefing_payload()
+    if payload is None:
+        return unknown_mode_response()
+    stored = stored_briefing(payload, request.args.get("refresh") == "1")
+    if stored is not None:
+        return jsonify({"status": "succeeded", "result": stored}), 200
+
+    try:
+        job_id = briefing_jobs.submit(get_session_owner(), payload)
+    except QueueFullError as e:
+        logger.warning(str(e))
+        return jsonify({"error": "Too many briefings in progress, please try again shortly."}), 429, {"Retry-After": "10"}
+
+    return jsonify({
+        "id": job_id,
+        "status": "queued",
+        "status_url": f"/briefing/jobs/{job_id}",
+        "events_url": f"/briefing/jobs/{job_id}/events"
+    }), 202
+
+@app.route('/briefing/jobs/stats')
+def briefing_job_stats():
+    from crew import crew_pool
+    return jsonify({**briefing_jobs.stats(), "crew_pool": crew_pool.stats(), "fast_path": fast_path_stats()})
+
+@app.route('/briefing/jobs/<job_id>')
+def get_briefing_job(job_id):
+    job = briefing_jobs.get(job_id)
+    if job is None or job["owner"] != session.get("briefing_owner"):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_response(job))
+
+@app.route('/briefing/jobs/<job_id>/events')
+def briefing_job_events(job_id):
+    """Job progress, then the briefing text written since Last-Event-ID, as Server-Sent Events.
+
+    The response carries what is new and closes; EventSource reconnects after
+    the retry interval and sends back the last id, "<restarts>:<length of the
+    text it already has>". If the text was restarted since (a model failed
+    mid-answer), a `restart` event tells the page to clear it and the text is
+    sent from the start. Only the final reconnect gets the `done` event.
+    """
+    job = briefing_jobs.get(job_id)
+    if job is None or job["owner"] != session.get("briefing_owner"):
+        return jsonify({"error": "Job not found"}), 404
+
+    seen_restarts, _, offset = request.headers.get("Last-Event-ID", "").rpartition(":")
+    streamed = int(offset) if offset.isdigit() else 0
+    events = [f"retry: {JOB_EVENTS_RETRY_MS}\n\n"]
+    if job["status"] in FINISHED_STATUSES:
+        events.append(f"event: done\ndata: {json.dumps(job_response(job))}\n\n")
+    else:
+        # The text goes in token events, not again with every progress update
+        status = {k: v for k, v in job_response(job).items() if k != "partial"}
+        events.append(f"event: progress\ndata: {json.dumps(status)}\n\n")
+        partial = job.get("partial") or ""
+        restarts = job.get("restarts") or 0
+        if (int(seen_restarts) if seen_restarts.isdigit() else 0) != restarts:
+            events.append(f"id: {restarts}:0\nevent: restart\ndata: {{}}\n\n")
+            streamed = 0
+        if len(partial) > streamed:
+            events.append(f"id: {restarts}:{len(partial)}\nevent: token\n"
+                          f"data: {json.dumps({'text': partial[streamed:]})}\n\n")
+    return Response("".join(events), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Stage, crew task and LLM metrics of all workers in the Prometheus text format"""
+    return Response(metrics.exposition(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/briefing/schedule', methods=['GET', 'PUT', 'DELETE'])
+def briefing_schedule():
+    """Read, save or remove the signed-in user's pre-generation schedule"""
+    user_key = session_user_key(session)
+    if user_key is None:
+        return jsonify({"error": "Not signed in"}), 401
+    if request.method == 'PUT':
+        creds = credential_store().get(user_key)
+        if creds is None or not creds.refresh_token:
+            return jsonify({"error": "No refresh token for offline access, please sign in again"}), 400
+        body = request.get_json(silent=True) or {}
+        try:
+            schedule = briefing_store.save_schedule(
+                user_key, body.get("cron", ""), body.get("timezone", "UTC")
+            )
+        except (ValueError, KeyError) as e:  # bad cron field or unknown time zone
+            return jsonify({"error": f"Invalid schedule: {e}"}), 400
+        logger.info(f"Briefing schedule saved for {user_key}")
+        return jsonify(schedule)
+    if request.method == 'DELETE':
+        if not briefing_store.delete_schedule(user_key):
+            return jsonify({"error": "No schedule"}), 404
+        return "", 204
+
+    schedule = briefing_store.get_schedule(user_key)
+    if schedule is None:
+        return jsonify({"error": "No schedule"}), 404
+    return jsonify(schedule)
+
+@app.route('/webhooks/subscription', methods=['GET', 'PUT', 'DELETE'])
+def push_subscription():
+    """Read, (re)create or stop the signed-in user's Gmail and Calendar push subscriptions"""
+    if not PUSH_NOTIFICATIONS_ENABLED:
+        return jsonify({"error": "Push notifications are disabled"}), 404
+    user_key = session_user_key(session)
+    if user_key is None:
+        return jsonify({"error": "Not signed in"}), 401
+    creds = credential_store().get(user_key)
+    if request.method != 'GET' and creds is None:
+        return jsonify({"error": "No stored Google credentials, please sign in again"}), 400
+
+    if request.method == 'PUT':
+        try:
+            outcome = push_manager.subscribe(user_key, creds)
+        except RuntimeError as e:  # no webhook URL configured
+            return jsonify({"error": str(e)}), 503
+        if outcome and all("error" in result for result in outcome.values()):
+            return jsonify({"error": "Could not subscribe to any source", "sources": outcome}), 502
+        return jsonify({"sources": outcome})
+    if request.method == 'DELETE':
+        if not push_manager.unsubscribe(user_key, creds):
+            return jsonify({"error": "No subscription"}), 404
+        return "", 204
+
+    subscriptions = [{"source": row["source"], "expires_at": row["expires_at"]}
+                     for row in push_store.subscriptions(user_key)]
+    if not subscriptions:
+        return jsonify({"error": "No subscription"}), 404
+    return jsonify({"subscriptions": subscriptions})
+
+@app.route('/webhooks/gmail', methods=['POST'])
+def gmail_webhook():
+    """Cloud Pub/Sub push delivery of a Gmail watch notification (authenticated by ?token=)"""
+    if not PUSH_NOTIFICATIONS_ENABLED:
+        return jsonify({"error": "Push notifications are disabled"}), 404
+    if not PUSH_WEBHOOK_TOKEN or not hmac.compare_digest(request.args.get("token", ""), PUSH_WEBHOOK_TOKEN):
+        metrics.count("push_notifications_total", source="gmail", result="rejected")
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        push_manager.handle_gmail(request.get_json(silent=True) or {})
+    except ValueError as e:
+        logger.warning(str(e))
+        return jsonify({"error": str(e)}), 400
+    # Any 2xx acknowledges the message; Pub/Sub redelivers otherwise
+    return "", 204
+
+@app.route('/webhooks/calendar', methods=['POST'])
+def calendar_webhook():
+    """Calendar API channel notification (everything is in the X-Goog-* headers)"""
+    if not PUSH_NOTIFICATIONS_ENABLED:
+        return jsonify({"error": "Push notifications are disabled"}), 404
+    result = push_manager.handle_calendar(request.headers.get("X-Goog-Channel-ID", ""),
+                                          request.headers.get("X-Goog-Channel-Token", ""),
+                                          request.headers.get("X-Goog-Resource-State", ""))
+    if result == "rejected":
+        return jsonify({"error": "Forbidden"}), 403
+    return "", 200
+
+@app.route('/webhooks/stats')
+def push_stats():
+    """Push subscriptions, notifications received and pending pre-warms (all workers)"""
+    return jsonify({"enabled": PUSH_NOTIFICATIONS_ENABLED, **push_store.stats()})
+
+@app.route('/briefing/history')
+def briefing_history_view():
+    """The signed-in user's recent briefings, or with ?since= what changed since then"""
+    user_key = session_user_key(session)
+    if user_key is None:
+        return jsonify({"error": "Not signed in"}), 401
+    since = request.args.get("since")
+    if since is None:
+        limit = min(request.args.get("limit", 20, type=int), 100)
+        return jsonify({"entries": briefing_history().entries(user_key, limit)})
+    try:
+        # Epoch seconds or an ISO 8601 time ("2026-10-18T08:00:00+02:00"; server time without an offset)
+        since = float(since) if since.replace(".", "", 1).isdigit() else datetime.fromisoformat(since).timestamp()
+    except ValueError:
+        return jsonify({"error": "since must be epoch seconds or an ISO 8601 time"}), 400
+    changes = briefing_history().changes_since(user_key, since)
+    if changes is None:
+        return jsonify({"error": "No briefing from before that time"}), 404
+    return jsonify(changes)
+
 @app.route('/briefing-ui')
 def briefing_ui():
     logger.info("Briefing UI accessed")
@@ -235,95 +547,44 @@ def briefing_ui():
 
 @app.route('/logs')
 def logs():
-    """Stream real-time logs to the web interface"""
-    def generate_logs():
-        try:
-            with open('/tmp/app.log', 'r') as f:
-                # Get existing logs
-                f.seek(0, 2)  # Go to end of file
-                while True:
-                    line = f.readline()
-                    if line:
-                        yield f"data: {line}\n\n"
-                    else:
-                        time.sleep(0.1)
-        except FileNotFoundError:
-            yield "data: Log file not found\n\n"
-    
-    return Response(generate_logs(), mimetype='text/plain')
+    """New log lines as Server-Sent Events.
+
+    The response returns as soon as it has the lines after Last-Event-ID (or
+    after waiting up to LOG_STREAM_HOLD seconds for some), and the browser's
+    EventSource reconnects for more. With ?job=<id> only that briefing job's
+    lines are sent; otherwise only lines that belong to no job.
+    """
+    job_id = request.args.get("job")
+    if job_id:
+        job = briefing_jobs.get(job_id)
+        if job is None or job["owner"] != session.get("briefing_owner"):
+            return jsonify({"error": "Job not found"}), 404
+
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    after = int(last_event_id) if last_event_id.isdigit() else None
+    lines, latest = log_broadcaster.since(after, job_id)
+    if not lines and LOG_STREAM_HOLD and log_broadcaster.wait(latest, LOG_STREAM_HOLD):
+        lines, latest = log_broadcaster.since(latest, job_id)
+
+    return Response(format_events(lines, latest), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
 
 @app.route('/api-status')
 def api_status():
-    """Check OpenRouter API status"""
-    logger.info("Checking API status...")
-    
-    try:
-        # OpenRouter configuration using same pattern as CrewAI LLM
-        model_name = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
-        api_key = os.getenv("OPENAI_API_KEY")  # OpenRouter key stored as OPENAI_API_KEY
-        base_url = "https://openrouter.ai/api/v1"  # OpenRouter endpoint
-        
-        if not api_key:
-            raise Exception("OPENAI_API_KEY is required (contains OpenRouter key)")
-        
-        logger.info(f"Testing OpenRouter API with model: {model_name}")
-        start_time = time.time()
-        
-        # Simple test request to OpenRouter
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8080",
-            "X-Title": "AI Daily Briefing Assistant"
-        }
-        
-        data = {
-            "model": model_name,
-            "messages": [
-                {"role": "user", "content": "Hello, this is a test. Please respond with 'API working'."}
-            ],
-            "max_tokens": 20
-        }
-        
-        response = requests.post(
-            f"{base_url}/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        
-        response_time = time.time() - start_time
-        
-        if response.status_code == 200:
-            result = response.json()
-            test_response = result.get("choices", [{}])[0].get("message", {}).get("content", "No response")
-            
-            logger.info(f"OpenRouter API test successful in {response_time:.2f}s")
-            
-            return jsonify({
-                "status": "healthy",
-                "api": "openrouter",
-                "model": model_name,
-                "response_time": f"{response_time:.2f}s",
-                "test_response": test_response.strip(),
-                "timestamp": datetime.now().isoformat()
-            })
-        else:
-            error_msg = f"HTTP {response.status_code}: {response.text}"
-            logger.error(f"OpenRouter API test failed: {error_msg}")
-            return jsonify({
-                "status": "error",
-                "error": error_msg,
-                "timestamp": datetime.now().isoformat()
-            }), 500
-        
-    except Exception as e:
-        logger.error(f"API status check failed: {str(e)}")
-        return jsonify({
-            "status": "error",
-            "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }), 500
+    """OpenRouter health from the background monitor's last probes (no request to OpenRouter)"""
+    body = upstream_monitor.status()
+    return jsonify(body), 503 if body["status"] == "down" else 200
+
+@app.route('/llm-cache')
+def llm_cache_stats():
+    """LLM response cache hit/miss counters for this worker"""
+    from utils.llm_cache import response_cache
+    return jsonify(response_cache.stats())
+
+@app.route('/llm-routes')
+def llm_routes():
+    """Per-agent model routing outcomes and hedge deadlines for this worker"""
+    from utils.llm_router import routing_stats
+    return jsonify(routing_stats())
 
 @app.route('/health')
 def health():
@@ -0,0 +1,166 @@
+"""
+ASGI entry point, used when SERVER_MODE=asgi (see gunicorn.conf.py).
+
+The routes that spend most of their time waiting get native async handlers,
+so a waiting request costs a coroutine instead of a worker:
+
+    GET /briefing    the crew runs on a thread while the event loop keeps serving
+    GET /logs        the stream stays open and awaits new log records
+
+Every other route is served by the Flask app through uvicorn's WSGI adapter.
+
+Run directly with:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 2
+"""
+import os
+import json
+import uuid
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from flask import session, request
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from app import app as flask_app, briefing_jobs, run_and_store_briefing, stored_briefing, prepare_session
+from pipeline import PIPELINE_MODES
+from utils.log_stream import log_broadcaster, log_context, format_events
+from utils.upstream_monitor import UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "16"))
+LOG_KEEPALIVE_SECONDS = 15
+
+wsgi = WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)
+
+
+def request_headers(scope):
+    return {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+
+
+def load_session(scope):
+    """Read the Flask session from the request's cookie"""
+    cookie = request_headers(scope).get("cookie", "")
+    with flask_app.test_request_context(scope["path"], headers={"Cookie": cookie}):
+        return dict(session)
+
+
+def load_prepared_session(scope):
+    """The Flask session after the same upkeep as Flask routes get (app.prepare_session),
+    plus the Set-Cookie headers that save any change it made. Blocking: run it in a thread."""
+    headers = request_headers(scope)
+    with flask_app.test_request_context(scope["path"], headers={
+        "Cookie": headers.get("cookie", ""), "Accept-Language": headers.get("accept-language", "")
+    }):
+        prepare_session(session, request.accept_languages)
+        response = flask_app.response_class()
+        flask_app.session_interface.save_session(flask_app, session, response)
+        cookies = [(b"set-cookie", value.encode("latin-1")) for value in response.headers.getlist("Set-Cookie")]
+        return dict(session), cookies
+
+
+async def send_json(send, body, status=200, headers=()):
+    payload = json.dumps(body).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode()),
+                    *headers],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def briefing(scope, receive, send):
+    session_data, cookies = await asyncio.to_thread(load_prepared_session, scope)
+    query = parse_qs(scope.get("query_string", b"").decode())
+    refresh = query.get("refresh") == ["1"]
+    mode = query.get("mode", [None])[0]
+    if mode is not None and mode not in PIPELINE_MODES:
+        await send_json(send, {"error": f"Unknown mode, expected one of: {', '.join(PIPELINE_MODES)}"}, 400,
+                        cookies)
+        return
+    payload = {**session_data, "pipeline_mode": mode, "timings": query.get("timings") == ["1"]}
+    stored = stored_briefing(payload, refresh)
+    if stored is not None:
+        logger.info(f"Serving stored briefing ({stored['age_seconds']}s old)")
+        await send_json(send, stored, headers=cookies)
+        return
+
+    logger.info("Starting briefing generation...")
+    try:
+        # Tagged with a throwaway id so this user's data stays out of the shared /logs stream
+        with log_context(f"request-{uuid.uuid4().hex}"):
+            body = await asyncio.to_thread(run_and_store_briefing, payload)
+        await send_json(send, body, headers=cookies)
+    except UpstreamUnavailableError as e:
+        logger.warning(f"Refusing briefing: {e}")
+        await send_json(send, {"error": f"{e}. Please try again shortly."}, 503,
+                        [(b"retry-after", str(e.retry_after).encode()), *cookies])
+    except Exception as e:
+        logger.error(f"Error during briefing generation: {str(e)}", exc_info=True)
+        await send_json(send, {"error": f"Failed to generate briefing: {str(e)}"}, 500, cookies)
+
+
+async def logs(scope, receive, send):
+    """Same contract as the Flask /logs route, but the stream stays open until the client leaves"""
+    job_id = parse_qs(scope["query_string"].decode()).get("job", [None])[0]
+    if job_id:
+        job = await asyncio.to_thread(briefing_jobs.get, job_id)
+        if job is None or job["owner"] != load_session(scope).get("briefing_owner"):
+            await send_json(send, {"error": "Job not found"}, 404)
+            return
+
+    last_event_id = request_headers(scope).get("last-event-id", "")
+    after = int(last_event_id) if last_event_id.isdigit() else None
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+    })
+    try:
+        while not disconnected.is_set():
+            lines, latest = await asyncio.to_thread(log_broadcaster.since, after, job_id)
+            # format_events always ends with an id-only event, which doubles as a keep-alive
+            await send({"type": "http.response.body", "body": format_events(lines, latest).encode(), "more_body": True})
+            after = latest
+            await log_broadcaster.wait_async(latest, LOG_KEEPALIVE_SECONDS)
+    finally:
+        watcher.cancel()
+    await send({"type": "http.response.body", "body": b""})
+
+
+ASYNC_ROUTES = {
+    ("GET", "/briefing"): briefing,
+    ("GET", "/logs"): logs,
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    handler = ASYNC_ROUTES.get((scope.get("method"), scope.get("path")))
+    if handler:
+        await handler(scope, receive, send)
+    else:
+        await wsgi(scope, receive, send)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Generate briefings for a whole roster of users without the web app.
+
+Users are identified by their key in the credential store (they must have
+signed in once). The roster file has one user key per line, or a JSON object
+per line with "user_key" and optional "language" / "pipeline_mode":
+
+    3f2a9c1e0b7d4a55
+    {"user_key": "9b0c7e12aa3d4f60", "language": "es", "pipeline_mode": "fused"}
+
+Briefings go to --out as <user_key>.json and/or, with --store, to the
+briefing store so /briefing serves them as precomputed. Progress is kept in
+--progress (by default progress.db in --out): rerunning the same command
+skips users that are done and retries failed ones. The per-user report
+(stage and error of each failure) is written to report.json in --out, or to
+--report.
+
+Usage:
+    python batch_briefings.py --roster team.txt --out briefings/
+    python batch_briefings.py --all-users --store --processes 4 --concurrency 8 --rate 60
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+from utils.batch import (run_batch, load_roster, BATCH_FETCH_WORKERS, BATCH_CONCURRENCY,
+                         BATCH_RATE_PER_MINUTE, BATCH_BURST, BATCH_PROGRESS_DB_PATH)
+from utils.credential_store import credential_store
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    users = parser.add_mutually_exclusive_group(required=True)
+    users.add_argument("--roster", help="file listing the users to brief")
+    users.add_argument("--all-users", action="store_true", help="brief every user in the credential store")
+    parser.add_argument("--out", help="directory for <user_key>.json results, progress.db and report.json")
+    parser.add_argument("--store", action="store_true", help="save results to the briefing store served by /briefing")
+    parser.add_argument("--progress", help="progress database (default: progress.db in --out)")
+    parser.add_argument("--report", help="per-user report file (default: report.json in --out)")
+    parser.add_argument("--mode", choices=["crew", "fused"], help="pipeline engine for users that do not set one")
+    parser.add_argument("--processes", type=int, default=1, help="processes to spread the roster over")
+    parser.add_argument("--fetch-workers", type=int, default=BATCH_FETCH_WORKERS,
+                        help="users fetched ahead of generation, per process")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="briefings generated at once, across all processes")
+    parser.add_argument("--rate", type=float, default=BATCH_RATE_PER_MINUTE,
+                        help="generations started per minute, 0 for no limit")
+    parser.add_argument("--burst", type=float, default=BATCH_BURST, help="generations allowed at once above --rate")
+    parser.add_argument("--force", action="store_true", help="brief users that are already done again")
+    parser.add_argument("--verbose", action="store_true", help="keep CrewAI's agent output")
+    args = parser.parse_args()
+    if not args.out and not args.store:
+        parser.error("give --out, --store or both")
+    return args
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if not args.verbose:
+        # Read by crew.py when the template crew is built, in this process and in spawned ones
+        os.environ["CREW_VERBOSE"] = "false"
+
+    roster = load_roster(args.roster) if args.roster else [{"user_key": key} for key in credential_store().user_keys()]
+    if args.mode:
+        roster = [{"pipeline_mode": args.mode, **entry} for entry in roster]
+    progress_path = args.progress or (os.path.join(args.out, "progress.db") if args.out else BATCH_PROGRESS_DB_PATH)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+
+    counts, report = run_batch(
+        roster, progress_path=progress_path, out_dir=args.out, store=args.store, processes=args.processes,
+        force=args.force, fetch_workers=args.fetch_workers, concurrency=args.concurrency,
+        rate_per_minute=args.rate, burst=args.burst
+    )
+
+    report_path = args.report or (os.path.join(args.out, "report.json") if args.out else None)
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump({**counts, "results": report}, f, indent=2)
+
+    print(f"\n{counts['done']}/{counts['users']} briefed ({counts['skipped']} already done), "
+          f"{counts['failed']} failed in {counts['seconds']:.1f}s")
+    for row in report:
+        if row["status"] == "failed":
+            print(f"  {row['user_key']}: {row['stage']}: {row['error']}")
+    if report_path:
+        print(f"Report: {report_path}")
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
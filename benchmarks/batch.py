@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Offline throughput of batch_briefings.py for a team of users.
+
+Seeds --users users in a temporary credential store, serves the fake Google
+APIs and the stub completion server (see benchmarks/e2e.py), and runs the
+batch CLI for each --processes / --concurrency combination. Each run starts
+from an empty progress file; a final rerun of the last combination checks
+that a finished batch is skipped. Reports users per second, the LLM calls
+made and failures.
+
+Usage (from the repository root):
+    python -m benchmarks.batch --users 40 --processes 1 2 --concurrency 4 16 --ttft 0.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from cryptography.fernet import Fernet
+
+from benchmarks.e2e import seed_users
+from utils.credential_store import CredentialStore
+from utils.fake_google import FakeGoogleServer, FakeGmailHttp, FakeCalendarHttp
+from utils.stub_llm import StubCompletionServer
+
+
+def run_cli(env, roster, out, processes, concurrency, fetch_workers):
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "batch_briefings.py", "--roster", roster, "--out", out, "--processes", str(processes),
+         "--concurrency", str(concurrency), "--fetch-workers", str(fetch_workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wall = time.perf_counter() - start
+    with open(os.path.join(out, "report.json")) as f:
+        report = json.load(f)
+    return wall, report, completed.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--inbox", type=int, default=50, help="messages per inbox")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--fetch-workers", type=int, default=8)
+    parser.add_argument("--ttft", type=float, default=0.5, help="stub LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="stub LLM output throughput")
+    parser.add_argument("--google-latency", type=float, default=0.05, help="seconds per fake Google round-trip")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="batch-")
+    gmail = FakeGmailHttp(message_count=args.inbox, latency=args.google_latency)
+    calendar = FakeCalendarHttp(latency=args.google_latency)
+    rows = []
+    with FakeGoogleServer(gmail, calendar) as google, \
+            StubCompletionServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second) as llm:
+        key = Fernet.generate_key()
+        credential_path = os.path.join(workdir, "credentials.db")
+        seed_users(credential_path, key, args.users, f"{google.url}/token")
+        roster = os.path.join(workdir, "roster.txt")
+        with open(roster, "w") as f:
+            f.write("\n".join(CredentialStore(path=credential_path, key=key).user_keys()) + "\n")
+
+        env = dict(os.environ, OPENAI_API_KEY="offline-benchmark", OTEL_SDK_DISABLED="true",
+                   GOOGLE_API_ROOT_URL=google.url, OPENROUTER_BASE_URL=llm.url,
+                   CREDENTIAL_DB_PATH=credential_path, CREDENTIAL_KEY=key.decode(),
+                   GMAIL_MAX_RESULTS=str(args.inbox), LLM_CACHE_BACKEND="none",
+                   SCHEDULE_DB_PATH=os.path.join(workdir, "schedules.db"),
+                   METRICS_DB_PATH=os.path.join(workdir, "metrics.db"),
+                   GMAIL_SYNC_DB_PATH=os.path.join(workdir, "gmail_sync.db"),
+                   PYTHONWARNINGS="ignore::DeprecationWarning")
+
+        out = None
+        for processes in args.processes:
+            for concurrency in args.concurrency:
+                out = os.path.join(workdir, f"out-{processes}-{concurrency}")
+                calls = llm.calls
+                wall, report, _ = run_cli(env, roster, out, processes, concurrency, args.fetch_workers)
+                rows.append((f"{processes} x {concurrency}", wall, report, llm.calls - calls))
+
+        calls = llm.calls
+        wall, report, _ = run_cli(env, roster, out, args.processes[-1], args.concurrency[-1], args.fetch_workers)
+        rows.append(("rerun", wall, report, llm.calls - calls))
+
+    print(f"\n{args.users} users, {args.inbox} messages each, stub LLM {args.ttft:g}s to first token")
+    print(f"{'procs x slots':<14} {'done':>5} {'skipped':>7} {'failed':>6} {'wall s':>7} {'users/s':>8} {'llm calls':>9}")
+    for label, wall, report, calls in rows:
+        briefed = report["done"] - report["skipped"]
+        print(f"{label:<14} {report['done']:>5} {report['skipped']:>7} {report['failed']:>6} {wall:>7.2f} "
+              f"{briefed / wall:>8.2f} {calls:>9}")
+
+
+if __name__ == "__main__":
+    main()
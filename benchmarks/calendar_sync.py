@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Incremental Calendar sync and schedule analysis against the fake Calendar API.
+
+Part 1 replays calendar changes, syncing after each, and reports the sync
+mode, round-trips and conflicts found. Part 2 times the overlap/free-gap
+analysis for growing event counts.
+
+Usage (from the repository root):
+    python -m benchmarks.calendar_sync --latency 0.02
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+from utils.calendar_sync import DayIndex, sync_calendar_day
+from utils.fake_google import FakeCalendarHttp, build_fake_calendar_service
+
+
+def replay(latency):
+    fake = FakeCalendarHttp(latency=latency, extra_days=3)
+    service = build_fake_calendar_service(fake)
+    today_ids = [e["id"] for e in fake.events.values() if e["start"]["dateTime"].startswith(fake.day.isoformat())]
+    tomorrow = fake.day + timedelta(days=1)
+
+    steps = [
+        ("first sync of the day", lambda: None),
+        ("refresh, no changes", lambda: None),
+        ("new overlapping event", lambda: fake.add_event("11:15", "12:00", "Urgent call")),
+        ("event moved to tomorrow", lambda: fake.move_event(today_ids[1], "10:00", "11:00", day=tomorrow)),
+        ("event cancelled", lambda: fake.cancel_event(today_ids[0])),
+        ("all-day event added", lambda: fake.add_event(None, None, "Company offsite", all_day=True)),
+        ("sync token expired", fake.expire_sync_tokens),
+    ]
+
+    print(f"{'step':<26} {'mode':<12} {'trips':>5} {'events':>6} {'conflicts':>9} {'free gaps':>9}")
+    for name, mutate in steps:
+        mutate()
+        fake.reset_counters()
+        analysis, report = sync_calendar_day(service, "bench-user")
+        print(f"{name:<26} {report['mode']:<12} {fake.round_trips:>5} "
+              f"{len(analysis['events']) + len(analysis['all_day']):>6} "
+              f"{len(analysis['conflicts']):>9} {len(analysis['free']):>9}")
+
+
+def time_analysis(sizes):
+    tz = ZoneInfo("UTC")
+    day = datetime.now(tz).date()
+    rng = random.Random(42)
+    print(f"\n{'events':>7} {'conflicts':>9} {'analyze ms':>10}")
+    for size in sizes:
+        index = DayIndex(day, tz)
+        items = []
+        for n in range(size):
+            start = datetime.combine(day, dtime(0), tzinfo=tz) + timedelta(minutes=rng.randrange(0, 24 * 60 - 60))
+            end = start + timedelta(minutes=rng.choice([15, 30, 45, 60]))
+            items.append({"id": f"e{n}", "summary": f"Event {n}",
+                          "start": {"dateTime": start.isoformat()}, "end": {"dateTime": end.isoformat()}})
+        index.apply(items)
+        started = time.perf_counter()
+        analysis = index.analyze()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{size:>7} {len(analysis['conflicts']):>9} {elapsed:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    replay(args.latency)
+    time_analysis(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
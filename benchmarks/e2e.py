@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark of GET /briefing over real HTTP.
+
+Unlike load_test.py, which runs benchmarks.offline_app with the fetchers and
+the LLM swapped out in-process, this serves the unmodified app with gunicorn
+and points it at two local servers:
+
+    FakeGoogleServer       Gmail and Calendar APIs plus the OAuth token endpoint
+                           (GOOGLE_API_ROOT_URL), with a synthetic inbox per scenario
+    StubCompletionServer   OpenAI-compatible chat completions (OPENROUTER_BASE_URL)
+                           with a scripted time to first token and throughput
+
+Signed-in users are seeded in the credential store and get a signed session
+cookie. For each inbox size, every user requests one briefing (the cold one,
+with a full Gmail sync), then all users request ?refresh=1 briefings
+concurrently. Reported per scenario: p50/p95 latency, requests per second and
+resident memory per worker. The report is JSON (stdout, or --output) so runs
+on two commits can be compared with --compare.
+
+Usage (from the repository root):
+    python -m benchmarks.e2e --inboxes 10 100 1000 --users 4 --requests 5 --output e2e.json
+    python -m benchmarks.e2e --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import requests
+from cryptography.fernet import Fernet
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+from google.oauth2.credentials import Credentials
+
+from benchmarks.load_test import free_port
+from utils.credential_store import CredentialStore
+from utils.fake_google import FakeGoogleServer, FakeGmailHttp, FakeCalendarHttp
+from utils.google_services import account_key
+from utils.stub_llm import StubCompletionServer
+
+SECRET_KEY = "offline-benchmark-secret"
+SCOPES = ["https://www.googleapis.com/auth/gmail.readonly", "https://www.googleapis.com/auth/calendar.readonly"]
+
+
+def session_cookie(data):
+    """A Flask session cookie the app will accept (same SECRET_KEY)"""
+    signer = Flask(__name__)
+    signer.secret_key = SECRET_KEY
+    return SecureCookieSessionInterface().get_signing_serializer(signer).dumps(data)
+
+
+def seed_users(path, key, count, token_uri):
+    """Store credentials for `count` users and return their session cookies"""
+    store = CredentialStore(path=path, key=key)
+    cookies = []
+    for n in range(count):
+        creds = Credentials(token=f"fake-access-{n}", refresh_token=f"fake-refresh-{n}", token_uri=token_uri,
+                            client_id="offline-benchmark", client_secret="offline-benchmark", scopes=SCOPES,
+                            expiry=datetime.utcnow() + timedelta(days=1))
+        user_key = account_key(f"user{n}@example.com")
+        store.save(creds, user_key)
+        cookies.append(session_cookie({"user_key": user_key, "language": "en"}))
+    return cookies
+
+
+def start_app(args, env, port):
+    target = "asgi:application" if args.mode == "asgi" else "app:app"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", target],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"App server exited with {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return server
+        except requests.RequestException:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("App server did not start")
+
+
+def worker_memory(master_pid):
+    """Current and peak resident memory (MB) of each gunicorn worker, read from /proc (Linux)"""
+    workers = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        if int(status.get("PPid", "0")) == master_pid and "VmRSS" in status:
+            workers.append({"rss_mb": round(int(status["VmRSS"].split()[0]) / 1024, 1),
+                            "peak_rss_mb": round(int(status["VmHWM"].split()[0]) / 1024, 1)})
+    return workers
+
+
+def percentile(ordered, fraction):
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else None
+
+
+def request_briefing(base, cookie, refresh, latencies, errors):
+    start = time.perf_counter()
+    try:
+        response = requests.get(f"{base}/briefing", params={"refresh": "1"} if refresh else None,
+                                cookies={"session": cookie}, timeout=300)
+        if response.ok and "briefing" in response.json():
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(response.status_code)
+    except requests.RequestException as e:
+        errors.append(type(e).__name__)
+
+
+def run_scenario(inbox, args):
+    workdir = tempfile.mkdtemp(prefix=f"e2e-{inbox}-")
+    gmail = FakeGmailHttp(message_count=inbox, latency=args.google_latency, per_item_latency=args.google_item_latency)
+    calendar = FakeCalendarHttp(latency=args.google_latency)
+    with FakeGoogleServer(gmail, calendar) as google, \
+            StubCompletionServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                                 completion_tokens=args.completion_tokens) as llm:
+        key = Fernet.generate_key()
+        credential_path = os.path.join(workdir, "credentials.db")
+        cookies = seed_users(credential_path, key, args.users, f"{google.url}/token")
+
+        port = free_port()
+        env = dict(os.environ, SERVER_MODE=args.mode, PORT=str(port), WEB_CONCURRENCY=str(args.workers),
+                   SECRET_KEY=SECRET_KEY, OPENAI_API_KEY="offline-benchmark", OTEL_SDK_DISABLED="true",
+                   GOOGLE_API_ROOT_URL=google.url, OPENROUTER_BASE_URL=llm.url,
+                   CREDENTIAL_DB_PATH=credential_path, CREDENTIAL_KEY=key.decode(),
+                   GMAIL_MAX_RESULTS=str(inbox), LLM_CACHE_BACKEND="none", SCHEDULER_ENABLED="false",
+                   JOB_DB_PATH=os.path.join(workdir, "jobs.db"), SCHEDULE_DB_PATH=os.path.join(workdir, "schedules.db"),
+                   METRICS_DB_PATH=os.path.join(workdir, "metrics.db"),
+                   GMAIL_SYNC_DB_PATH=os.path.join(workdir, "gmail_sync.db"),
+                   LOG_FILE=os.path.join(workdir, "app.log"), PYTHONWARNINGS="ignore::DeprecationWarning")
+        server = start_app(args, env, port)
+        base = f"http://127.0.0.1:{port}"
+        try:
+            cold, cold_errors = [], []
+            for cookie in cookies:
+                request_briefing(base, cookie, True, cold, cold_errors)
+            memory_idle = worker_memory(server.pid)
+
+            latencies, errors = [], []
+            llm_calls_before = llm.calls
+
+            def user(cookie):
+                for _ in range(args.requests):
+                    request_briefing(base, cookie, True, latencies, errors)
+
+            threads = [threading.Thread(target=user, args=(cookie,)) for cookie in cookies]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - start
+            memory = worker_memory(server.pid)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    ordered = sorted(latencies)
+    completed = len(latencies)
+    return {
+        "inbox": inbox,
+        "completed": completed,
+        "errors": len(errors) + len(cold_errors),
+        "cold_p50_seconds": statistics.median(cold) if cold else None,
+        "p50_seconds": statistics.median(ordered) if ordered else None,
+        "p95_seconds": percentile(ordered, 0.95),
+        "mean_seconds": statistics.mean(ordered) if ordered else None,
+        "requests_per_second": completed / wall if wall else None,
+        "llm_calls_per_briefing": (llm.calls - llm_calls_before) / completed if completed else None,
+        "google_round_trips": gmail.round_trips + calendar.round_trips,
+        "workers_after_cold": memory_idle,
+        "workers": memory,
+        "max_worker_rss_mb": max((w["rss_mb"] for w in memory), default=None),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+COMPARED = [("p50_seconds", "p50 s"), ("p95_seconds", "p95 s"), ("requests_per_second", "req/s"),
+            ("max_worker_rss_mb", "RSS MB")]
+
+
+def compare(base_path, new_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{base.get('commit') or base_path} -> {new.get('commit') or new_path}")
+    print(f"{'inbox':>6} {'metric':<7} {'before':>9} {'after':>9} {'change':>8}")
+    before = {s["inbox"]: s for s in base["scenarios"]}
+    for scenario in new["scenarios"]:
+        old = before.get(scenario["inbox"])
+        if old is None:
+            continue
+        for field, label in COMPARED:
+            a, b = old.get(field), scenario.get(field)
+            change = f"{(b - a) / a:+.1%}" if a and b is not None else "-"
+            print(f"{scenario['inbox']:>6} {label:<7} {a if a is not None else '-':>9.4} "
+                  f"{b if b is not None else '-':>9.4} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inboxes", type=int, nargs="+", default=[10, 100, 1000], help="messages per inbox")
+    parser.add_argument("--users", type=int, default=4, help="concurrent signed-in users")
+    parser.add_argument("--requests", type=int, default=5, help="briefings per user after the cold one")
+    parser.add_argument("--mode", default="gthread", choices=["sync", "gthread", "gevent", "asgi"])
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--ttft", type=float, default=0.5, help="stub LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="stub LLM output throughput")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="stub LLM tokens per answer")
+    parser.add_argument("--google-latency", type=float, default=0.05, help="seconds per fake Google round-trip")
+    parser.add_argument("--google-item-latency", type=float, default=0.002,
+                        help="extra seconds per sub-request of a batch")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two JSON reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    config = {name: value for name, value in vars(args).items() if name not in ("output", "compare")}
+    report = {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"), "config": config,
+              "scenarios": [run_scenario(inbox, args) for inbox in args.inboxes]}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
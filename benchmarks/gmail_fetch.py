@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Gmail fetch benchmark: sequential N+1 get() calls vs batched metadata fetches.
+
+Runs entirely offline against utils.fake_google.FakeGmailHttp.
+
+Usage (from the repository root):
+    python -m benchmarks.gmail_fetch --sizes 10 100 500 --latency 0.05
+"""
+import argparse
+import time
+
+from utils.fake_google import FakeGmailHttp, build_fake_gmail_service
+from utils.google_auth import fetch_gmail_messages
+
+
+def fetch_sequential(service, max_results):
+    """The original strategy: one list() and one full get() per message"""
+    response = service.users().messages().list(userId="me", labelIds=["INBOX"], maxResults=max_results).execute()
+    return [
+        service.users().messages().get(userId="me", id=msg["id"]).execute()
+        for msg in response.get("messages", [])
+    ]
+
+
+def run(strategy, size, latency, per_item_latency):
+    fake = FakeGmailHttp(message_count=size, latency=latency, per_item_latency=per_item_latency)
+    service = build_fake_gmail_service(fake)
+    start = time.perf_counter()
+    messages = strategy(service, size)
+    elapsed = time.perf_counter() - start
+    return {
+        "messages": len(messages),
+        "round_trips": fake.round_trips,
+        "api_calls": fake.api_calls,
+        "kbytes": fake.bytes_received / 1024,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per HTTP round-trip")
+    parser.add_argument("--per-item-latency", type=float, default=0.001, help="seconds per batched sub-request")
+    args = parser.parse_args()
+
+    strategies = [("sequential", fetch_sequential), ("batched", fetch_gmail_messages)]
+    print(f"{'size':>6} {'strategy':<11} {'msgs':>5} {'trips':>6} {'calls':>6} {'KiB':>9} {'seconds':>8}")
+    for size in args.sizes:
+        for name, strategy in strategies:
+            r = run(strategy, size, args.latency, args.per_item_latency)
+            print(f"{size:>6} {name:<11} {r['messages']:>5} {r['round_trips']:>6} {r['api_calls']:>6} "
+                  f"{r['kbytes']:>9.1f} {r['seconds']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
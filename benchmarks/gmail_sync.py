@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Incremental Gmail sync against the fake Gmail history API.
+
+Replays a sequence of mailbox changes, syncing after each one, and checks the
+local store against the fake mailbox. Reports round-trips per refresh.
+
+Usage (from the repository root):
+    python -m benchmarks.gmail_sync --messages 200 --max-results 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from utils.fake_google import FakeGmailHttp, build_fake_gmail_service
+from utils.gmail_sync import MailboxStore, sync_mailbox
+
+
+def expected_inbox(fake, max_results):
+    inbox = [m for m in fake.messages if "INBOX" in m["labelIds"]]
+    inbox.sort(key=lambda m: int(m["internalDate"]), reverse=True)
+    return [(m["id"], sorted(m["labelIds"])) for m in inbox[:max_results]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--max-results", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    fake = FakeGmailHttp(message_count=args.messages, latency=args.latency)
+    service = build_fake_gmail_service(fake)
+    store = MailboxStore(os.path.join(tempfile.mkdtemp(), "gmail_sync.db"))
+
+    steps = [
+        ("initial sync", lambda: None),
+        ("refresh, no changes", lambda: None),
+        ("3 new messages", lambda: [fake.add_message() for _ in range(3)]),
+        ("one read, one archived", lambda: (fake.mark_read(fake.messages[0]["id"]),
+                                            fake.archive_message(fake.messages[1]["id"]))),
+        ("archived one restored", lambda: fake.restore_message(fake.messages[1]["id"])),
+        ("one deleted", lambda: fake.delete_message(fake.messages[2]["id"])),
+        ("history expired", lambda: (fake.add_message(), fake.expire_history())),
+    ]
+
+    failures = 0
+    print(f"{'step':<26} {'mode':<12} {'trips':>5} {'fetched':>7} {'seconds':>8}  consistent")
+    for name, mutate in steps:
+        mutate()
+        fake.reset_counters()
+        start = time.perf_counter()
+        messages, report = sync_mailbox(service, "bench-user", store=store, max_results=args.max_results)
+        elapsed = time.perf_counter() - start
+
+        got = [(m["id"], sorted(m["labelIds"])) for m in messages]
+        consistent = got == expected_inbox(fake, args.max_results)
+        failures += not consistent
+        print(f"{name:<26} {report['mode']:<12} {fake.round_trips:>5} {report.get('fetched', 0):>7} "
+              f"{elapsed:>8.3f}  {'yes' if consistent else 'NO'}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
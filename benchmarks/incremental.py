@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Section-level incremental regeneration: LLM calls per refresh.
+
+Writes a signed-in user's briefing through pipeline.write_briefing with a
+stub LLM, then refreshes it as the user's mail and calendar change, once with
+the briefing history (utils/briefing_history.py) and once without. Reports
+the LLM calls, sections reused and latency of every refresh, and what
+changes_since() reports between the first and the last briefing.
+
+Usage (from the repository root):
+    python -m benchmarks.incremental --latency 0.3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("CREW_VERBOSE", "false")
+os.environ.setdefault("FAST_PATH_ENABLED", "false")
+
+import pipeline
+import utils.briefing_history as briefing_history
+from crew import crew, crew_pool
+from pipeline import write_briefing
+from utils.stub_llm import StubLLM
+
+EMAILS = ["- Alice: Invoice #1 due Friday", "- Bob: Standup notes"]
+EVENTS = ["09:00-09:30 Standup", "14:00-15:00 Client call"]
+
+# (label, emails, events) for each refresh, in order
+REFRESHES = [
+    ("first briefing", EMAILS, EVENTS),
+    ("nothing changed", EMAILS, EVENTS),
+    ("one new email", EMAILS + ["- Carol: Contract draft attached"], EVENTS),
+    ("nothing changed", EMAILS + ["- Carol: Contract draft attached"], EVENTS),
+    ("meeting moved", EMAILS + ["- Carol: Contract draft attached"], ["09:00-09:30 Standup", "16:00-17:00 Client call"]),
+    ("both changed", EMAILS + ["- Dave: Lunch?"], EVENTS + ["18:00-19:00 Gym"]),
+]
+
+
+def run(stubs, history_enabled):
+    briefing_history._history = briefing_history.BriefingHistory(os.path.join(tempfile.mkdtemp(), "history.db"))
+    pipeline.BRIEFING_HISTORY_ENABLED = history_enabled
+    rows = []
+    for label, emails, events in REFRESHES:
+        inputs = {"emails_data": "\n".join(emails), "calendar_data": "\n".join(events)}
+        ingestion = {"wall_seconds": 0, "sequential_seconds": 0, "warnings": []}
+        before = sum(stub.call_count for stub in stubs)
+        start = time.perf_counter()
+        result = write_briefing({"user_key": "bench-user", "language": "en", "pipeline_mode": "crew"},
+                                inputs, ingestion)
+        rows.append((label, sum(stub.call_count for stub in stubs) - before, time.perf_counter() - start,
+                     result["pipeline"].get("reused_sections", [])))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per stub LLM call")
+    args = parser.parse_args()
+
+    stubs = []
+    for agent in crew.agents:
+        agent.llm = StubLLM(latency=args.latency, stream=agent.llm.stream)
+        agent.verbose = False
+        stubs.append(agent.llm)
+    crew.verbose = False
+    crew_pool.clear()
+
+    # CrewAI echoes streamed chunks to stdout, so the tables come after all runs
+    results = {"without history": run(stubs, False), "with history": run(stubs, True)}
+    history = briefing_history.briefing_history()
+    changes = history.changes_since("bench-user", history.entries("bench-user", 100)[-1]["generated_at"])
+
+    for name, rows in results.items():
+        print(f"\n{name}")
+        print(f"{'refresh':<17} {'LLM calls':>9} {'seconds':>8}  reused")
+        for label, calls, seconds, reused in rows:
+            print(f"{label:<17} {calls:>9} {seconds:>8.2f}  {', '.join(reused) or '-'}")
+        print(f"{'total':<17} {sum(row[1] for row in rows):>9} {sum(row[2] for row in rows):>8.2f}")
+    print(f"\nchanged since the first briefing: {', '.join(changes['changed'])}")
+    for task, section in changes["sections"].items():
+        if section.get("added"):
+            print(f"  {task}: +{len(section['added'])} / -{len(section['removed'])} input lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted input packing for growing mailboxes and calendars.
+
+Compares the old unbounded input (all snippets joined with spaces) with the
+packed, structured input for increasing message counts, then does the same
+for a crowded calendar day. Token counts use the packer's offline estimate.
+
+Usage (from the repository root):
+    python -m benchmarks.input_packing --budget 2100
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+from utils.calendar_sync import DayIndex, format_calendar_analysis
+from utils.fake_google import make_fake_message
+from utils.input_packer import estimate_tokens, pack_emails
+
+
+def make_mailbox(size, seed=3):
+    rng = random.Random(seed)
+    now = datetime.now().astimezone()
+    messages = []
+    for n in range(size):
+        message = make_fake_message(n, now)
+        message["labelIds"] += rng.choices(["IMPORTANT", "STARRED", "CATEGORY_UPDATES"], k=rng.randint(0, 1))
+        messages.append(message)
+    return messages
+
+
+def bench_emails(sizes, budget):
+    print(f"{'messages':>8} {'threads':>7} {'unpacked tok':>12} {'packed tok':>10} {'shown':>6} {'pack ms':>8}")
+    for size in sizes:
+        messages = make_mailbox(size)
+        unpacked = estimate_tokens(" ".join(m["snippet"] for m in messages))
+        start = time.perf_counter()
+        _, report = pack_emails(messages, budget=budget)
+        elapsed = time.perf_counter() - start
+        shown = report["threads"] - report["omitted"]
+        print(f"{size:>8} {report['threads']:>7} {unpacked:>12} {report['tokens']:>10} {shown:>6} {elapsed * 1000:>8.1f}")
+        assert report["tokens"] <= budget, "packed emails exceed the budget"
+
+
+def bench_calendar(sizes, budget):
+    tz = ZoneInfo("UTC")
+    day = datetime.now(tz).date()
+    rng = random.Random(5)
+    print(f"\n{'events':>8} {'unpacked tok':>12} {'packed tok':>10}")
+    for size in sizes:
+        index = DayIndex(day, tz)
+        items = []
+        for n in range(size):
+            start = datetime.combine(day, dtime(8), tzinfo=tz) + timedelta(minutes=15 * rng.randrange(0, 40))
+            items.append({"id": f"e{n}", "summary": f"Project sync {n}",
+                          "start": {"dateTime": start.isoformat()},
+                          "end": {"dateTime": (start + timedelta(minutes=30)).isoformat()}})
+        index.apply(items)
+        analysis = index.analyze()
+        unpacked = estimate_tokens(format_calendar_analysis(analysis))
+        packed = estimate_tokens(format_calendar_analysis(analysis, budget=budget))
+        print(f"{size:>8} {unpacked:>12} {packed:>10}")
+        assert packed <= budget, "packed calendar exceeds the budget"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=2100, help="email token budget (calendar gets 40%%)")
+    args = parser.parse_args()
+
+    bench_emails([10, 50, 200, 1000], args.budget)
+    bench_calendar([5, 20, 80], int(args.budget * 0.4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+LLM response cache benchmark against a stub LLM.
+
+Runs the real crew several times with a scripted, slow StubLLM and reports how
+many LLM calls each refresh needed with the cache enabled.
+
+Usage (from the repository root):
+    python -m benchmarks.llm_cache --backend memory --latency 0.2
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crew import crew
+from utils.llm_cache import LLMCacheMixin, MemoryLRUCache, SQLiteCache
+from utils.stub_llm import StubLLM
+
+
+class CachedStubLLM(LLMCacheMixin, StubLLM):
+    pass
+
+
+SCENARIOS = [
+    ("first briefing", "Invoice #1 due Friday. Standup notes.", "09:00 Standup\n14:00 Client call"),
+    ("refresh, nothing changed", "Invoice #1 due Friday. Standup notes.", "09:00 Standup\n14:00 Client call"),
+    ("refresh, new email", "Invoice #1 due Friday. Standup notes. New: contract draft.", "09:00 Standup\n14:00 Client call"),
+    ("refresh, nothing changed", "Invoice #1 due Friday. Standup notes. New: contract draft.", "09:00 Standup\n14:00 Client call"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stub LLM call")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        cache = SQLiteCache(path=os.path.join(tempfile.mkdtemp(), "llm_cache.db"))
+    else:
+        cache = MemoryLRUCache()
+
+    llm = CachedStubLLM(latency=args.latency, cache=cache)
+    for agent in crew.agents:
+        agent.llm = llm
+        agent.verbose = False
+    crew.verbose = False
+
+    rows = []
+    for name, emails, calendar in SCENARIOS:
+        calls_before = llm.call_count
+        start = time.perf_counter()
+        crew.kickoff(inputs={"emails_data": emails, "calendar_data": calendar})
+        rows.append((name, llm.call_count - calls_before, time.perf_counter() - start))
+
+    print(f"{'scenario':<26} {'LLM calls':>9} {'seconds':>8}")
+    for name, calls, seconds in rows:
+        print(f"{name:<26} {calls:>9} {seconds:>8.3f}")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
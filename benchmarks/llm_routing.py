@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Hedged requests and model fallback against the stub completion server.
+
+Serves two stub models: "stub/primary" answers after --ttft seconds except for
+a --tail-rate share of calls that take --tail seconds, and "stub/backup"
+always answers after --backup-ttft. --calls summary-style calls are made
+--concurrency at a time through the real OpenRouter client for each
+scenario:
+
+    single     the primary model alone, as before routing
+    fallback   primary then backup, no hedging, primary failing --error-rate
+    hedged     primary then backup with hedged requests
+    hedged+err hedged, with primary failures as in fallback
+
+Reports time to first output (first streamed token, or the whole answer
+without --stream) p50/p95/max, failed calls, which model answered and how
+many extra requests hedging cost.
+
+Usage (from the repository root):
+    python -m benchmarks.llm_routing --calls 200 --tail-rate 0.04 --tail 3 --stream
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+# Learn the deadline quickly: the benchmark only makes a few hundred calls
+os.environ.setdefault("LLM_HEDGE_INITIAL_SECONDS", "1")
+os.environ.setdefault("LLM_HEDGE_MIN_SAMPLES", "5")
+os.environ.setdefault("LLM_HEDGE_MIN_SECONDS", "0.1")
+
+from utils.stub_llm import StubCompletionServer
+
+
+class FirstChunk:
+    """Sink remembering when the first streamed chunk arrived"""
+
+    def __init__(self):
+        self.at = None
+
+    def feed(self, chunk):
+        if self.at is None:
+            self.at = time.perf_counter()
+
+
+def percentile(ordered, fraction):
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else float("nan")
+
+
+def run_scenario(llm, calls, concurrency, stream):
+    from utils.briefing_stream import redirect_chunks
+
+    def one(n):
+        messages = [{"role": "system", "content": "You are the Summary Agent."},
+                    {"role": "user", "content": f"Briefing request {n} {random.random()}"}]
+        sink = FirstChunk()
+        start = time.perf_counter()
+        try:
+            with redirect_chunks(sink):
+                llm.call(messages)
+        except Exception:
+            return None
+        return ((sink.at if stream else None) or time.perf_counter()) - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(one, range(calls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ttft", type=float, default=0.2, help="primary seconds to first token")
+    parser.add_argument("--tail", type=float, default=3.0, help="primary seconds to first token on slow calls")
+    parser.add_argument("--tail-rate", type=float, default=0.04, help="share of slow primary calls")
+    parser.add_argument("--backup-ttft", type=float, default=0.4, help="backup seconds to first token")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of failing primary calls")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--stream", action="store_true", help="stream, and time the first token")
+    args = parser.parse_args()
+
+    def ttft(model):
+        if "backup" in model:
+            return args.backup_ttft
+        return args.tail if random.random() < args.tail_rate else args.ttft
+
+    error_rate = {"value": 0.0}
+
+    def fail(model):
+        return "primary" in model and random.random() < error_rate["value"]
+
+    with StubCompletionServer(ttft=ttft, tokens_per_second=args.tokens_per_second, completion_tokens=40,
+                              fail=fail) as server:
+        os.environ["OPENROUTER_BASE_URL"] = server.url
+        from utils.llm_client import model_llm
+        from utils.llm_router import RoutedLLM
+
+        primary, backup = model_llm("stub/primary", args.stream), model_llm("stub/backup", args.stream)
+        # litellm retries failed completions itself; count each request once
+        primary.num_retries = backup.num_retries = 0
+        scenarios = [
+            ("single", primary, 0.0),
+            ("fallback", RoutedLLM("bench", [primary, backup], hedge=False), args.error_rate),
+            ("hedged", RoutedLLM("bench", [primary, backup], hedge=True), 0.0),
+            ("hedged+err", RoutedLLM("bench", [primary, backup], hedge=True), args.error_rate),
+        ]
+        rows = []
+        for name, llm, errors in scenarios:
+            error_rate["value"] = errors
+            before = dict(server.model_calls)
+            start = time.perf_counter()
+            seconds = run_scenario(llm, args.calls, args.concurrency, args.stream)
+            wall = time.perf_counter() - start
+            requests = {model: count - before.get(model, 0) for model, count in server.model_calls.items()}
+            stats = llm.stats() if isinstance(llm, RoutedLLM) else None
+            rows.append((name, seconds, wall, requests, stats))
+        time.sleep(args.tail)  # hedge losers still running in the background finish before the server stops
+
+    print(f"\n{args.calls} calls x {args.concurrency}, primary {args.ttft:g}s to first token "
+          f"({args.tail_rate:.0%} at {args.tail:g}s), backup {args.backup_ttft:g}s, "
+          f"{'streaming' if args.stream else 'not streaming'}")
+    print(f"{'scenario':<11} {'p50 s':>6} {'p95 s':>6} {'max s':>6} {'failed':>6} {'wall s':>7} "
+          f"{'primary won':>11} {'backup won':>10} {'hedges':>6} {'requests':>8}")
+    for name, seconds, wall, requests, stats in rows:
+        ok = sorted(s for s in seconds if s is not None)
+        if stats:
+            outcomes = stats["outcomes"]
+            won = [sum(outcomes[m][k] for k in ("primary", "hedge", "fallback")) for m in stats["models"]]
+            hedges = stats["hedges"]
+        else:
+            won, hedges = [len(ok), 0], 0
+        print(f"{name:<11} {percentile(ok, 0.5):>6.2f} {percentile(ok, 0.95):>6.2f} {ok[-1] if ok else 0:>6.2f} "
+              f"{len(seconds) - len(ok):>6} {wall:>7.2f} {won[0]:>11} {won[1]:>10} {hedges:>6} "
+              f"{sum(requests.values()):>8}")
+
+
+if __name__ == "__main__":
+    main()
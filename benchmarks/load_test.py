@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Concurrent-user load test of the serving modes, fully offline.
+
+For each SERVER_MODE a gunicorn server is started on benchmarks.offline_app
+(stub LLM, fake Google APIs). Then `--users` clients request GET /briefing in
+a loop while `--viewers` clients keep a log viewer open on /logs, the way
+the briefing page's EventSource does. Reports briefing throughput and
+latency per mode.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --modes sync gthread asgi --users 8 --viewers 4 --duration 20
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, args, workdir):
+    env = dict(os.environ, SERVER_MODE=mode, PORT=str(port), WEB_CONCURRENCY=str(args.workers),
+               LOAD_LLM_LATENCY=str(args.llm_latency), LOAD_GOOGLE_LATENCY=str(args.google_latency),
+               JOB_DB_PATH=os.path.join(workdir, f"jobs-{mode}.db"),
+               SCHEDULE_DB_PATH=os.path.join(workdir, f"schedules-{mode}.db"), LOG_FILE=os.path.join(workdir, f"{mode}.log"),
+               PYTHONWARNINGS="ignore::DeprecationWarning")
+    target = "benchmarks.offline_app:application" if mode == "asgi" else "benchmarks.offline_app:app"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", target],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return server
+        except requests.RequestException:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def briefing_user(base, stop, latencies, errors):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = session.get(f"{base}/briefing", timeout=120)
+            if response.ok and "briefing" in response.json():
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(response.status_code)
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+
+
+def log_viewer(base, stop, counts):
+    """Behaves like EventSource: read the stream, reconnect with Last-Event-ID when it ends"""
+    last_id = None
+    while not stop.is_set():
+        headers = {"Last-Event-ID": last_id} if last_id else {}
+        try:
+            with requests.get(f"{base}/logs", headers=headers, stream=True, timeout=(5, 30)) as response:
+                counts["connections"] += 1
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("id: "):
+                        last_id = line[4:]
+                    if stop.is_set():
+                        break
+        except requests.RequestException:
+            counts["errors"] += 1
+        stop.wait(1.0)  # the server's retry interval
+
+
+def run_mode(mode, args, workdir):
+    port = free_port()
+    server = start_server(mode, port, args, workdir)
+    base = f"http://127.0.0.1:{port}"
+    stop = threading.Event()
+    latencies, errors, viewer_counts = [], [], {"connections": 0, "errors": 0}
+    threads = [threading.Thread(target=log_viewer, args=(base, stop, viewer_counts), daemon=True)
+               for _ in range(args.viewers)]
+    threads += [threading.Thread(target=briefing_user, args=(base, stop, latencies, errors), daemon=True)
+                for _ in range(args.users)]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=130)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    ordered = sorted(latencies)
+    return {
+        "mode": mode,
+        "completed": len(latencies),
+        "throughput": len(latencies) / args.duration,
+        "p50": statistics.median(ordered) if ordered else float("nan"),
+        "p95": ordered[int(0.95 * (len(ordered) - 1))] if ordered else float("nan"),
+        "errors": len(errors),
+        "log_connections": viewer_counts["connections"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["sync", "gthread", "asgi"],
+                        choices=["sync", "gthread", "gevent", "asgi"])
+    parser.add_argument("--users", type=int, default=8, help="concurrent /briefing clients")
+    parser.add_argument("--viewers", type=int, default=4, help="open /logs viewers")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per mode")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument("--google-latency", type=float, default=0.05, help="seconds per fake Google round-trip")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    results = [run_mode(mode, args, workdir) for mode in args.modes]
+
+    print(f"{args.users} briefing users, {args.viewers} log viewers, {args.workers} workers, {args.duration:g}s per mode")
+    print(f"{'mode':<8} {'done':>5} {'per sec':>8} {'p50 s':>7} {'p95 s':>7} {'errors':>6} {'log conns':>9}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['completed']:>5} {r['throughput']:>8.2f} {r['p50']:>7.2f} {r['p95']:>7.2f} "
+              f"{r['errors']:>6} {r['log_connections']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cost of the /metrics instrumentation.
+
+Times the recording primitives on their own (a stage, an LLM call record, a
+/metrics render of a realistic registry) and then whole crew kickoffs with a
+zero-latency stub LLM, with metrics and per-request traces on and off. The
+stub makes the crew as fast as it can be, so the difference is an upper bound
+on what the instrumentation adds to a real briefing.
+
+Usage (from the repository root):
+    python -m benchmarks.metrics_overhead --runs 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("METRICS_DB_PATH", os.path.join(tempfile.mkdtemp(), "metrics.db"))
+
+from crew import crew, crew_pool
+from pipeline import run_crew
+from utils import metrics
+from utils.llm_cache import LLMCacheMixin, NullCache
+from utils.stub_llm import StubLLM
+
+
+class CachedStubLLM(LLMCacheMixin, StubLLM):
+    pass
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def time_stage():
+    with metrics.stage("benchmark"):
+        pass
+
+
+def time_llm_record():
+    metrics.record_llm_call("stub/briefing", 0.5, 1200, 300)
+
+
+def kickoffs(runs, inputs, traced):
+    start = time.perf_counter()
+    for _ in range(runs):
+        if traced:
+            with metrics.trace_request():
+                run_crew(inputs, lambda message: None, lambda text: None)
+        else:
+            run_crew(inputs, lambda message: None, lambda text: None)
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="crew kickoffs per configuration")
+    parser.add_argument("--iterations", type=int, default=100000, help="calls per primitive")
+    args = parser.parse_args()
+
+    for agent in crew.agents:
+        agent.llm = CachedStubLLM(cache=NullCache(), stream=agent.llm.stream)
+        agent.verbose = False
+    crew.verbose = False
+    crew_pool.clear()
+    inputs = {"emails_data": "- [Mon 08:00] Ana: Invoice #1 due Friday", "calendar_data": "09:00-09:30 Standup"}
+
+    primitives = [
+        ("stage()", per_call(time_stage, args.iterations)),
+        ("record_llm_call()", per_call(time_llm_record, args.iterations)),
+        ("/metrics render", per_call(metrics.exposition, 100)),
+    ]
+
+    run_crew(inputs, lambda message: None, lambda text: None)  # warm up
+    rows = []
+    for label, enabled, traced in (("metrics off", False, False), ("metrics on", True, False),
+                                   ("metrics on + trace", True, True)):
+        metrics.METRICS_ENABLED = enabled
+        rows.append((label, kickoffs(args.runs, inputs, traced)))
+    metrics.METRICS_ENABLED = True
+
+    # CrewAI echoes streamed chunks to stdout, so the tables come after all runs
+    print(f"\n\n{'primitive':<20} {'us/call':>8}")
+    for label, seconds in primitives:
+        print(f"{label:<20} {seconds * 1e6:>8.1f}")
+    print(f"\n{'crew kickoff':<20} {'ms':>8} {'overhead':>8}")
+    baseline = rows[0][1]
+    for label, seconds in rows:
+        print(f"{label:<20} {seconds * 1e3:>8.1f} {(seconds - baseline) / baseline:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
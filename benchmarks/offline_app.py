@@ -0,0 +1,62 @@
+"""
+The real app wired to offline stand-ins, for load tests.
+
+Every agent gets a StubLLM that sleeps LOAD_LLM_LATENCY seconds per call, and
+the Gmail/Calendar sources read from the fake Google APIs (round-trips sleep
+LOAD_GOOGLE_LATENCY seconds), so the server behaves like production minus the
+network. Serve it like the real app:
+
+    gunicorn -c gunicorn.conf.py benchmarks.offline_app:app          (sync/gthread/gevent)
+    SERVER_MODE=asgi gunicorn -c gunicorn.conf.py benchmarks.offline_app:application
+"""
+import os
+import uuid
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+# Nothing to probe: the agents use StubLLM
+os.environ.setdefault("UPSTREAM_MONITOR_ENABLED", "false")
+
+from app import app
+from crew import crew
+from utils import ingestion
+from utils.calendar_sync import sync_calendar_day, format_calendar_analysis
+from utils.fake_google import FakeGmailHttp, FakeCalendarHttp, build_fake_gmail_service, build_fake_calendar_service
+from utils.google_auth import fetch_gmail_messages
+from utils.input_packer import pack_emails
+from utils.stub_llm import StubLLM
+
+LOAD_LLM_LATENCY = float(os.getenv("LOAD_LLM_LATENCY", "0.5"))
+LOAD_GOOGLE_LATENCY = float(os.getenv("LOAD_GOOGLE_LATENCY", "0.05"))
+
+for agent in crew.agents:
+    agent.llm = StubLLM(latency=LOAD_LLM_LATENCY)
+    agent.verbose = False
+crew.verbose = False
+
+
+def fake_gmail_summary(session, details):
+    service = build_fake_gmail_service(FakeGmailHttp(latency=LOAD_GOOGLE_LATENCY))
+    text, details["packing"] = pack_emails(fetch_gmail_messages(service))
+    return text
+
+
+def fake_calendar_summary(session, details):
+    service = build_fake_calendar_service(FakeCalendarHttp(latency=LOAD_GOOGLE_LATENCY))
+    # A fresh fake per request has its own sync tokens, so never reuse another request's index
+    analysis, details["sync"] = sync_calendar_day(service, f"load-test-{uuid.uuid4().hex}")
+    return format_calendar_analysis(analysis)
+
+
+for name, fetcher in (("gmail", fake_gmail_summary), ("calendar", fake_calendar_summary)):
+    input_name, _, timeout, fallback = ingestion.SOURCES[name]
+    ingestion.SOURCES[name] = (input_name, fetcher, timeout, fallback)
+
+
+def __getattr__(name):
+    # Import the ASGI wrapper only when asked for, so WSGI modes never load uvicorn
+    if name == "application":
+        import asgi
+        return asgi.application
+    raise AttributeError(name)
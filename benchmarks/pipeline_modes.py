@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Crew engine vs fused engine against a scripted stub LLM.
+
+Both engines write a briefing from the same synthetic inputs, in which every
+email and event carries a marker (E-<n>, C-<n>). The stub LLM answers every
+prompt by listing the markers it was shown, so a marker that is missing from
+the final briefing was lost on the way. Reports LLM calls, prompt tokens,
+time to first token and total latency per engine, for a small inbox and for
+one large enough to trigger the fused engine's map-reduce.
+
+Usage (from the repository root):
+    python -m benchmarks.pipeline_modes --latency 0.5 --large-emails 400
+"""
+import argparse
+import os
+import re
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+
+from crew import crew, crew_pool
+from pipeline import run_crew
+from utils.fused_briefing import run_fused, FUSED_MAP_REDUCE_TOKENS
+from utils.input_packer import estimate_tokens
+from utils.stub_llm import StubLLM
+
+MARKER = re.compile(r"\b[EC]-\d+\b")
+
+
+def list_markers(messages):
+    prompt = "\n".join(m.get("content", "") for m in messages)
+    return "Covered: " + " ".join(sorted(set(MARKER.findall(prompt)), key=lambda m: (m[0], int(m[2:]))))
+
+
+def make_inputs(emails, events):
+    email_lines = [f"- [Mon 18 Oct 08:{n % 60:02d}] Sender {n}: Project update E-{n} (+1 earlier in thread) "
+                   f"| please review the attached draft before Friday's meeting" for n in range(emails)]
+    event_lines = [f"{9 + n:02d}:00-{9 + n:02d}:30 Meeting C-{n}" for n in range(events)]
+    return {"emails_data": "\n".join(email_lines) or "No unread emails.",
+            "calendar_data": "\n".join(event_lines) or "You have no events today."}
+
+
+def run_engine(engine, inputs, stubs):
+    before = [len(stub.calls) for stub in stubs]
+    tokens = []
+    first_token = None
+    start = time.perf_counter()
+
+    def on_token(text):
+        nonlocal first_token
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        tokens.append(text)
+
+    briefing, _ = engine(inputs, lambda message: None, on_token)
+    total = time.perf_counter() - start
+    calls = [call for stub, n in zip(stubs, before) for call in stub.calls[n:]]
+    expected = set(MARKER.findall(inputs["emails_data"] + inputs["calendar_data"]))
+    return {
+        "calls": len(calls),
+        "prompt_tokens": sum(estimate_tokens(m["content"]) for call in calls for m in call),
+        "first_token": first_token,
+        "total": total,
+        "coverage": len(expected & set(MARKER.findall(briefing))) / len(expected) if expected else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument("--chunk-latency", type=float, default=0.0, help="seconds per streamed word")
+    parser.add_argument("--small-emails", type=int, default=8)
+    parser.add_argument("--large-emails", type=int, default=400)
+    parser.add_argument("--events", type=int, default=5)
+    args = parser.parse_args()
+
+    stubs = []
+    for agent in crew.agents:
+        agent.llm = StubLLM(latency=args.latency, chunk_latency=args.chunk_latency,
+                            reply=list_markers, stream=agent.llm.stream)
+        agent.verbose = False
+        stubs.append(agent.llm)
+    crew.verbose = False
+    crew_pool.clear()
+
+    rows = []
+    for label, emails in (("small", args.small_emails), ("large", args.large_emails)):
+        inputs = make_inputs(emails, args.events)
+        size = f"{label} ({estimate_tokens(inputs['emails_data'])} tok)"
+        for name, engine in (("crew", run_crew), ("fused", run_fused)):
+            rows.append((size, name, run_engine(engine, inputs, stubs)))
+
+    # CrewAI echoes streamed chunks to stdout, so the table comes after all runs
+    print(f"\n\nstub latency {args.latency:g}s per call, map-reduce above {FUSED_MAP_REDUCE_TOKENS} email tokens")
+    print(f"{'inbox':<18} {'engine':<6} {'calls':>5} {'prompt tok':>10} {'1st token':>9} {'total s':>8} {'coverage':>8}")
+    for size, name, r in rows:
+        first = f"{r['first_token']:.2f}" if r["first_token"] is not None else "-"
+        print(f"{size:<18} {name:<6} {r['calls']:>5} {r['prompt_tokens']:>10} {first:>9} "
+              f"{r['total']:>8.2f} {r['coverage']:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Push notifications: how fresh and how fast /briefing is after mail and calendar change.
+
+Serves the unmodified app with gunicorn against the fake Google server and
+the stub completion server (as in benchmarks/e2e.py). Each signed-in user
+subscribes with PUT /webhooks/subscription and gets a first briefing. Then,
+--rounds times, a new email arrives and a meeting is added; the fakes post
+their push notifications to /webhooks/gmail and /webhooks/calendar (Gmail as
+a Pub/Sub push message), and every user asks for /briefing --think seconds
+later. Scenarios:
+
+    polling       no push notifications: the stored briefing is served until BRIEFING_MAX_AGE
+    push          notifications mark the stored briefing stale; the next visit regenerates it
+    push+prewarm  notifications also regenerate the briefing in the background (debounced)
+
+Reported per scenario: /briefing p50/p95 latency, the share of answers
+written after the latest email arrived, LLM calls, and notifications
+accepted and sent.
+
+Usage (from the repository root):
+    python -m benchmarks.push --users 3 --rounds 3 --think 8 --debounce 1
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import requests
+from cryptography.fernet import Fernet
+
+from benchmarks.e2e import SECRET_KEY, seed_users, start_app, percentile
+from benchmarks.load_test import free_port
+from utils.fake_google import FakeGoogleServer, FakeGmailHttp, FakeCalendarHttp
+from utils.stub_llm import StubCompletionServer
+
+WEBHOOK_TOKEN = "offline-benchmark-token"
+SCENARIOS = {
+    "polling": {"PUSH_NOTIFICATIONS_ENABLED": "false"},
+    "push": {"PUSH_NOTIFICATIONS_ENABLED": "true", "PUSH_PREWARM_ENABLED": "false"},
+    "push+prewarm": {"PUSH_NOTIFICATIONS_ENABLED": "true", "PUSH_PREWARM_ENABLED": "true"},
+}
+
+
+class ServerArgs:
+    mode = "gthread"
+
+
+def run_scenario(name, args):
+    workdir = tempfile.mkdtemp(prefix=f"push-{name}-")
+    gmail = FakeGmailHttp(message_count=args.inbox, latency=args.google_latency)
+    calendar = FakeCalendarHttp(latency=args.google_latency)
+    with FakeGoogleServer(gmail, calendar) as google, \
+            StubCompletionServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                                 completion_tokens=120) as llm:
+        key = Fernet.generate_key()
+        credential_path = os.path.join(workdir, "credentials.db")
+        cookies = seed_users(credential_path, key, args.users, f"{google.url}/token")
+
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        env = dict(os.environ, SERVER_MODE="gthread", PORT=str(port), WEB_CONCURRENCY=str(args.workers),
+                   SECRET_KEY=SECRET_KEY, OPENAI_API_KEY="offline-benchmark", OTEL_SDK_DISABLED="true",
+                   GOOGLE_API_ROOT_URL=google.url, OPENROUTER_BASE_URL=llm.url,
+                   CREDENTIAL_DB_PATH=credential_path, CREDENTIAL_KEY=key.decode(),
+                   GMAIL_MAX_RESULTS=str(args.inbox), LLM_CACHE_BACKEND="none", SCHEDULER_ENABLED="false",
+                   UPSTREAM_MONITOR_ENABLED="false", CREW_VERBOSE="false",
+                   PUSH_WEBHOOK_URL=base, PUSH_WEBHOOK_TOKEN=WEBHOOK_TOKEN,
+                   GMAIL_PUSH_TOPIC="projects/offline-benchmark/topics/briefing",
+                   PUSH_DEBOUNCE_SECONDS=str(args.debounce), PUSH_POLL_SECONDS="0.5",
+                   PUSH_WORKERS=str(args.users),
+                   JOB_DB_PATH=os.path.join(workdir, "jobs.db"), SCHEDULE_DB_PATH=os.path.join(workdir, "schedules.db"),
+                   METRICS_DB_PATH=os.path.join(workdir, "metrics.db"),
+                   GMAIL_SYNC_DB_PATH=os.path.join(workdir, "gmail_sync.db"),
+                   BRIEFING_HISTORY_DB_PATH=os.path.join(workdir, "history.db"),
+                   PUSH_DB_PATH=os.path.join(workdir, "push.db"),
+                   LOG_FILE=os.path.join(workdir, "app.log"), PYTHONWARNINGS="ignore::DeprecationWarning",
+                   **SCENARIOS[name])
+        gmail.push_endpoint = f"{base}/webhooks/gmail?token={WEBHOOK_TOKEN}"
+        server = start_app(ServerArgs, env, port)
+        try:
+            for cookie in cookies:
+                if SCENARIOS[name]["PUSH_NOTIFICATIONS_ENABLED"] == "true":
+                    requests.put(f"{base}/webhooks/subscription", cookies={"session": cookie},
+                                 timeout=60).raise_for_status()
+                requests.get(f"{base}/briefing", cookies={"session": cookie}, timeout=300).raise_for_status()
+
+            latencies, fresh, errors = [], 0, 0
+            llm_calls_before = llm.calls
+            for n in range(args.rounds):
+                message = gmail.add_message()
+                calendar.add_event("18:00", "18:30", f"Follow-up call {n}")
+                gmail.notify_watchers()
+                calendar.notify_watchers()
+                time.sleep(args.think)
+                for cookie in cookies:
+                    start = time.perf_counter()
+                    response = requests.get(f"{base}/briefing", cookies={"session": cookie}, timeout=300)
+                    if not response.ok:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+                    # Fresh: written after this round's email arrived (a new one has no generated_at)
+                    body = response.json()
+                    fresh += body.get("generated_at", time.time()) >= float(message["internalDate"]) / 1000
+            stats = requests.get(f"{base}/webhooks/stats", timeout=10).json()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    ordered = sorted(latencies)
+    return {
+        "p50": statistics.median(ordered) if ordered else float("nan"),
+        "p95": percentile(ordered, 0.95) or float("nan"),
+        "fresh": fresh / max(len(latencies), 1),
+        "errors": errors,
+        "llm_calls": llm.calls - llm_calls_before,
+        "notifications": sum((stats.get("notifications") or {}).values()),
+        "sent": gmail.notifications_sent + calendar.notifications_sent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--think", type=float, default=8.0, help="seconds between a change and the next visit")
+    parser.add_argument("--debounce", type=float, default=1.0, help="PUSH_DEBOUNCE_SECONDS")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--inbox", type=int, default=20)
+    parser.add_argument("--google-latency", type=float, default=0.05)
+    parser.add_argument("--ttft", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    args = parser.parse_args()
+
+    rows = [(name, run_scenario(name, args)) for name in args.scenarios]
+    print(f"\n{args.users} users x {args.rounds} rounds, /briefing {args.think:g}s after each change")
+    print(f"{'scenario':<13} {'p50 s':>6} {'p95 s':>6} {'fresh':>6} {'errors':>6} {'LLM calls':>9} "
+          f"{'notified':>8} {'sent':>5}")
+    for name, r in rows:
+        print(f"{name:<13} {r['p50']:>6.2f} {r['p95']:>6.2f} {r['fresh']:>6.0%} {r['errors']:>6} "
+              f"{r['llm_calls']:>9} {r['notifications']:>8} {r['sent']:>5}")
+
+
+if __name__ == "__main__":
+    main()
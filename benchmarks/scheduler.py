@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Scheduled pre-generation: how many briefings start per minute when every user
+picks the same time.
+
+`--users` schedules are saved for the same minute (an hour from now) and the
+scheduler's claim loop is replayed over simulated time, once without jitter
+or rate limit and once with the configured ones. Reports the busiest minute
+(the OpenRouter burst) and when the last briefing started relative to the
+scheduled time. Nothing is generated, so no LLM is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.scheduler --users 200 --rate 6 --burst 3 --jitter 600
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from utils.scheduler import ScheduleStore, SCHEDULER_LEAD_MINUTES
+
+
+def simulate(users, jitter, rate, burst, poll, workdir, label):
+    store = ScheduleStore(os.path.join(workdir, f"{label}.db"), jitter=jitter)
+    target = (datetime.now(timezone.utc) + timedelta(hours=1)).replace(second=0, microsecond=0)
+    cron = f"{target.minute} {target.hour} * * *"
+    for n in range(users):
+        store.save_schedule(f"user-{n}", cron, "UTC")
+
+    starts = []
+    now = time.time()
+    end = target.timestamp() + 6 * 3600
+    while len(starts) < users and now < end:
+        claimed = store.claim_due(now=now, limit=users, rate_per_minute=rate, burst=burst)
+        starts += [now] * len(claimed)
+        now += poll
+
+    per_minute = Counter(int(start // 60) for start in starts)
+    return {
+        "label": label,
+        "started": len(starts),
+        "peak_per_minute": max(per_minute.values()) if per_minute else 0,
+        "first": min(starts) - target.timestamp() if starts else float("nan"),
+        "last": max(starts) - target.timestamp() if starts else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=6, help="briefings started per minute")
+    parser.add_argument("--burst", type=float, default=3)
+    parser.add_argument("--jitter", type=float, default=600, help="seconds runs are spread over")
+    parser.add_argument("--poll", type=float, default=30, help="seconds between scheduler ticks")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="scheduler-")
+    results = [
+        simulate(args.users, 0, float("inf"), float("inf"), args.poll, workdir, "no limits"),
+        simulate(args.users, args.jitter, args.rate, args.burst, args.poll, workdir, "jitter+rate"),
+    ]
+
+    print(f"{args.users} users scheduled for the same minute, runs start {SCHEDULER_LEAD_MINUTES} min early")
+    print(f"{'':<12} {'started':>8} {'peak/min':>9} {'first (min)':>12} {'last (min)':>11}")
+    for r in results:
+        print(f"{r['label']:<12} {r['started']:>8} {r['peak_per_minute']:>9} "
+              f"{r['first'] / 60:>12.1f} {r['last'] / 60:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: cold googleapiclient build() vs the pooled service factory.
+
+No network access is needed; services are built but never called.
+
+Usage (from the repository root):
+    python -m benchmarks.service_build --iterations 50
+"""
+import argparse
+import statistics
+import time
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from utils.google_services import preload_discovery_documents, pooled_service, clear_service_pool
+
+
+def fake_credentials(n):
+    return Credentials(token=f"token-{n}", refresh_token=f"refresh-{n}")
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def cold_build(i):
+    build("gmail", "v1", credentials=fake_credentials(0), static_discovery=True, cache_discovery=False)
+    build("calendar", "v3", credentials=fake_credentials(0), static_discovery=True, cache_discovery=False)
+
+
+def warm_lease(i):
+    creds = fake_credentials(0)
+    with pooled_service("gmail", "v1", creds), pooled_service("calendar", "v3", creds):
+        pass
+
+
+def new_user_lease(i):
+    creds = fake_credentials(i + 1)
+    with pooled_service("gmail", "v1", creds), pooled_service("calendar", "v3", creds):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    preload_discovery_documents()
+    print(f"Discovery documents preloaded in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    clear_service_pool()
+    warm_lease(0)  # fill the pool for user 0
+
+    print(f"{'scenario':<28} {'p50 ms':>8} {'mean ms':>8} {'max ms':>8}")
+    for name, fn in [("cold build() (gmail+cal)", cold_build),
+                     ("factory, new user", new_user_lease),
+                     ("factory, pooled user", warm_lease)]:
+        samples = time_calls(fn, args.iterations)
+        print(f"{name:<28} {statistics.median(samples):>8.3f} {statistics.mean(samples):>8.3f} {max(samples):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
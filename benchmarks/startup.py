@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Worker startup cost: import time, time to first /health and memory per worker.
+
+First, each of --modules is imported in a fresh interpreter with
+`python -X importtime`; the report gives the total import time, peak RSS and
+the top-level packages that took longest (self time summed per package), to
+catch a heavy import creeping back into the web app's startup path.
+
+Then gunicorn is started (gthread, --workers workers, no network needed) in
+each startup configuration of gunicorn.conf.py:
+
+    boot                 crew pool built in each worker before it accepts requests
+    background           workers answer at once and build the crew pool on a thread
+    preload              GUNICORN_PRELOAD: CrewAI/litellm imported once in the master
+    preload+background   both
+
+and reports seconds until /health answers, until /briefing/jobs/stats (which
+needs the crew) answers, and each worker's RSS and PSS (resident memory with
+pages shared copy-on-write split between the processes sharing them).
+
+Usage (from the repository root):
+    python -m benchmarks.startup --workers 2
+    python -m benchmarks.startup --modules app crew --top 15 --configs boot preload
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import requests
+
+from benchmarks.load_test import free_port
+
+CONFIGS = {
+    "boot": {},
+    "background": {"WORKER_WARMUP": "background"},
+    "preload": {"GUNICORN_PRELOAD": "true"},
+    "preload+background": {"GUNICORN_PRELOAD": "true", "WORKER_WARMUP": "background"},
+}
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def base_env(workdir):
+    return dict(os.environ, OPENAI_API_KEY="offline-benchmark", OTEL_SDK_DISABLED="true",
+                SECRET_KEY="offline-benchmark-secret", SCHEDULER_ENABLED="false",
+                UPSTREAM_MONITOR_ENABLED="false", CREW_VERBOSE="false",
+                JOB_DB_PATH=os.path.join(workdir, "jobs.db"), SCHEDULE_DB_PATH=os.path.join(workdir, "schedules.db"),
+                METRICS_DB_PATH=os.path.join(workdir, "metrics.db"),
+                CREDENTIAL_DB_PATH=os.path.join(workdir, "credentials.db"),
+                GMAIL_SYNC_DB_PATH=os.path.join(workdir, "gmail_sync.db"),
+                LOG_FILE=os.path.join(workdir, "app.log"), PYTHONWARNINGS="ignore::DeprecationWarning")
+
+
+def import_profile(module, env):
+    """(total seconds, peak RSS MB, {top-level package: self seconds}) for importing `module`"""
+    code = f"import resource, {module}; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                               capture_output=True, text=True)
+    if completed.returncode:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    packages = defaultdict(float)
+    total = 0.0
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+        if name == module and not indent:
+            total = int(cumulative_us) / 1e6
+    peak_rss = int(completed.stdout.strip().splitlines()[-1]) / 1024
+    return total, peak_rss, packages
+
+
+def worker_memory(master_pid):
+    """RSS and PSS (MB) of each gunicorn worker, read from /proc (Linux)"""
+    workers = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+            if int(status.get("PPid", "0")) != master_pid:
+                continue
+            with open(f"/proc/{entry}/smaps_rollup") as f:
+                rollup = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith(" "))
+        except OSError:
+            continue
+        workers.append({"rss_mb": int(rollup["Rss"].split()[0]) / 1024, "pss_mb": int(rollup["Pss"].split()[0]) / 1024})
+    return workers
+
+
+def wait_for(url, server, deadline):
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"App server exited with {server.returncode}")
+        try:
+            if requests.get(url, timeout=30).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"No answer from {url}")
+
+
+def start_config(name, env, workers):
+    port = free_port()
+    env = dict(env, SERVER_MODE="gthread", PORT=str(port), WEB_CONCURRENCY=str(workers), **CONFIGS[name])
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                               "--bind", f"127.0.0.1:{port}"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 180
+        wait_for(f"http://127.0.0.1:{port}/health", server, deadline)
+        health = time.perf_counter() - start
+        wait_for(f"http://127.0.0.1:{port}/briefing/jobs/stats", server, deadline)
+        crew_ready = time.perf_counter() - start
+        time.sleep(2)  # let background warm-ups in the other workers finish
+        memory = worker_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return health, crew_ready, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["app", "crew"])
+    parser.add_argument("--top", type=int, default=10, help="packages listed per module")
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    env = base_env(tempfile.mkdtemp(prefix="startup-"))
+    for module in args.modules:
+        total, peak_rss, packages = import_profile(module, env)
+        print(f"\nimport {module}: {total:.2f}s, peak RSS {peak_rss:.0f} MB")
+        print(f"  {'package':<28} {'self s':>7}")
+        for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {package:<28} {seconds:>7.3f}")
+
+    rows = [(name, *start_config(name, env, args.workers)) for name in args.configs]
+    print(f"\ngunicorn gthread, {args.workers} workers")
+    print(f"{'startup':<20} {'/health s':>9} {'crew s':>7} {'RSS MB/worker':>13} {'PSS MB/worker':>13}")
+    for name, health, crew_ready, memory in rows:
+        rss = sum(w["rss_mb"] for w in memory) / max(len(memory), 1)
+        pss = sum(w["pss_mb"] for w in memory) / max(len(memory), 1)
+        print(f"{name:<20} {health:>9.2f} {crew_ready:>7.2f} {rss:>13.0f} {pss:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
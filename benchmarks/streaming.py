@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-token of the streamed briefing against a stub streaming LLM.
+
+Runs the real crew with StubLLMs (the summary agent's one streams word by
+word) inside stream_crew() and reports when each progress event and the
+first briefing token arrived, compared with the time the full result is
+available - which is what the page used to wait for.
+
+Usage (from the repository root):
+    python -m benchmarks.streaming --latency 0.5 --chunk-latency 0.02
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crew import crew
+from agents.summary_agent import summary_agent
+from utils.briefing_stream import stream_crew
+from utils.stub_llm import StubLLM
+
+BRIEFING = ("Good morning! You have two meetings today: standup at 09:00 and a client call at 14:00. "
+            "Invoice #1 is due on Friday and the contract draft is waiting for your review. "
+            "You have a free block from 10:00 to 12:00 for focused work.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each stub answer starts")
+    parser.add_argument("--chunk-latency", type=float, default=0.02, help="seconds per streamed word")
+    args = parser.parse_args()
+
+    for agent in crew.agents:
+        agent.llm = StubLLM(latency=args.latency)
+        agent.verbose = False
+    summary_agent.llm = StubLLM(latency=args.latency, chunk_latency=args.chunk_latency,
+                                reply=lambda messages: BRIEFING, stream=True)
+    crew.verbose = False
+
+    start = time.perf_counter()
+    events = []
+    tokens = []
+
+    def on_progress(message):
+        events.append((time.perf_counter() - start, "progress", message))
+
+    def on_token(text):
+        if not tokens:
+            events.append((time.perf_counter() - start, "first token", repr(text)))
+        tokens.append(text)
+
+    with stream_crew(crew, on_progress, on_token):
+        result = crew.kickoff(inputs={"emails_data": "Invoice #1 due Friday. Contract draft.",
+                                      "calendar_data": "09:00 Standup\n14:00 Client call"})
+    total = time.perf_counter() - start
+
+    for seconds, kind, detail in events:
+        print(f"{seconds:7.3f}s  {kind:<12} {detail}")
+    print(f"{total:7.3f}s  {'result':<12} {len(str(result))} characters")
+
+    streamed = "".join(tokens)
+    print(f"\ntokens streamed: {len(tokens)}, streamed text matches result: {streamed.strip() == str(result).strip()}")
+    first_token = next(seconds for seconds, kind, _ in events if kind == "first token")
+    print(f"time to first token {first_token:.3f}s vs full result {total:.3f}s "
+          f"({total - first_token:.3f}s earlier)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,29 @@
-from crewai import Crew, Task, LLM
+from crewai import Crew, Task
+from utils.llm_client import shared_llm
+from utils.metrics import watch_crew_tasks
 from agents.email_agent import email_agent
 from agents.calendar_agent import calendar_agent
 from agents.summary_agent import summary_agent
 from tasks.analyze_calendar import analyze_calendar
 from tasks.compose_briefing import compose_briefing
 from tasks.summarize_emails import summarize_emails
+from contextlib import contextmanager
+import threading
 import os
 
-# OpenRouter configuration using CrewAI LLM
-model_name = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
-api_key = os.getenv("OPENAI_API_KEY")  # OpenRouter key stored as OPENAI_API_KEY
-base_url = "https://openrouter.ai/api/v1"  # OpenRouter endpoint
+# Crews kept ready per worker; more are built on demand when all are in use
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "4"))
+# Agent reasoning echoed to stdout; headless runs (batch_briefings.py) turn it off
+CREW_VERBOSE = os.getenv("CREW_VERBOSE", "true").lower() == "true"
 
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable is required (contains OpenRouter key)")
+# OpenRouter LLM shared by every agent in this process (see utils/llm_client.py)
+llm = shared_llm()
 
-# CrewAI LLM configuration for OpenRouter
-llm = LLM(
-    model=f"openrouter/{model_name}",  # MODEL IDENTIFIER with openrouter/ prefix
-    api_key=api_key,                   # STORED IN .env as OPENAI_API_KEY
-    base_url=base_url                  # OPENROUTER ENDPOINT
-)
+if not llm:
+    raise ValueError("OPENAI_API_KEY environment variable is required (contains OpenRouter key)")
 
+# Template crew. Crew, Agent and Task objects keep per-run state, so kickoffs
+# run on copies leased from crew_pool rather than on this object.
 crew = Crew(
     agents=[email_agent, calendar_agent, summary_agent],
     tasks=[analyze_calendar,
@@ -30,5 +32,73 @@ crew = Crew(
         ],
     process="sequential",
     llm=llm,
-    verbose=True
-)
\ No newline at end of file
+    verbose=CREW_VERBOSE
+)
+for agent in crew.agents:
+    agent.verbose = agent.verbose and CREW_VERBOSE
+watch_crew_tasks()
+
+
+def build_crew():
+    """Independent copy of the template crew; the LLM objects stay shared"""
+    copy = crew.copy()
+    for copied, template in zip(copy.agents, crew.agents):
+        copied.llm = template.llm
+    for copied, template in zip(copy.tasks, crew.tasks):
+        # Task.copy() turns the default context (all previous outputs) into None,
+        # which would leave compose_briefing without the other summaries
+        if not isinstance(template.context, list):
+            copied.context = template.context
+    return copy
+
+
+class CrewPool:
+    """Pre-built crews, each leased to one kickoff at a time"""
+
+    def __init__(self, build=build_crew, size=CREW_POOL_SIZE):
+        self.build = build
+        self.size = size
+        self.built = 0
+        self.leased = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new_crew(self):
+        new_crew = self.build()
+        with self._lock:
+            self.built += 1
+        return new_crew
+
+    def warm_up(self):
+        """Fill the pool (called once per worker at boot)"""
+        while len(self._idle) < self.size:
+            new_crew = self._new_crew()
+            with self._lock:
+                self._idle.append(new_crew)
+
+    @contextmanager
+    def lease(self):
+        with self._lock:
+            leased = self._idle.pop() if self._idle else None
+            self.leased += 1
+        if leased is None:
+            leased = self._new_crew()
+        try:
+            yield leased
+        finally:
+            with self._lock:
+                self.leased -= 1
+                if len(self._idle) < self.size:
+                    self._idle.append(leased)
+
+    def clear(self):
+        """Drop idle crews, e.g. after changing the template's agents"""
+        with self._lock:
+            self._idle.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "in_use": self.leased, "built": self.built}
+
+
+crew_pool = CrewPool()
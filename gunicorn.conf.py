@@ -0,0 +1,83 @@
+"""
+Gunicorn settings. The serving mode is picked with SERVER_MODE:
+
+    sync     one request per worker process (the original setup)
+    gthread  GUNICORN_THREADS requests per worker on threads (default)
+    gevent   cooperative greenlets, GUNICORN_CONNECTIONS per worker (needs `pip install gevent`)
+    asgi     uvicorn workers running asgi.application with async /briefing, /api-status and /logs
+
+Worker startup:
+
+    GUNICORN_PRELOAD=true   import the app and CrewAI/litellm once in the master so
+                            workers share them copy-on-write; LLM clients, crews and
+                            background threads are still created in each worker
+    WORKER_WARMUP           when a worker builds its crew pool (and imports CrewAI
+                            if the master did not): "boot" before it accepts
+                            requests (default), "background" while it already
+                            serves, or "lazy" on the first briefing
+
+Use GUNICORN_PRELOAD rather than --preload: the app checks it to leave its
+background threads to post_worker_init.
+
+Usage: gunicorn -c gunicorn.conf.py
+"""
+import os
+import threading
+
+SERVER_MODE = os.getenv("SERVER_MODE", "gthread")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+wsgi_app = "app:app"
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+WORKER_WARMUP = os.getenv("WORKER_WARMUP", "boot")
+if WORKER_WARMUP not in ("boot", "background", "lazy"):
+    raise ValueError(f"Unknown WORKER_WARMUP {WORKER_WARMUP!r} (expected boot, background or lazy)")
+
+# Imported in the master with GUNICORN_PRELOAD. None of them opens a connection
+# or builds an LLM at import; crew.py (which builds the agents' LLMs) is not here.
+PRELOAD_MODULES = ("crewai", "litellm", "utils.llm_client", "utils.llm_cache", "utils.llm_router",
+                   "utils.briefing_stream", "utils.fused_briefing", "utils.template_llm")
+
+if SERVER_MODE == "sync":
+    worker_class = "sync"
+elif SERVER_MODE == "gthread":
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", "16"))
+elif SERVER_MODE == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("GUNICORN_CONNECTIONS", "1000"))
+elif SERVER_MODE == "asgi":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "asgi:application"
+else:
+    raise ValueError(f"Unknown SERVER_MODE {SERVER_MODE!r} (expected sync, gthread, gevent or asgi)")
+
+# Concurrent workers can afford to keep /logs responses open while waiting for new lines
+if SERVER_MODE in ("gthread", "gevent"):
+    os.environ.setdefault("LOG_STREAM_HOLD", "20")
+
+
+def when_ready(server):
+    """With preload, import the heavy libraries in the master before the first fork"""
+    if preload_app:
+        import importlib
+        for module in PRELOAD_MODULES:
+            importlib.import_module(module)
+
+
+def _warm_up():
+    from crew import crew_pool
+    crew_pool.warm_up()
+
+
+def post_worker_init(worker):
+    """Start the app's background threads (with preload) and build the crew pool per WORKER_WARMUP"""
+    if preload_app:
+        from app import start_background_services
+        start_background_services()
+    if WORKER_WARMUP == "boot":
+        _warm_up()
+    elif WORKER_WARMUP == "background":
+        threading.Thread(target=_warm_up, name="crew-warm-up", daemon=True).start()
@@ -0,0 +1,203 @@
+"""
+Briefing pipeline shared by the synchronous /briefing route and background jobs.
+
+Two engines write the briefing from the fetched inputs, picked per request
+("pipeline_mode" in the session data) or with PIPELINE_MODE:
+
+    crew   the three-task CrewAI crew (default)
+    fused  one structured LLM call, map-reduce for large inboxes (utils/fused_briefing.py)
+
+For a signed-in user, sections whose inputs did not change since the last
+briefing are reused instead of rewritten (utils/briefing_history.py).
+
+Stages, crew tasks and LLM calls are recorded in utils/metrics.py; with
+"timings" in the session data the result also lists them under "timings".
+
+The engines (and with them CrewAI and litellm) are imported when a briefing
+is first written, not with this module, so the web app starts without them.
+"""
+import os
+import time
+import logging
+
+from utils.ingestion import fetch_briefing_sources
+from utils.fast_path import plan_fast_path, templated_tasks, resolve_language, record
+from utils.briefing_history import (briefing_history, section_fingerprints, reusable_sections, SECTIONS,
+                                    BRIEFING_HISTORY_ENABLED, BRIEFING_HISTORY_REUSE_SECONDS)
+from utils.metrics import stage, count, trace_request, trace_crew
+from utils.scheduler import session_user_key
+from utils.upstream_monitor import upstream_monitor
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_MODES = ("crew", "fused")
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "crew")
+
+
+def _no_progress(message):
+    pass
+
+
+def _no_tokens(text):
+    pass
+
+
+def _no_restart():
+    pass
+
+
+def run_crew(inputs, progress, on_token, task_outputs=None, on_restart=_no_restart):
+    """Write the briefing with a crew leased from the pool; returns (briefing text, details).
+
+    `task_outputs` answers the named tasks without the LLM; details["sections"]
+    has every task's output.
+    """
+    from crew import crew_pool
+    from utils.briefing_stream import stream_crew
+    with crew_pool.lease() as crew, templated_tasks(crew, task_outputs or {}), \
+            stream_crew(crew, progress, on_token, on_restart), trace_crew(crew):
+        result = crew.kickoff(inputs=inputs)
+    logger.info(f"Crew Result type: {type(result)}")
+    return str(result), {"sections": {output.name: output.raw for output in result.tasks_output}}
+
+
+def run_briefing(session_data, progress=_no_progress, on_token=_no_tokens, on_restart=_no_restart):
+    """Fetch the user's email and calendar data and write the briefing with the selected engine.
+
+    `session_data` is a plain copy of the Flask session (it is used outside the
+    request context). Task completions are reported through `progress` and the
+    final briefing is streamed to `on_token` as it is generated; `on_restart`
+    means the text streamed so far is void (a model failed mid-answer and
+    another one is writing it again). Returns the JSON-serializable response body.
+    """
+    if not session_data.get("timings"):
+        return _run_briefing(session_data, progress, on_token, on_restart)
+    with trace_request() as trace:
+        result = _run_briefing(session_data, progress, on_token, on_restart)
+    result["timings"] = list(trace)
+    return result
+
+
+def _run_briefing(session_data, progress, on_token, on_restart):
+    inputs, ingestion = fetch_inputs(session_data, progress)
+    return write_briefing(session_data, inputs, ingestion, progress, on_token, on_restart)
+
+
+def fetch_inputs(session_data, progress=_no_progress):
+    """Ingestion phase of run_briefing: returns (inputs, ingestion report)"""
+    progress("Reading your emails and calendar")
+    logger.info("Fetching email and calendar data concurrently...")
+    with stage("ingestion"):
+        inputs, ingestion = fetch_briefing_sources(session_data)
+    email_summary = inputs["emails_data"]
+    calendar_summary = inputs["calendar_data"]
+    logger.info(f"Ingestion completed in {ingestion['wall_seconds']:.2f}s "
+                f"(sequential would be ~{ingestion['sequential_seconds']:.2f}s)")
+
+    logger.info("🟡 EMAIL SUMMARY INPUT TO AGENT:")
+    logger.info(email_summary[:500] + "..." if len(email_summary) > 500 else email_summary)
+
+    logger.info("🔵 CALENDAR SUMMARY INPUT TO AGENT:")
+    logger.info(calendar_summary)
+    return inputs, ingestion
+
+
+def write_briefing(session_data, inputs, ingestion, progress=_no_progress, on_token=_no_tokens,
+                   on_restart=_no_restart):
+    """Generation phase of run_briefing: writes the briefing from fetch_inputs() results"""
+    mode = session_data.get("pipeline_mode") or PIPELINE_MODE
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode {mode!r} (expected one of {', '.join(PIPELINE_MODES)})")
+
+    language = resolve_language(session_data)
+    plan = plan_fast_path(inputs, ingestion, language)
+    if plan is not None and mode == "fused" and not plan.skipped_crew:
+        plan = None  # one call either way; templated task answers would not save any
+    record(plan)
+    if plan is not None and plan.skipped_crew:
+        logger.info("Nothing to analyze, using the templated briefing")
+        on_token(plan.briefing)
+        count("briefings_total", mode="template")
+        return {
+            "briefing": plan.briefing,
+            "processing_time": "0.00s",
+            "time_to_first_token": "0.00s",
+            "ingestion": ingestion,
+            "warnings": ingestion.pop("warnings"),
+            "fast_path": plan.report(),
+            "pipeline": {"mode": "template"}
+        }
+
+    user_key = session_user_key(session_data)
+    history = briefing_history() if BRIEFING_HISTORY_ENABLED and user_key else None
+    reused = {}
+    if history is not None:
+        fingerprints = section_fingerprints(inputs, mode, language)
+        reused = reusable_sections(history.latest(user_key, BRIEFING_HISTORY_REUSE_SECONDS), fingerprints)
+    if "compose_briefing" in reused:
+        logger.info("Emails and calendar unchanged since the last briefing, reusing it")
+        on_token(reused["compose_briefing"])
+        for task in reused:
+            count("briefing_sections_total", task=task, result="reused")
+        return {
+            "briefing": reused["compose_briefing"],
+            "processing_time": "0.00s",
+            "time_to_first_token": "0.00s",
+            "ingestion": ingestion,
+            "warnings": ingestion.pop("warnings"),
+            "fast_path": plan.report() if plan else None,
+            "pipeline": {"mode": mode, "reused_sections": sorted(reused)}
+        }
+
+    # Templated and reused briefings need no LLM; anything else fails fast while the provider is down
+    upstream_monitor.check()
+    progress("Analyzing your emails and calendar")
+    logger.info(f"Starting briefing generation ({mode} engine)...")
+    if plan is not None:
+        logger.info(f"Fast path: templated answers for {', '.join(sorted(plan.task_outputs))}")
+    if reused and mode == "crew":
+        logger.info(f"Unchanged since the last briefing, reusing {', '.join(sorted(reused))}")
+    else:
+        reused = {}  # the fused engine writes the briefing in one piece
+    start_time = time.time()
+    first_token_at = None
+
+    def forward_token(text):
+        nonlocal first_token_at
+        if first_token_at is None:
+            first_token_at = time.time()
+            progress("Writing your briefing")
+        on_token(text)
+
+    with stage(mode):
+        if mode == "fused":
+            from utils.fused_briefing import run_fused
+            briefing, details = run_fused(inputs, progress, forward_token, on_restart)
+        else:
+            templated = plan.task_outputs if plan else {}
+            briefing, details = run_crew(inputs, progress, forward_token, {**reused, **templated}, on_restart)
+    count("briefings_total", mode=mode)
+    sections = details.pop("sections", {"compose_briefing": briefing})
+    for task in sections:
+        outcome = "reused" if task in reused else "templated" if plan and task in plan.task_outputs else "written"
+        count("briefing_sections_total", task=task, result=outcome)
+    if history is not None:
+        history.record(user_key, mode, briefing, {
+            task: {"fingerprint": fingerprints[task], "output": output, "reused": task in reused,
+                   "input": inputs[SECTIONS[task][0]] if SECTIONS[task][0] else None}
+            for task, output in sections.items()
+        })
+
+    processing_time = time.time() - start_time
+    logger.info(f"Briefing generation completed in {processing_time:.2f} seconds")
+    logger.info(f"Briefing: {briefing[:500]}...")
+
+    return {
+        "briefing": briefing,
+        "processing_time": f"{processing_time:.2f}s",
+        "time_to_first_token": f"{first_token_at - start_time:.2f}s" if first_token_at else None,
+        "ingestion": ingestion,
+        "warnings": ingestion.pop("warnings"),
+        "fast_path": plan.report() if plan else None,
+        "pipeline": {"mode": mode, **details, **({"reused_sections": sorted(reused)} if reused else {})}
+    }
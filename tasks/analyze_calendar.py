@@ -3,9 +3,9 @@ from agents.calendar_agent import calendar_agent
 
 analyze_calendar = Task(
     name="analyze_calendar",
-    description="Analyze today's calendar events from the list below:\n\n {calendar_data}. Events can be both in eglish or spanish.",
+    description="Analyze today's calendar events from the list below:\n\n {calendar_data}\n\nThe overlapping events and free time gaps are precomputed and correct. Events can be both in eglish or spanish.",
     agent=calendar_agent,
-    expected_output="A list of today's events",
+    expected_output="A list of today's events, followed by any overlapping events and the free time gaps",
     async_execution=True,
     verbose=True
 )
\ No newline at end of file
@@ -46,7 +46,7 @@ def test_openrouter_integration():
         
         # Create inputs for the crew
         inputs = {
-            "email_data": sample_emails,
+            "emails_data": sample_emails,
             "calendar_data": sample_calendar,
             "user_name": "Test User"
         }
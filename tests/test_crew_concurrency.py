@@ -0,0 +1,52 @@
+"""Simultaneous kickoffs on leased crews (see benchmarks/crew_concurrency.py): no run sees another run's inputs"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-test")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crew import crew, crew_pool
+from utils.briefing_stream import stream_crew
+from utils.stub_llm import StubLLM
+
+MARKER = re.compile(r"RUN-\d+")
+RUNS = 8
+
+
+def echo_markers(messages):
+    prompt = "\n".join(m.get("content", "") for m in messages)
+    return "markers: " + " ".join(sorted(set(MARKER.findall(prompt))))
+
+
+def run(n):
+    tokens = []
+    inputs = {"emails_data": f"Invoice from RUN-{n} due Friday.",
+              "calendar_data": f"09:00 Standup for RUN-{n}"}
+    with crew_pool.lease() as leased, stream_crew(leased, lambda message: None, tokens.append):
+        result = leased.kickoff(inputs=inputs)
+    return n, str(result), "".join(tokens)
+
+
+@pytest.fixture
+def stub_crew():
+    saved = [(agent, agent.llm, agent.verbose) for agent in crew.agents]
+    for agent in crew.agents:
+        agent.llm = StubLLM(latency=0.05, reply=echo_markers, stream=agent.llm.stream)
+        agent.verbose = False
+    crew_pool.clear()
+    yield
+    for agent, llm, verbose in saved:
+        agent.llm, agent.verbose = llm, verbose
+    crew_pool.clear()
+
+
+def test_concurrent_kickoffs_keep_their_own_inputs(stub_crew):
+    with ThreadPoolExecutor(max_workers=RUNS) as executor:
+        results = list(executor.map(run, range(RUNS)))
+
+    for n, result, streamed in results:
+        assert set(MARKER.findall(result)) == {f"RUN-{n}"}
+        assert set(MARKER.findall(streamed)) == {f"RUN-{n}"}
@@ -0,0 +1,107 @@
+"""Incremental Gmail sync (utils/gmail_sync.py) against the fake Gmail history API"""
+import pytest
+
+from utils.fake_google import FakeGmailHttp, build_fake_gmail_service
+from utils.gmail_sync import MailboxStore, sync_mailbox
+
+MAX_RESULTS = 10
+
+
+def inbox(fake, max_results=MAX_RESULTS):
+    """(id, labels) of the newest INBOX messages on the fake server"""
+    messages = sorted((m for m in fake.messages if "INBOX" in m["labelIds"]),
+                      key=lambda m: int(m["internalDate"]), reverse=True)
+    return [(m["id"], sorted(m["labelIds"])) for m in messages[:max_results]]
+
+
+def synced(messages):
+    return [(m["id"], sorted(m["labelIds"])) for m in messages]
+
+
+@pytest.fixture
+def fake():
+    return FakeGmailHttp(message_count=30)
+
+
+@pytest.fixture
+def sync(fake, tmp_path):
+    service = build_fake_gmail_service(fake)
+    store = MailboxStore(str(tmp_path / "gmail_sync.db"))
+
+    def run():
+        fake.reset_counters()
+        return sync_mailbox(service, "test-user", store=store, max_results=MAX_RESULTS)
+
+    return run
+
+
+def test_first_sync_is_full(fake, sync):
+    messages, report = sync()
+    assert report["mode"] == "full"
+    assert synced(messages) == inbox(fake)
+
+
+def test_unchanged_mailbox_costs_one_history_call(fake, sync):
+    sync()
+    messages, report = sync()
+    assert report == {"mode": "incremental", "history_records": 0, "fetched": 0, "removed": 0}
+    assert fake.round_trips == 1
+    assert synced(messages) == inbox(fake)
+
+
+def test_new_messages_are_fetched_incrementally(fake, sync):
+    sync()
+    new = [fake.add_message()["id"] for _ in range(3)]
+    messages, report = sync()
+    assert report["mode"] == "incremental"
+    assert report["fetched"] == 3
+    assert [m["id"] for m in messages[:3]] == new[::-1]
+    assert synced(messages) == inbox(fake)
+
+
+def test_label_changes_are_applied(fake, sync):
+    sync()
+    read, archived = fake.messages[0]["id"], fake.messages[1]["id"]
+    fake.mark_read(read)
+    messages, report = sync()
+    assert report["mode"] == "incremental"
+    assert report["fetched"] == 0
+    assert "UNREAD" not in next(m for m in messages if m["id"] == read)["labelIds"]
+    assert synced(messages) == inbox(fake)
+
+    # Leaving the INBOX is a removal, and the gap below is refilled
+    fake.archive_message(archived)
+    messages, report = sync()
+    assert report["mode"] == "refill"
+    assert archived not in [m["id"] for m in messages]
+    assert synced(messages) == inbox(fake)
+
+    fake.restore_message(archived)
+    messages, report = sync()
+    assert report["mode"] == "incremental"
+    assert archived in [m["id"] for m in messages]
+    assert synced(messages) == inbox(fake)
+
+
+def test_deleted_message_is_removed_and_the_gap_refilled(fake, sync):
+    sync()
+    deleted = fake.messages[2]["id"]
+    fake.delete_message(deleted)
+    messages, report = sync()
+    assert report["mode"] == "refill"
+    assert deleted not in [m["id"] for m in messages]
+    assert len(messages) == MAX_RESULTS
+    assert synced(messages) == inbox(fake)
+
+
+def test_expired_history_id_triggers_full_resync(fake, sync):
+    sync()
+    new = fake.add_message()["id"]
+    fake.expire_history()
+    messages, report = sync()
+    assert report["mode"] == "resync"
+    assert messages[0]["id"] == new
+    assert synced(messages) == inbox(fake)
+
+    _, report = sync()
+    assert report["mode"] == "incremental"
@@ -0,0 +1,142 @@
+"""Fallback and hedged calls of utils/llm_router.py with scripted models: what reaches the caller's stream"""
+import time
+import threading
+
+import pytest
+
+from utils import llm_router
+from utils.briefing_stream import current_sink, stream_llm, FINAL_ANSWER
+from utils.llm_router import RoutedLLM
+
+MESSAGES = [{"role": "user", "content": "Write the briefing"}]
+
+
+class ScriptedLLM:
+    """Stands in for a model's CachedLLM: streams `chunks` (after `delay` seconds each), then fails or answers"""
+
+    def __init__(self, model, chunks, delay=0.0, first_delay=None, fail=False):
+        self.model = model
+        self.stream = True
+        self.stop = None
+        self.chunks = chunks
+        self.delay = delay
+        self.first_delay = delay if first_delay is None else first_delay
+        self.fail = fail
+        self.calls = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        self.calls += 1
+        sink = current_sink()
+        for n, chunk in enumerate(self.chunks):
+            time.sleep(self.first_delay if n == 0 else self.delay)
+            if sink is not None:
+                sink.feed(chunk)
+        if self.fail:
+            raise RuntimeError(f"{self.model} dropped the connection")
+        return "".join(self.chunks)
+
+
+class Page:
+    """What a viewer of the stream ends up showing"""
+
+    def __init__(self):
+        self.text = ""
+        self.restarts = 0
+        self._lock = threading.Lock()
+
+    def on_token(self, text):
+        with self._lock:
+            self.text += text
+
+    def on_restart(self):
+        with self._lock:
+            self.text = ""
+            self.restarts += 1
+
+
+def answer(*words):
+    return [f"Thought: writing it\n{FINAL_ANSWER} "] + [f"{word} " for word in words]
+
+
+def run(router):
+    page = Page()
+    with stream_llm(page.on_token, page.on_restart):
+        response = router.call(MESSAGES)
+    return response, page
+
+
+def outcomes(router, model):
+    return {k: v for k, v in router.stats()["outcomes"][model].items() if v}
+
+
+@pytest.fixture(autouse=True)
+def quick_hedges(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_INITIAL_SECONDS", 0.02)
+
+
+def test_fallback_after_a_failure_mid_answer_restarts_the_stream():
+    primary = ScriptedLLM("test/primary", answer("Good", "morn"), fail=True)
+    backup = ScriptedLLM("test/backup", answer("Good", "morning", "Ana"))
+    router = RoutedLLM("test", [primary, backup], hedge=False)
+
+    response, page = run(router)
+    assert response == "".join(backup.chunks)
+    assert page.text == "Good morning Ana "
+    assert page.restarts == 1
+    assert outcomes(router, "test/primary") == {"failed": 1}
+    assert outcomes(router, "test/backup") == {"fallback": 1}
+
+
+def test_fallback_before_any_output_needs_no_restart():
+    primary = ScriptedLLM("test/primary", [], fail=True)
+    backup = ScriptedLLM("test/backup", answer("Hello"))
+    response, page = run(RoutedLLM("test", [primary, backup], hedge=False))
+    assert page.text == "Hello "
+    assert page.restarts == 0
+
+
+def test_preamble_of_a_failed_attempt_is_not_shown():
+    primary = ScriptedLLM("test/primary", ["Thought: half a"], fail=True)
+    backup = ScriptedLLM("test/backup", answer("Hello"))
+    response, page = run(RoutedLLM("test", [primary, backup], hedge=False))
+    assert page.text == "Hello "
+    assert page.restarts == 0
+
+
+def test_hedge_winner_alone_reaches_the_stream():
+    primary = ScriptedLLM("test/primary", answer("slow", "answer"), first_delay=0.4)
+    backup = ScriptedLLM("test/backup", answer("quick", "answer"), delay=0.01)
+    router = RoutedLLM("test", [primary, backup], hedge=True)
+
+    response, page = run(router)
+    assert response == "".join(backup.chunks)
+    assert page.text == "quick answer "
+    assert page.restarts == 0
+    assert router.stats()["hedges"] == 1
+    assert outcomes(router, "test/backup") == {"hedge": 1}
+    time.sleep(0.5)  # the loser finishes in the background
+
+
+def test_leader_failing_hands_over_to_the_running_hedge():
+    # The primary starts streaming after the hedge deadline, then fails while the backup is still writing
+    primary = ScriptedLLM("test/primary", answer("A1", "A2", "A3"), first_delay=0.05, delay=0.1, fail=True)
+    backup = ScriptedLLM("test/backup", answer("B1", "B2", "B3", "B4", "B5", "B6"), first_delay=0.2, delay=0.05)
+    router = RoutedLLM("test", [primary, backup], hedge=True)
+
+    response, page = run(router)
+    assert response == "".join(backup.chunks)
+    assert page.text == "B1 B2 B3 B4 B5 B6 "
+    assert page.restarts == 1
+    assert outcomes(router, "test/primary") == {"failed": 1}
+    assert outcomes(router, "test/backup") == {"hedge": 1}
+
+
+def test_leader_failing_after_the_hedge_finished_replays_the_hedge():
+    primary = ScriptedLLM("test/primary", answer("A1", "A2", "A3", "A4"), first_delay=0.05, delay=0.15, fail=True)
+    backup = ScriptedLLM("test/backup", answer("B1", "B2"), first_delay=0.2, delay=0.01)
+    router = RoutedLLM("test", [primary, backup], hedge=True)
+
+    response, page = run(router)
+    assert response == "".join(backup.chunks)
+    assert page.text == "B1 B2 "
+    assert page.restarts == 1
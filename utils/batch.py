@@ -0,0 +1,263 @@
+"""
+Headless briefing generation for a roster of users (batch_briefings.py).
+
+Users are identified by their key in the credential store, so anyone who has
+signed in once (and whose refresh token is still valid) can be briefed
+without a browser session. Each user goes through the pipeline's two phases
+with separate limits:
+
+    fetch      Gmail and Calendar ingestion on BATCH_FETCH_WORKERS threads,
+               running ahead of generation so LLM slots never wait for Google
+    generate   the briefing itself, at most BATCH_CONCURRENCY at a time across
+               all processes, and started no faster than BATCH_RATE_PER_MINUTE
+               (bursts of BATCH_BURST) to stay under the provider's rate limit
+
+Results are written as <user_key>.json to an output directory and/or to the
+briefing store that /briefing serves precomputed briefings from. Progress is
+kept in a SQLite file: a rerun skips users that are done and retries the ones
+that failed, and the per-user report lists the failing stage and error.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import fetch_inputs, write_briefing
+from utils.credential_store import credential_store
+from utils.log_stream import log_context
+
+logger = logging.getLogger(__name__)
+
+BATCH_FETCH_WORKERS = int(os.getenv("BATCH_FETCH_WORKERS", "8"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# 0 disables the rate limit
+BATCH_RATE_PER_MINUTE = float(os.getenv("BATCH_RATE_PER_MINUTE", "0"))
+BATCH_BURST = float(os.getenv("BATCH_BURST", "4"))
+BATCH_PROGRESS_DB_PATH = os.getenv("BATCH_PROGRESS_DB_PATH", "/tmp/briefing_batch.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    user_key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    stage TEXT,
+    error TEXT,
+    seconds REAL,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_bucket (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def load_roster(path):
+    """Session data for each user listed in `path`.
+
+    One user per line: either a bare user key or a JSON object with "user_key"
+    and optional session fields ("language", "pipeline_mode"). Blank lines and
+    lines starting with # are ignored; a user listed twice is briefed once.
+    """
+    roster = {}
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"user_key": line}
+            if not entry.get("user_key"):
+                raise ValueError(f"{path}:{number}: missing user_key")
+            roster.setdefault(entry["user_key"], entry)
+    return list(roster.values())
+
+
+class ProgressStore:
+    """Per-user outcome of a batch plus the generation rate bucket, shared by its processes"""
+
+    def __init__(self, path=BATCH_PROGRESS_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def completed(self):
+        with closing(self._connect()) as conn:
+            return {row["user_key"] for row in conn.execute("SELECT user_key FROM progress WHERE status = 'done'")}
+
+    def record(self, user_key, status, stage=None, error=None, seconds=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO progress (user_key, status, attempts, stage, error, seconds, finished_at) "
+                "VALUES (?, ?, 1, ?, ?, ?, ?) ON CONFLICT(user_key) DO UPDATE SET status = excluded.status, "
+                "attempts = attempts + 1, stage = excluded.stage, error = excluded.error, "
+                "seconds = excluded.seconds, finished_at = excluded.finished_at",
+                (user_key, status, stage, error, seconds, time.time())
+            )
+
+    def report(self, user_keys=None):
+        """Progress rows as dicts, limited to `user_keys` when given"""
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for row in conn.execute("SELECT * FROM progress ORDER BY user_key")]
+        if user_keys is not None:
+            wanted = set(user_keys)
+            rows = [row for row in rows if row["user_key"] in wanted]
+        return rows
+
+    def take_token(self, rate_per_minute, burst, now=None):
+        """Take one token from the rate bucket; returns 0, or the seconds to wait when it is empty"""
+        now = now or time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            bucket = conn.execute("SELECT tokens, updated_at FROM rate_bucket WHERE id = 1").fetchone()
+            tokens = burst if bucket is None else min(
+                burst, bucket["tokens"] + (now - bucket["updated_at"]) * rate_per_minute / 60
+            )
+            wait = 0 if tokens >= 1 else (1 - tokens) * 60 / rate_per_minute
+            if not wait:
+                tokens -= 1
+            conn.execute(
+                "INSERT INTO rate_bucket (id, tokens, updated_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return wait
+
+
+class BatchRunner:
+    """Briefs a roster in this process; `slots` may be shared with other processes"""
+
+    def __init__(self, progress, out_dir=None, briefing_store=None, fetch_workers=BATCH_FETCH_WORKERS,
+                 concurrency=BATCH_CONCURRENCY, rate_per_minute=BATCH_RATE_PER_MINUTE, burst=BATCH_BURST,
+                 slots=None):
+        if out_dir is None and briefing_store is None:
+            raise ValueError("Batch results need an output directory or a briefing store")
+        self.progress = progress
+        self.out_dir = out_dir
+        self.briefing_store = briefing_store
+        self.fetch_workers = fetch_workers
+        self.concurrency = concurrency
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.slots = slots or threading.BoundedSemaphore(concurrency)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def run(self, roster, force=False):
+        """Brief every user of `roster` not already done (all of them with `force`); returns counts"""
+        done = set() if force else self.progress.completed()
+        pending = [entry for entry in roster if entry["user_key"] not in done]
+        logger.info(f"Batch: {len(pending)} users to brief, {len(roster) - len(pending)} already done")
+        start = time.perf_counter()
+        # Users beyond the generation slots are fetched ahead, so a slot that frees up starts at once
+        with ThreadPoolExecutor(max_workers=self.fetch_workers + self.concurrency,
+                                thread_name_prefix="batch") as executor:
+            outcomes = list(executor.map(self._brief, pending))
+        return {"done": outcomes.count(True), "failed": outcomes.count(False),
+                "skipped": len(roster) - len(pending), "seconds": round(time.perf_counter() - start, 3)}
+
+    def _wait_for_rate(self):
+        if self.rate_per_minute <= 0:
+            return
+        while wait := self.progress.take_token(self.rate_per_minute, self.burst):
+            time.sleep(wait)
+
+    def _brief(self, entry):
+        user_key = entry["user_key"]
+        # Roster fields win over the language and engine of the user's last on-demand briefing
+        session_data = {**credential_store().preferences(user_key), **entry, "timings": False}
+        step = "credentials"
+        start = time.perf_counter()
+        try:
+            with log_context(f"batch-{user_key}"):
+                if credential_store().get(user_key) is None:
+                    raise RuntimeError("No stored Google credentials, the user has to sign in again")
+                step = "fetch"
+                inputs, ingestion = fetch_inputs(session_data)
+                step = "generate"
+                with self.slots:
+                    self._wait_for_rate()
+                    result = write_briefing(session_data, inputs, ingestion)
+                step = "save"
+                self._save(user_key, result)
+        except Exception as e:
+            seconds = round(time.perf_counter() - start, 3)
+            logger.error(f"Batch briefing for {user_key} failed at {step}: {e}")
+            self.progress.record(user_key, "failed", stage=step, error=str(e), seconds=seconds)
+            return False
+        seconds = round(time.perf_counter() - start, 3)
+        self.progress.record(user_key, "done", seconds=seconds)
+        logger.info(f"Batch briefing for {user_key} ready in {seconds:.2f}s")
+        return True
+
+    def _save(self, user_key, result):
+        generated_at = result["ingestion"].get("started_at") or time.time()
+        if self.briefing_store is not None:
+            self.briefing_store.save_briefing(user_key, result, "batch", generated_at)
+        if self.out_dir:
+            path = os.path.join(self.out_dir, f"{os.path.basename(user_key)}.json")
+            with open(path + ".tmp", "w") as f:
+                json.dump({"user_key": user_key, "generated_at": generated_at, **result}, f, indent=2)
+            os.replace(path + ".tmp", path)
+
+
+def _run_shard(roster, options, slots):
+    from utils.scheduler import ScheduleStore
+    briefing_store = ScheduleStore() if options.pop("store") else None
+    progress = ProgressStore(options.pop("progress_path"))
+    BatchRunner(progress, briefing_store=briefing_store, slots=slots, **options).run(roster, force=True)
+
+
+def run_batch(roster, progress_path=BATCH_PROGRESS_DB_PATH, out_dir=None, store=False, processes=1,
+              force=False, **options):
+    """Brief `roster` on `processes` processes sharing one concurrency limit and rate bucket.
+
+    `options` are passed to BatchRunner. Returns (counts, per-user report).
+    """
+    progress = ProgressStore(progress_path)
+    done = set() if force else progress.completed()
+    pending = [entry for entry in roster if entry["user_key"] not in done]
+    start = time.perf_counter()
+    processes = min(processes, len(pending))
+    if processes == 1:
+        from utils.scheduler import ScheduleStore
+        runner = BatchRunner(progress, out_dir=out_dir, briefing_store=ScheduleStore() if store else None, **options)
+        runner.run(pending, force=True)
+    elif processes > 1:
+        # Spawned rather than forked: the parent may already hold LLM client and SQLite state
+        context = multiprocessing.get_context("spawn")
+        slots = context.BoundedSemaphore(options.get("concurrency", BATCH_CONCURRENCY))
+        workers = [
+            context.Process(target=_run_shard, name=f"batch-{n}", args=(
+                pending[n::processes], {**options, "out_dir": out_dir, "store": store,
+                                        "progress_path": progress_path}, slots))
+            for n in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    report = progress.report(entry["user_key"] for entry in roster)
+    statuses = [row["status"] for row in report]
+    counts = {"users": len(roster), "done": statuses.count("done"), "failed": statuses.count("failed"),
+              "skipped": len(roster) - len(pending), "seconds": round(time.perf_counter() - start, 3)}
+    return counts, report
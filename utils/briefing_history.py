@@ -0,0 +1,196 @@
+"""
+Per-user briefing history and section-level reuse on refresh.
+
+A crew briefing has three sections, one per task:
+
+    analyze_calendar   written from the calendar input
+    summarize_emails   written from the email input
+    compose_briefing   written from the two sections above
+
+Every briefing written for a signed-in user is stored with each section's
+input, output and fingerprint: a hash of everything the section depends on
+(its input or the fingerprints it is composed from, the engine, the agent's
+models and the language). On the next refresh, a section whose fingerprint
+matches the previous briefing's is not sent to the LLM again; its previous
+output is reused. With an unchanged calendar only the email summary and the
+composition are rewritten; with neither source changed, the previous briefing
+is returned without any LLM call. Reuse only looks back
+BRIEFING_HISTORY_REUSE_SECONDS, and SECTION_VERSION is part of every
+fingerprint so that changing a task's prompt invalidates old sections.
+
+The fused engine writes no intermediate sections, so it can only reuse the
+whole briefing. The last BRIEFING_HISTORY_KEEP entries per user also answer
+"what changed since this morning" (changes_since(), /briefing/history).
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+BRIEFING_HISTORY_ENABLED = os.getenv("BRIEFING_HISTORY_ENABLED", "true").lower() == "true"
+BRIEFING_HISTORY_DB_PATH = os.getenv("BRIEFING_HISTORY_DB_PATH", "/tmp/briefing_history.db")
+BRIEFING_HISTORY_KEEP = int(os.getenv("BRIEFING_HISTORY_KEEP", "50"))
+BRIEFING_HISTORY_REUSE_SECONDS = float(os.getenv("BRIEFING_HISTORY_REUSE_SECONDS", "43200"))
+
+# Bump when a task's prompt changes, so sections written with the old one are not reused
+SECTION_VERSION = 1
+
+# Section -> (input it is written from, agent writing it)
+SECTIONS = {
+    "analyze_calendar": ("calendar_data", "calendar"),
+    "summarize_emails": ("emails_data", "email"),
+    "compose_briefing": (None, "summary"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_key TEXT NOT NULL,
+    generated_at REAL NOT NULL,
+    mode TEXT NOT NULL,
+    briefing TEXT NOT NULL,
+    sections TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_by_user ON history (user_key, generated_at);
+"""
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()[:24]
+
+
+def section_fingerprints(inputs, mode, language):
+    """Fingerprint of each section for these inputs (see module docstring)"""
+    from utils.llm_router import agent_models
+    fingerprints = {}
+    for task, (source, agent) in SECTIONS.items():
+        if source is not None:
+            fingerprints[task] = _digest(SECTION_VERSION, task, mode, language, agent_models(agent), inputs[source])
+    fingerprints["compose_briefing"] = _digest(
+        SECTION_VERSION, "compose_briefing", mode, language, agent_models("summary"),
+        fingerprints["analyze_calendar"], fingerprints["summarize_emails"]
+    )
+    return fingerprints
+
+
+def reusable_sections(previous, fingerprints):
+    """Outputs of the previous entry's sections whose fingerprint is unchanged"""
+    if previous is None:
+        return {}
+    return {task: section["output"] for task, section in previous["sections"].items()
+            if fingerprints.get(task) == section["fingerprint"]}
+
+
+def _changed_lines(before, after):
+    before_lines, after_lines = set(before.splitlines()), set(after.splitlines())
+    return ([line for line in after.splitlines() if line.strip() and line not in before_lines],
+            [line for line in before.splitlines() if line.strip() and line not in after_lines])
+
+
+class BriefingHistory:
+    """SQLite history of each user's briefings and their sections, shared by all workers"""
+
+    def __init__(self, path=BRIEFING_HISTORY_DB_PATH, keep=BRIEFING_HISTORY_KEEP):
+        self.path = path
+        self.keep = keep
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        try:
+            os.chmod(path, 0o600)  # holds users' email and calendar summaries
+        except OSError:
+            pass
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _entry(row):
+        return {"id": row["id"], "generated_at": row["generated_at"], "mode": row["mode"],
+                "briefing": row["briefing"], "sections": json.loads(row["sections"])}
+
+    def record(self, user_key, mode, briefing, sections):
+        """Store a briefing; `sections` maps task -> {"fingerprint", "input", "output", "reused"}"""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO history (user_key, generated_at, mode, briefing, sections) VALUES (?, ?, ?, ?, ?)",
+                (user_key, time.time(), mode, briefing, json.dumps(sections))
+            )
+            conn.execute(
+                "DELETE FROM history WHERE user_key = ? AND id NOT IN "
+                "(SELECT id FROM history WHERE user_key = ? ORDER BY id DESC LIMIT ?)",
+                (user_key, user_key, self.keep)
+            )
+
+    def latest(self, user_key, max_age=None):
+        """The user's newest entry, or None if there is none (younger than `max_age` seconds)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM history WHERE user_key = ? AND generated_at >= ? ORDER BY id DESC LIMIT 1",
+                (user_key, time.time() - max_age if max_age else 0)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def entries(self, user_key, limit=20):
+        """The user's newest entries, without section inputs and outputs"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM history WHERE user_key = ? ORDER BY id DESC LIMIT ?",
+                                (user_key, limit)).fetchall()
+        entries = []
+        for row in rows:
+            entry = self._entry(row)
+            entry["sections"] = {task: {"fingerprint": section["fingerprint"], "reused": section["reused"]}
+                                 for task, section in entry["sections"].items()}
+            entries.append(entry)
+        return entries
+
+    def changes_since(self, user_key, since):
+        """What changed between the last briefing at or before `since` (epoch seconds) and the newest.
+
+        Per section: whether it changed, its output then and now and, for
+        sections written from a source, the input lines added and removed.
+        None when there is no briefing from before `since`.
+        """
+        with closing(self._connect()) as conn:
+            before = conn.execute(
+                "SELECT * FROM history WHERE user_key = ? AND generated_at <= ? ORDER BY id DESC LIMIT 1",
+                (user_key, since)
+            ).fetchone()
+        after = self.latest(user_key)
+        if before is None or after is None:
+            return None
+        before = self._entry(before)
+        sections = {}
+        for task, section in after["sections"].items():
+            previous = before["sections"].get(task)
+            changed = previous is None or previous["fingerprint"] != section["fingerprint"]
+            sections[task] = {"changed": changed,
+                              "before": previous["output"] if previous else None, "after": section["output"]}
+            if changed and previous and section.get("input") is not None:
+                added, removed = _changed_lines(previous.get("input") or "", section["input"])
+                sections[task].update(added=added, removed=removed)
+        return {"from": {"id": before["id"], "generated_at": before["generated_at"]},
+                "to": {"id": after["id"], "generated_at": after["generated_at"]},
+                "changed": [task for task, section in sections.items() if section["changed"]],
+                "sections": sections}
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def briefing_history():
+    """Process-wide BriefingHistory, opened on first use"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = BriefingHistory()
+        return _history
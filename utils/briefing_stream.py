@@ -0,0 +1,164 @@
+"""
+Live progress and token streaming out of a running crew.
+
+CrewAI reports task starts/completions and streamed LLM chunks on its global
+event bus. The handlers below route those events to the sink registered for
+the crew being run (see stream_crew), so each briefing job only sees its own
+events:
+
+    task completions -> on_progress("Calendar analysis done")
+    chunks of the compose_briefing answer -> on_token(text)
+
+Only the final answer is forwarded: the agent's "Thought: ..." preamble is
+buffered and dropped until the "Final Answer:" marker has been seen.
+stream_llm() does the same for LLM calls made outside a crew, and
+redirect_chunks() hands a thread's chunks to another sink.
+
+When a model fails mid-answer and another one writes it again (see
+utils/llm_router.py), the sink is restarted: on_restart() tells the
+consumer to drop the text it has received so far.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.task_events import TaskStartedEvent, TaskCompletedEvent
+from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+
+logger = logging.getLogger(__name__)
+
+STREAMED_TASKS = {"compose_briefing"}
+TASK_LABELS = {
+    "analyze_calendar": "Calendar analysis done",
+    "summarize_emails": "Email summary done",
+    "compose_briefing": "Briefing written",
+}
+FINAL_ANSWER = "Final Answer:"
+
+_sinks = {}  # id(crew) -> _Sink
+_sinks_lock = threading.Lock()
+_current = threading.local()  # .sink while a streamed task runs on this thread
+
+
+def _no_restart():
+    pass
+
+
+class _Sink:
+    def __init__(self, on_progress, on_token, on_restart=_no_restart):
+        self.on_progress = on_progress
+        self.on_token = on_token
+        self.on_restart = on_restart
+        self.pending = ""
+        self.answering = False
+        self.emitted = False
+
+    def reset(self):
+        self.pending = ""
+        self.answering = False
+        self.emitted = False
+
+    def restart(self):
+        """Start the answer over, retracting any tokens already forwarded"""
+        emitted = self.emitted
+        self.reset()
+        if emitted:
+            self.on_restart()
+
+    def _emit(self, text):
+        self.emitted = True
+        self.on_token(text)
+
+    def feed(self, chunk):
+        if self.answering:
+            self._emit(chunk)
+            return
+        self.pending += chunk
+        marker = self.pending.find(FINAL_ANSWER)
+        if marker >= 0:
+            self.answering = True
+            answer = self.pending[marker + len(FINAL_ANSWER):].lstrip()
+            self.pending = ""
+            if answer:
+                self._emit(answer)
+
+
+def _sink_for(task):
+    crew = getattr(getattr(task, "agent", None), "crew", None)
+    with _sinks_lock:
+        return _sinks.get(id(crew))
+
+
+def _on_task_started(source, event):
+    sink = _sink_for(event.task)
+    if sink and event.task.name in STREAMED_TASKS:
+        sink.reset()
+        _current.sink = sink
+
+
+def _on_task_completed(source, event):
+    sink = _sink_for(event.task)
+    if sink is None:
+        return
+    if getattr(_current, "sink", None) is sink:
+        _current.sink = None
+    sink.on_progress(TASK_LABELS.get(event.task.name, f"{event.task.name} done"))
+
+
+def _on_chunk(source, event):
+    sink = getattr(_current, "sink", None)
+    if sink is not None and event.chunk:
+        sink.feed(event.chunk)
+
+
+crewai_event_bus.register_handler(TaskStartedEvent, _on_task_started)
+crewai_event_bus.register_handler(TaskCompletedEvent, _on_task_completed)
+crewai_event_bus.register_handler(LLMStreamChunkEvent, _on_chunk)
+
+
+@contextmanager
+def stream_crew(crew, on_progress, on_token, on_restart=_no_restart):
+    """Route the crew's task completions and final-answer tokens while the block runs.
+
+    Crew.kickoff() must be called on the same thread as the with block. One
+    sink per crew object: concurrent kickoffs need separate crew instances.
+    """
+    with _sinks_lock:
+        _sinks[id(crew)] = _Sink(on_progress, on_token, on_restart)
+    try:
+        yield
+    finally:
+        with _sinks_lock:
+            _sinks.pop(id(crew), None)
+        _current.sink = None
+
+
+@contextmanager
+def stream_llm(on_token, on_restart=_no_restart):
+    """Forward final-answer chunks of LLM calls made directly on this thread (no crew involved)"""
+    _current.sink = _Sink(lambda message: None, on_token, on_restart)
+    try:
+        yield
+    finally:
+        _current.sink = None
+
+
+def current_sink():
+    """The sink receiving this thread's LLM stream chunks, or None"""
+    return getattr(_current, "sink", None)
+
+
+@contextmanager
+def redirect_chunks(sink):
+    """Send this thread's LLM stream chunks to sink.feed(chunk) while the block runs.
+
+    Used by utils/llm_router.py, whose attempts run on helper threads and
+    pass the winner's chunks on to the caller's sink.
+    """
+    previous = current_sink()
+    _current.sink = sink
+    try:
+        yield
+    finally:
+        _current.sink = previous
@@ -0,0 +1,232 @@
+"""
+Incremental Calendar sync for the user's local day, plus deterministic schedule analysis.
+
+The first sync of a day lists the primary calendar with a server-side
+timeMin/timeMax window covering the user's local day (in the calendar's own
+time zone) and keeps the returned nextSyncToken. Later refreshes send only the
+syncToken - the API does not allow it together with timeMin/timeMax - and
+apply the changed events to an in-process per-user index, dropping anything
+outside the day. A new local day or an expired token (410 Gone) starts over
+with a full windowed sync.
+
+Overlaps and free gaps are computed from the index with a sort and a single
+sweep (O(n log n)) so the calendar agent receives them as facts instead of
+having to work them out.
+"""
+import os
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+from dateutil.parser import parse
+from googleapiclient.errors import HttpError
+
+from utils.input_packer import estimate_tokens, fit_lines
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_WORKDAY_START = os.getenv("CALENDAR_WORKDAY_START", "08:00")
+CALENDAR_WORKDAY_END = os.getenv("CALENDAR_WORKDAY_END", "18:00")
+CALENDAR_MIN_GAP_MINUTES = int(os.getenv("CALENDAR_MIN_GAP_MINUTES", "15"))
+CALENDAR_INDEX_MAX_USERS = int(os.getenv("CALENDAR_INDEX_MAX_USERS", "1000"))
+
+NO_EVENTS_TEXT = "You have no events today."
+
+EVENT_FIELDS = "items(id,status,summary,start,end,attendees(self,responseStatus)),nextPageToken,nextSyncToken,timeZone"
+
+_indexes = OrderedDict()  # user_key -> DayIndex, least recently used first
+_indexes_lock = threading.Lock()
+_user_locks = {}  # user_key -> Lock serializing that user's syncs, evicted with the index
+
+
+def _parse_hhmm(value):
+    hours, minutes = value.split(":")
+    return dtime(int(hours), int(minutes))
+
+
+class DayIndex:
+    """Events of one local day for one user, keyed by event id"""
+
+    def __init__(self, day, tz, sync_token=None):
+        self.day = day
+        self.tz = tz
+        self.sync_token = sync_token
+        self.events = {}
+
+    @property
+    def window(self):
+        start = datetime.combine(self.day, dtime(0), tzinfo=self.tz)
+        return start, start + timedelta(days=1)
+
+    def _bounds(self, event):
+        """(start, end, all_day) in the index's time zone"""
+        start, end = event["start"], event["end"]
+        if "date" in start:
+            return (datetime.combine(parse(start["date"]).date(), dtime(0), tzinfo=self.tz),
+                    datetime.combine(parse(end["date"]).date(), dtime(0), tzinfo=self.tz), True)
+        return parse(start["dateTime"]).astimezone(self.tz), parse(end["dateTime"]).astimezone(self.tz), False
+
+    def apply(self, items):
+        """Upsert changed events; cancelled, declined or out-of-day events are removed"""
+        window_start, window_end = self.window
+        for event in items:
+            declined = any(a.get("self") and a.get("responseStatus") == "declined"
+                           for a in event.get("attendees", []))
+            if event.get("status") == "cancelled" or declined or "start" not in event:
+                self.events.pop(event["id"], None)
+                continue
+            start, end, _ = self._bounds(event)
+            if start < window_end and end > window_start:
+                self.events[event["id"]] = event
+            else:
+                self.events.pop(event["id"], None)
+
+    def analyze(self, workday_start=CALENDAR_WORKDAY_START, workday_end=CALENDAR_WORKDAY_END,
+                min_gap_minutes=CALENDAR_MIN_GAP_MINUTES):
+        """Sorted events, overlapping pairs and free gaps within working hours"""
+        timed, all_day = [], []
+        for event in self.events.values():
+            start, end, is_all_day = self._bounds(event)
+            entry = {"id": event["id"], "title": event.get("summary", "No title"), "start": start, "end": end}
+            (all_day if is_all_day else timed).append(entry)
+        timed.sort(key=lambda e: (e["start"], e["end"], e["id"]))
+        all_day.sort(key=lambda e: e["title"])
+
+        # Sweep: every still-running event overlaps the one that starts now
+        conflicts = []
+        active = []  # heap of (end, position)
+        for position, event in enumerate(timed):
+            while active and active[0][0] <= event["start"]:
+                heapq.heappop(active)
+            for _, other in sorted(active, key=lambda item: item[1]):
+                conflicts.append((timed[other], event))
+            heapq.heappush(active, (event["end"], position))
+
+        work_start = datetime.combine(self.day, _parse_hhmm(workday_start), tzinfo=self.tz)
+        work_end = datetime.combine(self.day, _parse_hhmm(workday_end), tzinfo=self.tz)
+        free = []
+        cursor = work_start
+        for event in timed:
+            if event["start"] >= work_end:
+                break
+            if event["start"] > cursor:
+                free.append((cursor, event["start"]))
+            cursor = max(cursor, event["end"])
+        if cursor < work_end:
+            free.append((cursor, work_end))
+        min_gap = timedelta(minutes=min_gap_minutes)
+        free = [(start, end) for start, end in free if end - start >= min_gap]
+
+        return {"day": self.day, "timezone": str(self.tz), "events": timed, "all_day": all_day,
+                "conflicts": conflicts, "free": free}
+
+
+@timed("calendar_list")
+def _list_events(service, **params):
+    """Page through events().list(); returns (items, nextSyncToken)"""
+    items = []
+    page_token = None
+    while True:
+        response = service.events().list(calendarId="primary", singleEvents=True, maxResults=250,
+                                          pageToken=page_token, fields=EVENT_FIELDS, **params).execute()
+        items.extend(response.get("items", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return items, response.get("nextSyncToken")
+
+
+@timed("calendar_get")
+def _calendar_timezone(service):
+    return ZoneInfo(service.calendars().get(calendarId="primary", fields="timeZone").execute()["timeZone"])
+
+
+def full_day_sync(service, tz, day):
+    index = DayIndex(day, tz)
+    window_start, window_end = index.window
+    items, index.sync_token = _list_events(
+        service, timeMin=window_start.isoformat(), timeMax=window_end.isoformat()
+    )
+    index.apply(items)
+    return index, {"mode": "full", "changed": len(items)}
+
+
+def sync_calendar_day(service, user_key, now=None):
+    """Bring the user's index for today up to date; returns (analysis, sync report)"""
+    with _indexes_lock:
+        user_lock = _user_locks.setdefault(user_key, threading.Lock())
+
+    with user_lock:
+        with _indexes_lock:
+            index = _indexes.get(user_key)
+        tz = index.tz if index else _calendar_timezone(service)
+        day = (now or datetime.now(tz)).astimezone(tz).date()
+
+        if index is None or index.day != day or not index.sync_token:
+            index, report = full_day_sync(service, tz, day)
+        else:
+            try:
+                items, next_token = _list_events(service, syncToken=index.sync_token)
+                index.apply(items)
+                index.sync_token = next_token or index.sync_token
+                report = {"mode": "incremental", "changed": len(items)}
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+                logger.warning("Calendar sync token expired, running a full sync of today")
+                index, report = full_day_sync(service, tz, day)
+                report["mode"] = "resync"
+
+        with _indexes_lock:
+            _indexes[user_key] = index
+            _indexes.move_to_end(user_key)
+            while len(_indexes) > CALENDAR_INDEX_MAX_USERS:
+                evicted, _ = _indexes.popitem(last=False)
+                # A held lock belongs to a sync in progress, which stores its index (and keeps the lock) again
+                if not _user_locks[evicted].locked():
+                    del _user_locks[evicted]
+
+        analysis = index.analyze()
+
+    logger.info(f"Calendar {report['mode']} sync: {report['changed']} changed, "
+                f"{len(analysis['events'])} events, {len(analysis['conflicts'])} conflicts")
+    return analysis, report
+
+
+def format_calendar_analysis(analysis, budget=None):
+    """Structured text for the calendar agent, or the usual no-events sentence.
+
+    With a token `budget` (see input_packer), overlaps are kept first, then
+    events, then free gaps; whatever does not fit is summarized.
+    """
+    if not analysis["events"] and not analysis["all_day"]:
+        return NO_EVENTS_TEXT
+
+    def span(event):
+        return f"{event['start']:%H:%M}-{event['end']:%H:%M}"
+
+    header = [f"Events for {analysis['day']:%A %Y-%m-%d} ({analysis['timezone']}):"]
+    header += [f"- All day: {event['title']}" for event in analysis["all_day"]]
+    events = [f"- {span(event)}: {event['title']}" for event in analysis["events"]]
+    conflicts = [f"- {a['title']} ({span(a)}) overlaps {b['title']} ({span(b)})" for a, b in analysis["conflicts"]]
+    free = [f"- {start:%H:%M}-{end:%H:%M} ({int((end - start).total_seconds() // 60)} min)"
+            for start, end in analysis["free"]]
+
+    if budget is not None:
+        titles = ["Overlapping events (precomputed):", "Free time during working hours (precomputed):"]
+        remaining = budget - estimate_tokens("\n".join(header + titles)) - 2
+        conflicts, _ = fit_lines(conflicts, remaining, lambda n: f"- ... and {n} more overlaps")
+        remaining -= estimate_tokens("\n".join(conflicts)) + 1
+        events, _ = fit_lines(events, remaining, lambda n: f"- ... and {n} more events")
+        remaining -= estimate_tokens("\n".join(events)) + 1
+        free, _ = fit_lines(free, remaining, lambda n: f"- ... and {n} more free slots")
+
+    lines = header + events
+    lines.append("Overlapping events (precomputed):")
+    lines += conflicts or ["- None"]
+    lines.append("Free time during working hours (precomputed):")
+    lines += free or ["- None"]
+    return "\n".join(lines)
@@ -0,0 +1,350 @@
+"""
+Server-side store for users' Google OAuth credentials.
+
+The Flask cookie session only carries the user's key; the credentials
+themselves are kept in a SQLite file shared by all gunicorn workers, encrypted
+at rest with a Fernet key (CREDENTIAL_KEY, or a key file generated on first
+use). Each worker also keeps the live Credentials objects it has loaded, so
+the Gmail and Calendar fetchers of a briefing share one object instead of
+rebuilding it from the session.
+
+Rows are keyed by the Google account (see google_auth.account_key_for), so
+signing in again overwrites the user's row instead of leaving the old one
+behind.
+
+A background refresher renews access tokens TOKEN_REFRESH_MARGIN seconds
+before they expire and writes them back, so a briefing does not pay for a
+token round-trip inside its first API call. Workers claim a refresh with a
+short lease so only one of them calls Google for a given user. Users who
+have not visited for TOKEN_REFRESH_IDLE_SECONDS are skipped; their token is
+refreshed inline on their next use.
+
+Each row also keeps the language and engine of the user's last on-demand
+briefing, so scheduled and pushed briefings are written the same way.
+
+The same file records OAuth authorization codes already seen by /callback,
+expired after OAUTH_CODE_TTL seconds, to reject duplicate callbacks.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+
+import google.auth.transport.requests
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+from cryptography.fernet import Fernet
+
+from utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_DB_PATH = os.getenv("CREDENTIAL_DB_PATH", "/tmp/briefing_credentials.db")
+CREDENTIAL_KEY_FILE = os.getenv("CREDENTIAL_KEY_FILE", "/tmp/briefing_credentials.key")
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+TOKEN_REFRESH_POLL = float(os.getenv("TOKEN_REFRESH_POLL", "60"))
+# Users not seen for this long are no longer refreshed ahead of time
+TOKEN_REFRESH_IDLE_SECONDS = float(os.getenv("TOKEN_REFRESH_IDLE_SECONDS", str(7 * 24 * 3600)))
+OAUTH_CODE_TTL = float(os.getenv("OAUTH_CODE_TTL", "600"))
+# Same fields the session used to carry; Credentials.to_json() also writes the expiry
+CREDENTIAL_FIELDS = ("token", "refresh_token", "token_uri", "client_id", "client_secret", "scopes")
+# Tokens this close to expiry are refreshed inline rather than used
+EXPIRY_SKEW = 60
+REFRESH_LEASE = 60
+# last_seen is written at most this often per user and worker
+LAST_SEEN_RESOLUTION = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS credentials (
+    user_key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    expiry REAL,
+    refresh_lease REAL,
+    updated_at REAL NOT NULL,
+    last_seen REAL,
+    language TEXT,
+    pipeline_mode TEXT
+);
+CREATE INDEX IF NOT EXISTS credentials_by_expiry ON credentials (expiry);
+CREATE TABLE IF NOT EXISTS oauth_codes (
+    code_hash TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+"""
+
+
+def load_key(path=CREDENTIAL_KEY_FILE):
+    """The Fernet key from CREDENTIAL_KEY, or from `path` (created with mode 600 if missing)"""
+    key = os.getenv("CREDENTIAL_KEY")
+    if key:
+        return key.encode()
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):  # another worker may be writing it right now
+            with open(path, "rb") as f:
+                key = f.read().strip()
+            if key:
+                return key
+            time.sleep(0.1)
+        raise RuntimeError(f"Credential key file {path} is empty")
+    key = Fernet.generate_key()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    logger.info(f"Generated credential encryption key at {path}")
+    return key
+
+
+def expiry_timestamp(creds):
+    """Epoch seconds of the access token's expiry (google-auth keeps naive UTC), or None"""
+    if creds.expiry is None:
+        return None
+    return creds.expiry.replace(tzinfo=timezone.utc).timestamp()
+
+
+class CredentialStore:
+    """Encrypted credentials per user, plus a per-process cache of live Credentials"""
+
+    def __init__(self, path=CREDENTIAL_DB_PATH, key=None):
+        self.path = path
+        self._fernet = Fernet(key or load_key())
+        self._live = {}
+        self._lock = threading.Lock()
+        self._refresh_locks = {}
+        self._seen = {}  # user_key -> when this worker last wrote last_seen
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            for column in ("last_seen REAL", "language TEXT", "pipeline_mode TEXT"):
+                try:
+                    conn.execute(f"ALTER TABLE credentials ADD COLUMN {column}")  # databases created before it
+                except sqlite3.OperationalError:
+                    pass
+        try:
+            os.chmod(path, 0o600)
+        except OSError:
+            pass
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def save(self, creds, user_key):
+        """Store `creds` (encrypted) under `user_key`, replacing the user's previous credentials"""
+        data = self._fernet.encrypt(creds.to_json().encode("utf-8"))
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # last_seen is kept: a background refresh is not a visit
+            conn.execute(
+                "INSERT INTO credentials (user_key, data, expiry, refresh_lease, updated_at, last_seen) "
+                "VALUES (?, ?, ?, NULL, ?, ?) "
+                "ON CONFLICT (user_key) DO UPDATE SET data = excluded.data, expiry = excluded.expiry, "
+                "refresh_lease = NULL, updated_at = excluded.updated_at",
+                (user_key, data, expiry_timestamp(creds), now, now)
+            )
+        with self._lock:
+            self._live[user_key] = creds
+        return user_key
+
+    def _load(self, user_key):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM credentials WHERE user_key = ?", (user_key,)).fetchone()
+        if row is None:
+            return None
+        info = json.loads(self._fernet.decrypt(row["data"]))
+        expiry = info.get("expiry")
+        return Credentials(
+            **{name: info.get(name) for name in CREDENTIAL_FIELDS},
+            expiry=datetime.fromisoformat(expiry.rstrip("Z")) if expiry else None
+        )
+
+    def get(self, user_key):
+        """Live Credentials for `user_key`, refreshed first if the token is about to expire; None if unknown"""
+        with self._lock:
+            creds = self._live.get(user_key)
+        if creds is None or self._expiring(creds, EXPIRY_SKEW):
+            # Another worker may already have refreshed it
+            creds = self._load(user_key)
+            if creds is None:
+                with self._lock:
+                    self._live.pop(user_key, None)
+                return None
+            with self._lock:
+                self._live[user_key] = creds
+        if self._expiring(creds, EXPIRY_SKEW):
+            logger.info(f"Access token for {user_key} expired, refreshing inline")
+            creds = self.refresh(user_key, creds)
+        return creds
+
+    def touch(self, user_key, force=False):
+        """Record a visit by the user, which keeps their token refreshed ahead of time"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._seen.get(user_key, 0) < LAST_SEEN_RESOLUTION:
+                return
+            self._seen[user_key] = now
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE credentials SET last_seen = ? WHERE user_key = ?", (now, user_key))
+
+    def save_preferences(self, user_key, language, pipeline_mode):
+        """Remember how the user's briefing was last asked for (pipeline_mode None = PIPELINE_MODE)"""
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE credentials SET language = ?, pipeline_mode = ? WHERE user_key = ?",
+                         (language, pipeline_mode, user_key))
+
+    def preferences(self, user_key):
+        """Session fields for briefings written without the user: {"language": ..., "pipeline_mode": ...}"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT language, pipeline_mode FROM credentials WHERE user_key = ?",
+                               (user_key,)).fetchone()
+        return {name: row[name] for name in ("language", "pipeline_mode") if row and row[name]}
+
+    def user_keys(self):
+        """Keys of every user with stored credentials"""
+        with closing(self._connect()) as conn:
+            return [row["user_key"] for row in conn.execute("SELECT user_key FROM credentials ORDER BY user_key")]
+
+    def delete(self, user_key):
+        with self._lock:
+            self._live.pop(user_key, None)
+            self._seen.pop(user_key, None)
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM credentials WHERE user_key = ?", (user_key,))
+
+    @staticmethod
+    def _expiring(creds, margin):
+        expiry = expiry_timestamp(creds)
+        return expiry is not None and expiry - time.time() < margin
+
+    def refresh(self, user_key, creds):
+        """Renew the access token with Google and write it back"""
+        with self._lock:
+            lock = self._refresh_locks.setdefault(user_key, threading.Lock())
+        with lock:
+            with self._lock:
+                current = self._live.get(user_key)
+            if current is not None and not self._expiring(current, EXPIRY_SKEW):
+                return current  # refreshed by another thread while we waited
+            with stage("oauth_refresh"):
+                creds.refresh(google.auth.transport.requests.Request())
+            self.save(creds, user_key)
+        return creds
+
+    def claim_expiring(self, margin=TOKEN_REFRESH_MARGIN, now=None, idle=TOKEN_REFRESH_IDLE_SECONDS):
+        """Atomically lease the users seen in the last `idle` seconds whose tokens expire within `margin`"""
+        now = now or time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [row["user_key"] for row in conn.execute(
+                "SELECT user_key FROM credentials WHERE expiry < ? AND last_seen >= ? "
+                "AND (refresh_lease IS NULL OR refresh_lease < ?)",
+                (now + margin, now - idle, now)
+            )]
+            conn.executemany("UPDATE credentials SET refresh_lease = ? WHERE user_key = ?",
+                             [(now + REFRESH_LEASE, key) for key in keys])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return keys
+
+    def refresh_expiring(self, margin=TOKEN_REFRESH_MARGIN):
+        """Refresh every token of a recent visitor that expires soon; returns the number refreshed"""
+        refreshed = 0
+        for user_key in self.claim_expiring(margin):
+            creds = self._load(user_key)
+            if creds is None or not creds.refresh_token:
+                continue
+            try:
+                with stage("oauth_refresh"):
+                    creds.refresh(google.auth.transport.requests.Request())
+            except RefreshError as e:
+                # Revoked or expired grant: the user has to sign in again
+                logger.warning(f"Dropping credentials for {user_key}, refresh was refused: {e}")
+                self.delete(user_key)
+                continue
+            except Exception as e:
+                logger.warning(f"Token refresh for {user_key} failed, retrying later: {e}")
+                continue
+            self.save(creds, user_key)
+            refreshed += 1
+        return refreshed
+
+    def claim_code(self, code, ttl=OAUTH_CODE_TTL):
+        """Record an authorization code; False if it was already seen in the last `ttl` seconds"""
+        now = time.time()
+        code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM oauth_codes WHERE seen_at < ?", (now - ttl,))
+            try:
+                conn.execute("INSERT INTO oauth_codes (code_hash, seen_at) VALUES (?, ?)", (code_hash, now))
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def release_code(self, code):
+        """Forget a code whose token exchange failed"""
+        code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM oauth_codes WHERE code_hash = ?", (code_hash,))
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            now = time.time()
+            users, expiring, idle = conn.execute(
+                "SELECT COUNT(*), SUM(expiry < ?), SUM(last_seen IS NULL OR last_seen < ?) FROM credentials",
+                (now + TOKEN_REFRESH_MARGIN, now - TOKEN_REFRESH_IDLE_SECONDS)
+            ).fetchone()
+        with self._lock:
+            live = len(self._live)
+        return {"users": users, "expiring": expiring or 0, "idle": idle or 0, "live_in_worker": live}
+
+
+class TokenRefresher:
+    """Background thread that keeps stored access tokens from expiring"""
+
+    def __init__(self, store, poll_seconds=TOKEN_REFRESH_POLL, margin=TOKEN_REFRESH_MARGIN):
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self.margin = margin
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="token-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                refreshed = self.store.refresh_expiring(self.margin)
+                if refreshed:
+                    logger.info(f"Refreshed {refreshed} access tokens ahead of expiry")
+            except Exception as e:
+                logger.error(f"Token refresh pass failed: {e}", exc_info=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def credential_store():
+    """Process-wide CredentialStore, opened on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CredentialStore()
+        return _store
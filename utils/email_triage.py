@@ -0,0 +1,150 @@
+"""
+Deterministic email triage that runs before the email agent.
+
+The email agent is told to ignore promotional and marketing mail, but every
+such message still costs prompt tokens and latency. This stage scores each
+message with cheap local signals and collapses the junk into counts
+("7 promotional emails") so the LLM only reads what it would have kept.
+
+Signals (weights are additive, a score >= EMAIL_TRIAGE_THRESHOLD is junk):
+    Gmail category labels (CATEGORY_PROMOTIONS / CATEGORY_SOCIAL / SPAM)
+    a List-Unsubscribe header
+    no-reply style or blocked senders
+    promotional keywords in the subject and snippet (English and Spanish)
+Work keywords (invoice, meeting, project, ...) and the IMPORTANT label count
+against the score, and allowed senders are always kept.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+
+from utils.google_auth import get_header
+from utils.input_packer import estimate_tokens
+
+EMAIL_TRIAGE_ENABLED = os.getenv("EMAIL_TRIAGE_ENABLED", "true").lower() == "true"
+EMAIL_TRIAGE_THRESHOLD = int(os.getenv("EMAIL_TRIAGE_THRESHOLD", "3"))
+EMAIL_TRIAGE_BLOCKED_SENDERS = [s.strip().lower() for s in os.getenv("EMAIL_TRIAGE_BLOCKED_SENDERS", "").split(",") if s.strip()]
+EMAIL_TRIAGE_ALLOWED_SENDERS = [s.strip().lower() for s in os.getenv("EMAIL_TRIAGE_ALLOWED_SENDERS", "").split(",") if s.strip()]
+
+CATEGORY_WEIGHTS = {
+    "CATEGORY_PROMOTIONS": (3, "promotional"),
+    "CATEGORY_SOCIAL": (3, "social"),
+    "SPAM": (5, "spam"),
+}
+UNSUBSCRIBE_WEIGHT = 2
+NOREPLY_WEIGHT = 1
+BLOCKED_SENDER_WEIGHT = 5
+IMPORTANT_LABEL_WEIGHT = -3
+
+NOREPLY_PATTERN = re.compile(r"\b(no-?reply|do-?not-?reply|newsletter|marketing|promo(tions)?|deals|offers)\b", re.I)
+PROMO_KEYWORDS = re.compile(
+    r"(\d+\s?% (off|de descuento)|\bsale\b|\bdeals?\b|\bdiscount\b|\bcoupon\b|limited time|free shipping|"
+    r"\bnewsletter\b|\bwebinar\b|\bunsubscribe\b|\bofertas?\b|\bdescuentos?\b|\brebajas\b|\bpromoci[oó]n\b|\bbolet[ií]n\b)",
+    re.I
+)
+WORK_KEYWORDS = re.compile(
+    r"\b(invoice|meeting|project|deadline|urgent|contract|review|interview|payment due|"
+    r"factura|reuni[oó]n|proyecto|urgente|contrato|entrevista)\b",
+    re.I
+)
+
+
+@dataclass
+class TriageDecision:
+    score: int
+    category: str = None
+    reasons: list = field(default_factory=list)
+
+    @property
+    def is_junk(self):
+        return self.category is not None
+
+
+@dataclass
+class TriageResult:
+    kept: list
+    dropped: dict  # category -> count
+    tokens_before: int = 0
+    tokens_removed: int = 0
+
+    def summary_line(self):
+        """e.g. 'Filtered out before analysis: 7 promotional emails, 2 social emails.'"""
+        if not self.dropped:
+            return ""
+        parts = [f"{count} {category} email{'s' if count != 1 else ''}"
+                 for category, count in sorted(self.dropped.items())]
+        return "Filtered out before analysis: " + ", ".join(parts) + "."
+
+    def report(self):
+        return {
+            "kept": len(self.kept),
+            "dropped": dict(self.dropped),
+            "tokens_before": self.tokens_before,
+            "tokens_removed": self.tokens_removed,
+        }
+
+
+def classify(message, threshold=EMAIL_TRIAGE_THRESHOLD,
+             blocked_senders=EMAIL_TRIAGE_BLOCKED_SENDERS, allowed_senders=EMAIL_TRIAGE_ALLOWED_SENDERS):
+    """Score one Gmail message (metadata format) and decide whether it is junk"""
+    sender = get_header(message, "From").lower()
+    if any(rule in sender for rule in allowed_senders):
+        return TriageDecision(score=0, reasons=["allowed sender"])
+
+    labels = message.get("labelIds", [])
+    text = f"{get_header(message, 'Subject')} {message.get('snippet', '')}"
+    score, reasons, category = 0, [], "promotional"
+
+    for label, (weight, label_category) in CATEGORY_WEIGHTS.items():
+        if label in labels:
+            score += weight
+            reasons.append(label)
+            category = label_category
+    if "IMPORTANT" in labels:
+        score += IMPORTANT_LABEL_WEIGHT
+        reasons.append("IMPORTANT")
+    if get_header(message, "List-Unsubscribe"):
+        score += UNSUBSCRIBE_WEIGHT
+        reasons.append("List-Unsubscribe")
+    if any(rule in sender for rule in blocked_senders):
+        score += BLOCKED_SENDER_WEIGHT
+        reasons.append("blocked sender")
+    elif NOREPLY_PATTERN.search(sender):
+        score += NOREPLY_WEIGHT
+        reasons.append("bulk sender")
+
+    promo_hits = len(PROMO_KEYWORDS.findall(text))
+    work_hits = len(WORK_KEYWORDS.findall(text))
+    if promo_hits:
+        score += min(promo_hits, 3)
+        reasons.append(f"{promo_hits} promo keywords")
+    if work_hits:
+        score -= 2 * min(work_hits, 2)
+        reasons.append(f"{work_hits} work keywords")
+
+    return TriageDecision(score=score, category=category if score >= threshold else None, reasons=reasons)
+
+
+def triage_messages(messages, render=lambda m: m.get("snippet", ""), enabled=EMAIL_TRIAGE_ENABLED, **rules):
+    """Split messages into those worth an LLM's attention and per-category junk counts.
+
+    `render` turns a message into the text the LLM would have seen, for the
+    token accounting.
+    """
+    tokens_before = sum(estimate_tokens(render(m)) for m in messages)
+    if not enabled:
+        return TriageResult(kept=list(messages), dropped={}, tokens_before=tokens_before)
+
+    kept, dropped, tokens_removed = [], {}, 0
+    for message in messages:
+        decision = classify(message, **rules)
+        if decision.is_junk:
+            dropped[decision.category] = dropped.get(decision.category, 0) + 1
+            tokens_removed += estimate_tokens(render(message))
+        else:
+            kept.append(message)
+
+    result = TriageResult(kept=kept, dropped=dropped, tokens_before=tokens_before)
+    # The summary line replaces the dropped messages in the prompt
+    result.tokens_removed = max(tokens_removed - estimate_tokens(result.summary_line()), 0)
+    return result
@@ -0,0 +1,551 @@
+"""
+Offline stand-ins for the Google APIs used by the briefing assistant.
+
+FakeGmailHttp is an httplib2-compatible transport that can be handed to
+googleapiclient's build(..., http=...) so the real client code runs against a
+synthetic mailbox without any network access. It counts round-trips and
+bytes so fetch strategies can be benchmarked, and records mailbox changes
+(new, deleted, archived, read messages) in a history API so incremental sync
+can be exercised, including expired historyIds. FakeCalendarHttp does the
+same for the primary calendar with time windows and syncTokens.
+
+Both accept watch requests, and notify_watchers() stands in for Google's push
+delivery: the calendar posts channel notifications to the watch's address,
+Gmail posts a Pub/Sub push message to `push_endpoint` (the push subscription's
+endpoint, which Gmail itself never sees).
+
+FakeGoogleServer serves both fakes (and an OAuth token endpoint) over real
+HTTP, so a whole app process can be pointed at it with GOOGLE_API_ROOT_URL.
+"""
+import base64
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.parser import FeedParser
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import httplib2
+from dateutil.parser import parse
+from googleapiclient.discovery import build
+
+SENDERS = [
+    "Ana Lopez <ana@example.com>",
+    "Build Bot <ci@example.com>",
+    "Finance Team <billing@vendor.example>",
+    "Weekly Deals <promo@shop.example>",
+    "Project Atlas <atlas@example.com>",
+]
+
+SUBJECTS = [
+    "Meeting notes from standup",
+    "Invoice #{n} due next week",
+    "Build #{n} passed",
+    "50% off everything this weekend",
+    "Project update: phase {n} completed",
+]
+
+
+def make_fake_message(n, now=None):
+    """Build one synthetic Gmail message resource in `format=full` shape"""
+    now = now or datetime.now(timezone.utc)
+    sent = now - timedelta(minutes=7 * n)
+    sender = SENDERS[n % len(SENDERS)]
+    subject = SUBJECTS[n % len(SUBJECTS)].format(n=n)
+    return {
+        "id": f"msg{n:05d}",
+        "threadId": f"thr{n // 3:05d}",
+        "labelIds": ["INBOX", "UNREAD"],
+        "snippet": f"{subject}. This is message {n} from {sender.split(' <')[0]}.",
+        "internalDate": str(int(sent.timestamp() * 1000)),
+        "historyId": str(1000 + n),
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "From", "value": sender},
+                {"name": "To", "value": "me@example.com"},
+                {"name": "Subject", "value": subject},
+                {"name": "Date", "value": sent.strftime("%a, %d %b %Y %H:%M:%S +0000")},
+                {"name": "Message-ID", "value": f"<msg{n:05d}@example.com>"},
+            ],
+            # Stands in for the body Gmail returns with format=full
+            "body": {"size": 2048, "data": "x" * 2048},
+        },
+        "sizeEstimate": 4096,
+    }
+
+
+def _stub(message):
+    return {"id": message["id"], "threadId": message["threadId"], "labelIds": list(message["labelIds"])}
+
+
+def _touches_label(record, label):
+    for kind in ("messagesAdded", "messagesDeleted", "labelsAdded", "labelsRemoved"):
+        for change in record.get(kind, []):
+            if label in change["message"]["labelIds"] or label in change.get("labelIds", []):
+                return True
+    return False
+
+
+class FakeGoogleHttp(ABC):
+    """httplib2.Http stand-in base: one request() call is one simulated round-trip.
+
+    Each round-trip sleeps for `latency` seconds, plus `per_item_latency` for
+    each sub-request of a batch. Subclasses implement _route(). Counters are
+    thread-safe.
+    """
+
+    def __init__(self, latency=0.0, per_item_latency=0.0):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self._lock:
+            self.round_trips = 0
+            self.api_calls = 0
+            self.bytes_received = 0
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                redirections=None, connection_type=None):
+        parsed = urllib.parse.urlparse(uri)
+        if parsed.path.endswith("/batch") or "/batch/" in parsed.path:
+            status, content, content_type, items = self._handle_batch(body, headers or {})
+        else:
+            status, payload = self._route(method, parsed.path, parsed.query, body)
+            content, content_type, items = json.dumps(payload), "application/json; charset=UTF-8", 1
+
+        time.sleep(self.latency + self.per_item_latency * items)
+        content = content.encode("utf-8")
+        with self._lock:
+            self.round_trips += 1
+            self.api_calls += items
+            self.bytes_received += len(content)
+
+        resp = httplib2.Response({"status": status, "content-type": content_type})
+        return resp, content
+
+    @abstractmethod
+    def _route(self, method, path, query, body=None):
+        """(status, JSON payload) for one API request"""
+
+    def _handle_batch(self, body, headers):
+        content_type = headers.get("content-type") or headers.get("Content-Type")
+        parser = FeedParser()
+        parser.feed(f"content-type: {content_type}\r\n\r\n{body}")
+        batch = parser.close()
+
+        boundary = "fake_batch_boundary"
+        chunks = []
+        parts = batch.get_payload()
+        for part in parts:
+            request_line = part.get_payload().split("\n", 1)[0].strip()
+            method, target, _ = request_line.split(" ", 2)
+            parsed = urllib.parse.urlparse(target)
+            status, payload = self._route(method, parsed.path, parsed.query)
+
+            content_id = part["Content-ID"]
+            reason = "OK" if status == 200 else "Not Found"
+            chunks.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:]}\r\n\r\n"
+                f"HTTP/1.1 {status} {reason}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return 200, "".join(chunks), f"multipart/mixed; boundary={boundary}", len(parts)
+
+
+class FakeGmailHttp(FakeGoogleHttp):
+    """Synthetic Gmail mailbox with messages, batch gets, profile and history"""
+
+    def __init__(self, message_count=10, latency=0.0, per_item_latency=0.0):
+        self.messages = [make_fake_message(n) for n in range(message_count)]
+        self.by_id = {m["id"]: m for m in self.messages}
+        self.history_id = 1000 + message_count
+        self.oldest_history_id = self.history_id
+        self.history = []
+        self._next_n = message_count
+        self.watch = None
+        self.push_endpoint = None
+        self.notifications_sent = 0
+        super().__init__(latency, per_item_latency)
+
+    # Mailbox mutations, each recorded in the history API like Gmail does
+
+    def _record(self, **change):
+        self.history_id += 1
+        self.history.append({"id": str(self.history_id), **change})
+
+    def add_message(self):
+        """Deliver a new INBOX message and return it"""
+        message = make_fake_message(self._next_n)
+        newest = max((int(m["internalDate"]) for m in self.messages), default=0)
+        message["internalDate"] = str(max(int(time.time() * 1000), newest + 1))
+        message["historyId"] = str(self.history_id + 1)
+        self._next_n += 1
+        self.messages.insert(0, message)
+        self.by_id[message["id"]] = message
+        self._record(messagesAdded=[{"message": _stub(message)}])
+        return message
+
+    def delete_message(self, message_id):
+        message = self.by_id.pop(message_id)
+        self.messages.remove(message)
+        self._record(messagesDeleted=[{"message": _stub(message)}])
+
+    def archive_message(self, message_id):
+        message = self.by_id[message_id]
+        message["labelIds"] = [l for l in message["labelIds"] if l != "INBOX"]
+        self._record(labelsRemoved=[{"message": _stub(message), "labelIds": ["INBOX"]}])
+
+    def restore_message(self, message_id):
+        """Move an archived message back to the INBOX"""
+        message = self.by_id[message_id]
+        message["labelIds"].insert(0, "INBOX")
+        self._record(labelsAdded=[{"message": _stub(message), "labelIds": ["INBOX"]}])
+
+    def mark_read(self, message_id):
+        message = self.by_id[message_id]
+        message["labelIds"] = [l for l in message["labelIds"] if l != "UNREAD"]
+        self._record(labelsRemoved=[{"message": _stub(message), "labelIds": ["UNREAD"]}])
+
+    def expire_history(self):
+        """Simulate Gmail dropping old history so stored historyIds become invalid"""
+        self.history = []
+        self.oldest_history_id = self.history_id
+
+    def notify_watchers(self):
+        """Deliver a Pub/Sub push message for the current historyId; returns the endpoint's status or None"""
+        if self.watch is None or self.push_endpoint is None:
+            return None
+        data = json.dumps({"emailAddress": "me@example.com", "historyId": self.history_id})
+        self.notifications_sent += 1
+        envelope = {
+            "message": {"data": base64.b64encode(data.encode("utf-8")).decode("ascii"),
+                        "messageId": str(self.notifications_sent),
+                        "publishTime": datetime.now(timezone.utc).isoformat()},
+            "subscription": self.watch["topicName"].replace("/topics/", "/subscriptions/"),
+        }
+        return _post(self.push_endpoint, json.dumps(envelope).encode("utf-8"),
+                     {"Content-Type": "application/json"})
+
+    def _route(self, method, path, query, body=None):
+        params = urllib.parse.parse_qs(query)
+        parts = path.rstrip("/").split("/")
+        if method == "GET" and parts[-1] == "profile":
+            return 200, {"emailAddress": "me@example.com", "historyId": str(self.history_id),
+                         "messagesTotal": len(self.messages)}
+        if method == "GET" and parts[-1] == "history":
+            return self._list_history(params)
+        if method == "POST" and parts[-1] == "watch":
+            self.watch = json.loads(body or "{}")
+            return 200, {"historyId": str(self.history_id),
+                         "expiration": str(int((time.time() + 7 * 86400) * 1000))}
+        if method == "POST" and parts[-1] == "stop":
+            self.watch = None
+            return 200, {}
+        if method != "GET" or "messages" not in parts:
+            return 404, {"error": {"code": 404, "message": f"Not found: {path}"}}
+
+        idx = parts.index("messages")
+        if idx == len(parts) - 1:
+            return 200, self._list_messages(params)
+
+        message = self.by_id.get(urllib.parse.unquote(parts[idx + 1]))
+        if message is None:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        return 200, self._render_message(message, params)
+
+    def _list_history(self, params):
+        start = int(params["startHistoryId"][0])
+        if start < self.oldest_history_id:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+
+        label = params.get("labelId", [None])[0]
+        max_results = int(params.get("maxResults", ["100"])[0])
+        offset = int(params.get("pageToken", ["0"])[0])
+
+        records = [r for r in self.history if int(r["id"]) > start]
+        if label:
+            records = [r for r in records if _touches_label(r, label)]
+        page = records[offset:offset + max_results]
+        result = {"historyId": str(self.history_id)}
+        if page:
+            result["history"] = page
+        if offset + max_results < len(records):
+            result["nextPageToken"] = str(offset + max_results)
+        return 200, result
+
+    def _list_messages(self, params):
+        labels = params.get("labelIds", [])
+        max_results = min(int(params.get("maxResults", ["100"])[0]), 500)
+        offset = int(params.get("pageToken", ["0"])[0])
+
+        matching = [m for m in self.messages if all(l in m["labelIds"] for l in labels)]
+        page = matching[offset:offset + max_results]
+        result = {
+            "messages": [{"id": m["id"], "threadId": m["threadId"]} for m in page],
+            "resultSizeEstimate": len(matching),
+        }
+        if offset + max_results < len(matching):
+            result["nextPageToken"] = str(offset + max_results)
+        if not page:
+            del result["messages"]
+        return result
+
+    def _render_message(self, message, params):
+        fmt = params.get("format", ["full"])[0]
+        if fmt != "metadata":
+            return message
+
+        wanted = {h.lower() for h in params.get("metadataHeaders", [])}
+        headers = [h for h in message["payload"]["headers"]
+                   if not wanted or h["name"].lower() in wanted]
+        rendered = {k: v for k, v in message.items() if k != "payload"}
+        rendered["payload"] = {"mimeType": message["payload"]["mimeType"], "headers": headers}
+        return rendered
+
+
+DEFAULT_SCHEDULE = [
+    ("09:00", "09:30", "Daily standup"),
+    ("10:00", "11:00", "Design review"),
+    ("10:30", "11:30", "Reunión con cliente"),
+    ("13:00", "14:00", "Almuerzo"),
+    ("16:00", "16:45", "1:1 with manager"),
+]
+
+
+class FakeCalendarHttp(FakeGoogleHttp):
+    """Synthetic primary calendar supporting time windows, paging and syncTokens.
+
+    Every change bumps a sequence number; a syncToken is the sequence it was
+    issued at, so incremental lists return events changed since then
+    (including cancelled ones). expire_sync_tokens() makes all issued tokens
+    fail with 410 Gone like the real API.
+    """
+
+    def __init__(self, schedule=DEFAULT_SCHEDULE, day=None, timezone_name="Europe/Madrid",
+                 latency=0.0, extra_days=0):
+        self.timezone_name = timezone_name
+        self.tz = ZoneInfo(timezone_name)
+        self.day = day or datetime.now(self.tz).date()
+        self.events = {}
+        self.seq = 0
+        self.token_epoch = 0
+        self._next_n = 0
+        self.channels = {}
+        self.notifications_sent = 0
+        super().__init__(latency)
+        for offset in range(-extra_days, extra_days + 1):
+            for start, end, title in schedule:
+                self.add_event(start, end, title, day=self.day + timedelta(days=offset))
+
+    def _at(self, day, hhmm):
+        hours, minutes = (int(x) for x in hhmm.split(":"))
+        return datetime(day.year, day.month, day.day, hours, minutes, tzinfo=self.tz)
+
+    def add_event(self, start, end, title, day=None, all_day=False):
+        """Create an event at local HH:MM times on `day` (defaults to today) and return it"""
+        day = day or self.day
+        self.seq += 1
+        event_id = f"evt{self._next_n:05d}"
+        self._next_n += 1
+        if all_day:
+            when = {"start": {"date": day.isoformat()}, "end": {"date": (day + timedelta(days=1)).isoformat()}}
+        else:
+            when = {"start": {"dateTime": self._at(day, start).isoformat()},
+                    "end": {"dateTime": self._at(day, end).isoformat()}}
+        self.events[event_id] = {"id": event_id, "status": "confirmed", "summary": title,
+                                 "_seq": self.seq, **when}
+        return self.events[event_id]
+
+    def move_event(self, event_id, start, end, day=None):
+        day = day or self.day
+        self.seq += 1
+        event = self.events[event_id]
+        event["start"] = {"dateTime": self._at(day, start).isoformat()}
+        event["end"] = {"dateTime": self._at(day, end).isoformat()}
+        event["_seq"] = self.seq
+
+    def cancel_event(self, event_id):
+        self.seq += 1
+        self.events[event_id]["status"] = "cancelled"
+        self.events[event_id]["_seq"] = self.seq
+
+    def expire_sync_tokens(self):
+        self.token_epoch += 1
+
+    def _notify(self, channel, state):
+        self.notifications_sent += 1
+        headers = {"X-Goog-Channel-ID": channel["id"], "X-Goog-Channel-Token": channel.get("token", ""),
+                   "X-Goog-Resource-ID": channel["resourceId"], "X-Goog-Resource-State": state,
+                   "X-Goog-Resource-URI": "https://www.googleapis.com/calendar/v3/calendars/primary/events",
+                   "X-Goog-Message-Number": str(self.notifications_sent)}
+        return _post(channel["address"], b"", headers)
+
+    def notify_watchers(self, state="exists"):
+        """Post a channel notification to every open channel; returns their statuses"""
+        return [self._notify(channel, state) for channel in list(self.channels.values())]
+
+    def _route(self, method, path, query, body=None):
+        params = urllib.parse.parse_qs(query)
+        parts = path.rstrip("/").split("/")
+        if method == "GET" and parts[-2:] == ["calendars", "primary"]:
+            return 200, {"id": "primary", "timeZone": self.timezone_name}
+        if method == "GET" and parts[-1] == "events":
+            return self._list_events(params)
+        if method == "POST" and parts[-2:] == ["events", "watch"]:
+            return self._watch(json.loads(body or "{}"))
+        if method == "POST" and parts[-2:] == ["channels", "stop"]:
+            request = json.loads(body or "{}")
+            if self.channels.pop(request.get("id"), None) is None:
+                return 404, {"error": {"code": 404, "message": "Channel not found"}}
+            return 200, {}
+        return 404, {"error": {"code": 404, "message": f"Not found: {path}"}}
+
+    def _watch(self, request):
+        ttl = int(request.get("params", {}).get("ttl", 604800))
+        channel = {"kind": "api#channel", "id": request["id"], "resourceId": f"res-{uuid.uuid4().hex[:12]}",
+                   "resourceUri": "https://www.googleapis.com/calendar/v3/calendars/primary/events",
+                   "expiration": str(int((time.time() + ttl) * 1000))}
+        self.channels[request["id"]] = {**channel, "address": request["address"], "token": request.get("token")}
+        # Like Google, confirm the channel with a "sync" message once it is open
+        threading.Thread(target=self._notify, args=(self.channels[request["id"]], "sync"), daemon=True).start()
+        return 200, channel
+
+    def _list_events(self, params):
+        events = sorted(self.events.values(), key=lambda e: e["id"])
+        if "syncToken" in params:
+            epoch, since = (int(x) for x in params["syncToken"][0].split("-"))
+            if epoch != self.token_epoch:
+                return 410, {"error": {"code": 410, "message": "Sync token is no longer valid, a full sync is required."}}
+            events = [e for e in events if e["_seq"] > since]
+        else:
+            time_min = parse(params["timeMin"][0]) if "timeMin" in params else None
+            time_max = parse(params["timeMax"][0]) if "timeMax" in params else None
+            events = [e for e in events if e["status"] != "cancelled"
+                      and (time_max is None or self._bound(e["start"]) < time_max)
+                      and (time_min is None or self._bound(e["end"]) > time_min)]
+
+        max_results = int(params.get("maxResults", ["250"])[0])
+        offset = int(params.get("pageToken", ["0"])[0])
+        page = events[offset:offset + max_results]
+        result = {"timeZone": self.timezone_name,
+                  "items": [{k: v for k, v in e.items() if not k.startswith("_")} for e in page]}
+        if offset + max_results < len(events):
+            result["nextPageToken"] = str(offset + max_results)
+        else:
+            result["nextSyncToken"] = f"{self.token_epoch}-{self.seq}"
+        return 200, result
+
+    def _bound(self, when):
+        if "date" in when:
+            return datetime.combine(parse(when["date"]).date(), datetime.min.time(), tzinfo=self.tz)
+        return parse(when["dateTime"])
+
+
+def _post(url, body, headers):
+    """POST a notification the way Google's push delivery does; returns the HTTP status (None if unreachable)"""
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers, method="POST"),
+                                    timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except urllib.error.URLError:
+        return None
+
+
+def build_fake_gmail_service(fake_http):
+    """Build a real Gmail API client wired to a FakeGmailHttp transport"""
+    return build("gmail", "v1", http=fake_http, static_discovery=True, cache_discovery=False)
+
+
+def build_fake_calendar_service(fake_http):
+    """Build a real Calendar API client wired to a FakeCalendarHttp transport"""
+    return build("calendar", "v3", http=fake_http, static_discovery=True, cache_discovery=False)
+
+
+class FakeGoogleServer:
+    """Local HTTP server in front of a FakeGmailHttp and a FakeCalendarHttp.
+
+    Requests under /gmail/ go to the Gmail fake and the rest to the Calendar
+    fake (the paths the discovery documents build relative to rootUrl);
+    batches, which both APIs post to /batch, go where their sub-requests
+    point. POST /token answers OAuth refreshes with a new access token. Each request is handled on its own
+    thread, so the fakes' latency overlaps like real round-trips do.
+    """
+
+    def __init__(self, gmail=None, calendar=None, host="127.0.0.1", port=0):
+        self.gmail = gmail or FakeGmailHttp()
+        self.calendar = calendar or FakeCalendarHttp()
+        self.token_refreshes = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._serve()
+
+            def do_POST(self):
+                self._serve()
+
+            def _serve(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+                path = urllib.parse.urlparse(self.path).path
+                if path.rstrip("/").endswith("/token"):
+                    server.token_refreshes += 1
+                    status, content_type = 200, "application/json"
+                    content = json.dumps({"access_token": f"fake-access-{time.time_ns()}", "expires_in": 3600,
+                                          "token_type": "Bearer"}).encode("utf-8")
+                else:
+                    fake = server.gmail if "/gmail/" in path or " /gmail/" in body else server.calendar
+                    resp, content = fake.request(self.path, self.command, body,
+                                                 {"content-type": self.headers.get("Content-Type")})
+                    status, content_type = int(resp.status), resp["content-type"]
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-google", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,162 @@
+"""
+Deterministic fast path for empty inputs.
+
+When the inbox has nothing worth summarizing or the calendar is empty, the
+agent for that input would spend an LLM call writing a canned sentence. The
+fast path writes the sentence from a template instead:
+
+    - one input empty: that task is answered by TemplateLLM (no network, see
+      utils/template_llm.py) and
+      compose_briefing receives the templated text as its context
+    - both inputs empty: the crew is skipped and the briefing is templated
+
+Templates exist in English and Spanish. The language is FAST_PATH_LANGUAGE,
+or with "auto" the browser's preferred one (stored in the session as
+"language"). Every briefing reports what was skipped under "fast_path", and
+fast_path_stats() counts the LLM calls saved in this worker.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from utils.google_auth import NO_EMAILS_TEXT
+from utils.calendar_sync import NO_EVENTS_TEXT
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_LANGUAGE = os.getenv("FAST_PATH_LANGUAGE", "auto")
+LANGUAGES = ("en", "es")
+
+TEMPLATES = {
+    "en": {
+        "no_emails": "You have no unread emails.",
+        "no_important_emails": "You have no important unread emails. Filtered out: {filtered}.",
+        "no_events": "You have no events scheduled today, so your whole day is free.",
+        "categories": {"promotional": "promotional", "social": "social", "spam": "spam"},
+        "briefing": "Good morning! {emails} {events} Enjoy a quiet day and use the time for whatever matters most to you.",
+    },
+    "es": {
+        "no_emails": "No tienes correos sin leer.",
+        "no_important_emails": "No tienes correos importantes sin leer. Filtrados: {filtered}.",
+        "no_events": "No tienes eventos programados hoy, así que tienes todo el día libre.",
+        "categories": {"promotional": "promocionales", "social": "de redes sociales", "spam": "spam"},
+        "briefing": "¡Buenos días! {emails} {events} Disfruta de un día tranquilo y dedica el tiempo a lo que más te importe.",
+    },
+}
+
+# LLM calls an agent makes for a task it answers directly
+CALLS_PER_TASK = 1
+TASK_COUNT = 3
+
+
+@dataclass
+class FastPathPlan:
+    language: str
+    task_outputs: dict = field(default_factory=dict)  # task name -> templated answer
+    briefing: str = None  # set when the whole crew is skipped
+
+    @property
+    def skipped_crew(self):
+        return self.briefing is not None
+
+    def llm_calls_saved(self):
+        return TASK_COUNT * CALLS_PER_TASK if self.skipped_crew else len(self.task_outputs) * CALLS_PER_TASK
+
+    def report(self):
+        return {
+            "language": self.language,
+            "skipped_tasks": sorted(self.task_outputs),
+            "skipped_crew": self.skipped_crew,
+            "llm_calls_saved": self.llm_calls_saved(),
+        }
+
+
+def resolve_language(session_data, setting=FAST_PATH_LANGUAGE):
+    language = session_data.get("language") if setting == "auto" else setting
+    return language if language in LANGUAGES else "en"
+
+
+def _email_template(text, details, strings):
+    if text == NO_EMAILS_TEXT:
+        return strings["no_emails"]
+    triage = details.get("triage")
+    if triage and triage["kept"] == 0:
+        if not triage["dropped"]:
+            return strings["no_emails"]
+        filtered = ", ".join(f"{count} {strings['categories'].get(category, category)}"
+                             for category, count in sorted(triage["dropped"].items()))
+        return strings["no_important_emails"].format(filtered=filtered)
+    return None
+
+
+def _calendar_template(text, details, strings):
+    return strings["no_events"] if text == NO_EVENTS_TEXT else None
+
+
+# task name -> (source, input name, template function)
+TASK_RULES = {
+    "summarize_emails": ("gmail", "emails_data", _email_template),
+    "analyze_calendar": ("calendar", "calendar_data", _calendar_template),
+}
+
+
+def plan_fast_path(inputs, ingestion, language="en", enabled=FAST_PATH_ENABLED):
+    """Templated answers for the tasks whose input is empty, or None if every task needs the LLM.
+
+    Only sources that were fetched successfully count as empty; a source that
+    failed or timed out is left to the LLM, which explains the gap.
+    """
+    if not enabled:
+        return None
+    strings = TEMPLATES[language]
+    plan = FastPathPlan(language=language)
+    for task_name, (source, input_name, template) in TASK_RULES.items():
+        details = ingestion["sources"].get(source, {})
+        if details.get("status") != "ok":
+            continue
+        answer = template(inputs[input_name], details, strings)
+        if answer is not None:
+            plan.task_outputs[task_name] = answer
+    if not plan.task_outputs:
+        return None
+    if len(plan.task_outputs) == len(TASK_RULES):
+        plan.briefing = strings["briefing"].format(
+            emails=plan.task_outputs["summarize_emails"], events=plan.task_outputs["analyze_calendar"]
+        )
+    return plan
+
+
+@contextmanager
+def templated_tasks(crew, task_outputs):
+    """Answer the named tasks of a (leased) crew from templates for one kickoff"""
+    from utils.template_llm import TemplateLLM
+    swapped = []
+    for task in crew.tasks:
+        if task.name in task_outputs:
+            swapped.append((task.agent, task.agent.llm))
+            task.agent.llm = TemplateLLM(task_outputs[task.name])
+    try:
+        yield crew
+    finally:
+        for agent, llm in swapped:
+            agent.llm = llm
+
+
+_stats = {"briefings": 0, "fast_path_briefings": 0, "skipped_crews": 0, "skipped_tasks": 0, "llm_calls_saved": 0}
+_stats_lock = threading.Lock()
+
+
+def record(plan):
+    """Count a briefing (with its plan, or None when it used the full crew)"""
+    with _stats_lock:
+        _stats["briefings"] += 1
+        if plan is not None:
+            _stats["fast_path_briefings"] += 1
+            _stats["skipped_crews"] += plan.skipped_crew
+            _stats["skipped_tasks"] += TASK_COUNT if plan.skipped_crew else len(plan.task_outputs)
+            _stats["llm_calls_saved"] += plan.llm_calls_saved()
+
+
+def fast_path_stats():
+    with _stats_lock:
+        return {"enabled": FAST_PATH_ENABLED, **_stats}
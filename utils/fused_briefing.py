@@ -0,0 +1,149 @@
+"""
+Fused pipeline engine: the briefing in one LLM call instead of a three-task crew.
+
+The crew asks the calendar and email agents for their summaries and then
+asks the summary agent to combine them - three round-trips plus CrewAI's
+agent prompts. The fused engine sends one structured prompt carrying both
+inputs and the three agents' rules, and gets the briefing back directly.
+
+Inboxes over FUSED_MAP_REDUCE_TOKENS are first split into chunks of at most
+FUSED_EMAIL_CHUNK_TOKENS that are summarized in parallel (map), and the
+briefing is written from those notes (reduce) - usually two calls in total.
+An inbox that fits in one chunk goes to the briefing call as it is: a map
+step over a single chunk would only add a round-trip.
+
+The engine uses the template crew's agent LLMs (email agent for the map step,
+summary agent for the briefing) so caching, streaming and offline stubs apply
+to both engines alike.
+"""
+import os
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.briefing_stream import stream_llm, FINAL_ANSWER
+from utils.input_packer import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+FUSED_EMAIL_CHUNK_TOKENS = int(os.getenv("FUSED_EMAIL_CHUNK_TOKENS", "6000"))
+FUSED_MAP_REDUCE_TOKENS = int(os.getenv("FUSED_MAP_REDUCE_TOKENS", str(FUSED_EMAIL_CHUNK_TOKENS)))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("FUSED_MAP_WORKERS", "4")), thread_name_prefix="fused-map")
+
+BRIEFING_SYSTEM = """You are an executive assistant writing a daily briefing for a busy professional, based only on the inputs.
+
+Emails:
+- Summarize the 3-5 most important unread emails (work-related, personal, meetings, invoices, projects); give the rest a few words each.
+- Do not analyze spam or ads, just say how many there were. Emails filtered out before analysis are counted at the end of the list; include them in that count.
+- If nothing relevant exists, say that no important emails were found today.
+
+Calendar:
+- List every event scheduled for today, keeping titles and times as written. Events can be in English or Spanish.
+- Overlapping events and free time gaps are precomputed and correct: report them as given, do not recompute them.
+
+Never add tasks, meetings, tips, or emails that aren't present. If an input says nothing useful was found, say so honestly.
+Write in a friendly, human-sounding tone."""
+
+BRIEFING_PROMPT = """{email_heading}:
+{emails}
+
+TODAY'S CALENDAR:
+{calendar}
+
+Write the daily briefing. Start your reply with "{marker}" followed by the briefing text."""
+
+MAP_SYSTEM = """You are a strict assistant picking out the emails worth a busy professional's attention.
+Keep work-related, personal, meeting, invoice and project emails; count promotional, marketing and spam emails instead of describing them.
+Never invent emails or content that is not in the input."""
+
+MAP_PROMPT = """EMAILS (part {part} of {parts}):
+{emails}
+
+Start your reply with "{marker}", then write one line per email worth reading (sender, subject, what is needed) and a final line with the number of promotional/spam emails, including any counted as filtered out above."""
+
+
+def final_answer(text):
+    """The text after the last "Final Answer:" marker (the whole text if there is none)"""
+    return text.rpartition(FINAL_ANSWER)[2].strip()
+
+
+def chunk_lines(text, max_tokens=FUSED_EMAIL_CHUNK_TOKENS):
+    """Split text at line boundaries into chunks of about `max_tokens` each"""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines():
+        tokens = estimate_tokens(line) + 1
+        if current and size + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _llms():
+    from crew import crew
+    agents = {agent.role: agent for agent in crew.agents}
+    return agents["Email Summarizer"].llm, agents["Daily Briefing Composer"].llm
+
+
+def _summarize_chunk(llm, part, parts, emails):
+    messages = [
+        {"role": "system", "content": MAP_SYSTEM},
+        {"role": "user", "content": MAP_PROMPT.format(part=part, parts=parts, emails=emails, marker=FINAL_ANSWER)},
+    ]
+    return final_answer(llm.call(messages))
+
+
+def run_fused(inputs, progress, on_token, on_restart=lambda: None):
+    """Write the briefing with one LLM call (two or more with map-reduce).
+
+    Same inputs as crew.kickoff(); returns (briefing text, details) where
+    details has the call count and number of email chunks.
+    """
+    map_llm, briefing_llm = _llms()
+    emails = inputs["emails_data"]
+    email_heading = "UNREAD EMAILS"
+    calls = 0
+    chunks = []
+
+    if estimate_tokens(emails) > FUSED_MAP_REDUCE_TOKENS:
+        chunks = chunk_lines(emails)
+        if len(chunks) == 1:
+            chunks = []  # fits in one chunk: no map step
+    if chunks:
+        logger.info(f"Fused engine: summarizing {len(chunks)} email chunks before the briefing")
+        futures = [
+            _executor.submit(contextvars.copy_context().run, _summarize_chunk, map_llm, n, len(chunks), chunk)
+            for n, chunk in enumerate(chunks, 1)
+        ]
+        emails = "\n".join(future.result() for future in futures)
+        email_heading = f"EMAIL NOTES (summarized from {len(chunks)} parts of the inbox)"
+        calls += len(chunks)
+        progress("Email summary done")
+
+    messages = [
+        {"role": "system", "content": BRIEFING_SYSTEM},
+        {"role": "user", "content": BRIEFING_PROMPT.format(
+            email_heading=email_heading, emails=emails, calendar=inputs["calendar_data"], marker=FINAL_ANSWER
+        )},
+    ]
+    streamed = []
+
+    def forward(text):
+        streamed.append(text)
+        on_token(text)
+
+    def restart():
+        streamed.clear()
+        on_restart()
+
+    with stream_llm(forward, restart):
+        briefing = final_answer(briefing_llm.call(messages))
+    calls += 1
+    if not streamed:
+        on_token(briefing)  # not streamed, or the model skipped the marker
+    progress("Briefing written")
+    return briefing, {"llm_calls": calls, "email_chunks": len(chunks)}
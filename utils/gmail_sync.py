@@ -0,0 +1,242 @@
+"""
+Incremental Gmail sync using the history API.
+
+The first sync for a user lists the INBOX and fetches message metadata in
+batches (see google_auth.batch_get_gmail_messages), then remembers the
+mailbox historyId. Later syncs call users().history().list() from that id and
+only fetch messages that were added; deletions and label changes are applied
+to the local store. When nothing changed a refresh costs one small API call.
+
+Gmail only keeps history for a limited time: an expired startHistoryId returns
+404, in which case the user is fully resynced.
+
+Parsed messages live in a per-user SQLite store (GMAIL_SYNC_DB_PATH) shared by
+all gunicorn workers.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+
+from googleapiclient.errors import HttpError
+
+from utils.google_auth import GMAIL_MAX_RESULTS, fetch_gmail_messages, batch_get_gmail_messages
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+GMAIL_SYNC_DB_PATH = os.getenv("GMAIL_SYNC_DB_PATH", "/tmp/gmail_sync.db")
+# Messages kept per user; older ones are dropped from the local store
+GMAIL_SYNC_STORE_LIMIT = int(os.getenv("GMAIL_SYNC_STORE_LIMIT", "500"))
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_key TEXT PRIMARY KEY,
+    history_id INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    user_key TEXT NOT NULL,
+    id TEXT NOT NULL,
+    internal_date INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_key, id)
+);
+CREATE INDEX IF NOT EXISTS messages_by_date ON messages (user_key, internal_date DESC);
+"""
+
+_user_locks = {}
+_user_locks_guard = threading.Lock()
+
+
+def _lock_for(user_key):
+    with _user_locks_guard:
+        return _user_locks.setdefault(user_key, threading.Lock())
+
+
+class MailboxStore:
+    """SQLite store of parsed message metadata and the last synced historyId per user"""
+
+    def __init__(self, path=GMAIL_SYNC_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def get_history_id(self, user_key):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT history_id FROM sync_state WHERE user_key = ?", (user_key,)).fetchone()
+        return row[0] if row else None
+
+    def apply(self, user_key, history_id, upserts=(), deletes=(), replace=False):
+        """Atomically write message changes and advance the stored historyId"""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if replace:
+                conn.execute("DELETE FROM messages WHERE user_key = ?", (user_key,))
+            conn.executemany(
+                "DELETE FROM messages WHERE user_key = ? AND id = ?",
+                [(user_key, message_id) for message_id in deletes]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages (user_key, id, internal_date, data) VALUES (?, ?, ?, ?)",
+                [(user_key, m["id"], int(m.get("internalDate", 0)), json.dumps(m)) for m in upserts]
+            )
+            conn.execute(
+                "DELETE FROM messages WHERE user_key = ? AND id NOT IN ("
+                "SELECT id FROM messages WHERE user_key = ? ORDER BY internal_date DESC LIMIT ?)",
+                (user_key, user_key, GMAIL_SYNC_STORE_LIMIT)
+            )
+            conn.execute(
+                "INSERT INTO sync_state (user_key, history_id, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_key) DO UPDATE SET history_id = MAX(history_id, excluded.history_id), "
+                "synced_at = excluded.synced_at",
+                (user_key, int(history_id), time.time())
+            )
+            conn.execute("COMMIT")
+
+    def update_labels(self, user_key, label_ops):
+        """Apply (message_id, added, removed) label changes to stored messages, in order"""
+        if not label_ops:
+            return
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for message_id, added, removed in label_ops:
+                row = conn.execute(
+                    "SELECT data FROM messages WHERE user_key = ? AND id = ?", (user_key, message_id)
+                ).fetchone()
+                if row is None:
+                    continue
+                message = json.loads(row[0])
+                labels = [l for l in message.get("labelIds", []) if l not in removed]
+                message["labelIds"] = labels + [l for l in added if l not in labels]
+                conn.execute(
+                    "UPDATE messages SET data = ? WHERE user_key = ? AND id = ?",
+                    (json.dumps(message), user_key, message_id)
+                )
+            conn.execute("COMMIT")
+
+    def newest(self, user_key, limit):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT data FROM messages WHERE user_key = ? ORDER BY internal_date DESC LIMIT ?",
+                (user_key, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def forget(self, user_key):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM messages WHERE user_key = ?", (user_key,))
+            conn.execute("DELETE FROM sync_state WHERE user_key = ?", (user_key,))
+
+
+@timed("gmail_profile")
+def _profile_history_id(service):
+    return int(service.users().getProfile(userId="me", fields="historyId").execute()["historyId"])
+
+
+def full_sync(service, store, user_key, max_results):
+    """List and fetch the newest INBOX messages, replacing the user's store"""
+    # Read the historyId first so changes made while we list are replayed next time
+    history_id = _profile_history_id(service)
+    messages = fetch_gmail_messages(service, max_results)
+    store.apply(user_key, history_id, upserts=messages, replace=True)
+    logger.info(f"Gmail full sync stored {len(messages)} messages at historyId {history_id}")
+    return {"mode": "full", "fetched": len(messages)}
+
+
+@timed("gmail_history")
+def _read_history(service, start_history_id):
+    """Collect all history records since start_history_id. Returns (records, latest historyId)."""
+    records = []
+    page_token = None
+    while True:
+        response = service.users().history().list(
+            userId="me",
+            startHistoryId=start_history_id,
+            labelId="INBOX",
+            historyTypes=HISTORY_TYPES,
+            pageToken=page_token,
+            maxResults=500
+        ).execute()
+        records.extend(response.get("history", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return records, int(response["historyId"])
+
+
+def incremental_sync(service, store, user_key, start_history_id):
+    """Apply the history delta since start_history_id to the store"""
+    records, history_id = _read_history(service, start_history_id)
+    in_inbox = {}  # message_id -> whether it is in the INBOX after the delta (last change wins)
+    label_ops = []
+
+    for record in records:
+        for change in record.get("messagesAdded", []):
+            if "INBOX" in change["message"].get("labelIds", []):
+                in_inbox[change["message"]["id"]] = True
+        for change in record.get("messagesDeleted", []):
+            in_inbox[change["message"]["id"]] = False
+        for kind, present in (("labelsAdded", True), ("labelsRemoved", False)):
+            for change in record.get(kind, []):
+                message_id = change["message"]["id"]
+                labels = change.get("labelIds", [])
+                if "INBOX" in labels:
+                    in_inbox[message_id] = present
+                else:
+                    label_ops.append((message_id, labels if present else [], [] if present else labels))
+
+    to_fetch = [message_id for message_id, present in in_inbox.items() if present]
+    deleted = [message_id for message_id, present in in_inbox.items() if not present]
+    fetched = batch_get_gmail_messages(service, to_fetch) if to_fetch else []
+    store.update_labels(user_key, [op for op in label_ops if op[0] not in in_inbox])
+    store.apply(user_key, history_id, upserts=fetched, deletes=deleted)
+
+    logger.info(f"Gmail incremental sync: {len(records)} history records, "
+                f"{len(fetched)} fetched, {len(deleted)} removed, historyId {history_id}")
+    return {"mode": "incremental", "history_records": len(records),
+            "fetched": len(fetched), "removed": len(deleted)}
+
+
+def sync_mailbox(service, user_key, store=None, max_results=GMAIL_MAX_RESULTS):
+    """Bring the user's local store up to date and return (newest messages, sync report)"""
+    store = store or default_store()
+    with _lock_for(user_key):
+        start_history_id = store.get_history_id(user_key)
+        if start_history_id is None:
+            report = full_sync(service, store, user_key, max_results)
+        else:
+            try:
+                report = incremental_sync(service, store, user_key, start_history_id)
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                logger.warning(f"Gmail historyId {start_history_id} expired, running a full resync")
+                report = full_sync(service, store, user_key, max_results)
+                report["mode"] = "resync"
+
+        messages = store.newest(user_key, max_results)
+        if report.get("removed") and len(messages) < max_results:
+            # Deletions left a gap below messages we never fetched; refill from the server
+            report = full_sync(service, store, user_key, max_results)
+            report["mode"] = "refill"
+            messages = store.newest(user_key, max_results)
+
+    return messages, report
+
+
+_default_store = None
+
+
+def default_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = MailboxStore()
+    return _default_store
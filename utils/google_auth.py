@@ -2,14 +2,18 @@ import os, flask, pathlib, json, base64
 import google.auth.transport.requests
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from dateutil.parser import parse
+from utils.google_services import pooled_service, account_key
+from utils.credential_store import credential_store
+from utils.metrics import timed
 from datetime import datetime
+import logging
 import warnings
 
 # Suppress all OAuth warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="google_auth_oauthlib")
 
+logger = logging.getLogger(__name__)
+
 SCOPES = [
     "https://www.googleapis.com/auth/gmail.readonly",
     "https://www.googleapis.com/auth/calendar.readonly"
@@ -18,6 +22,15 @@ SCOPES = [
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
 CLIENT_SECRETS_FILE = BASE_DIR / "credentials.json"
 
+# Gmail fetch tuning. Gmail caps list() pages at 500 and recommends batches of at most 50.
+GMAIL_MAX_RESULTS = int(os.getenv("GMAIL_MAX_RESULTS", "10"))
+GMAIL_BATCH_SIZE = min(int(os.getenv("GMAIL_BATCH_SIZE", "50")), 100)
+GMAIL_LIST_PAGE_SIZE = 500
+GMAIL_METADATA_HEADERS = ["From", "Subject", "Date", "List-Unsubscribe"]
+GMAIL_MESSAGE_FIELDS = "id,threadId,labelIds,snippet,internalDate,payload/headers"
+
+NO_EMAILS_TEXT = "No unread emails."
+
 def get_client_secrets():
     """Get client secrets from file or environment variable"""
     # Try to get credentials from environment variable first
@@ -96,9 +109,11 @@ def fetch_token_safely(flow, authorization_response):
         
         print("Token fetch successful with permissive approach!")
         
-        # Create credentials object manually
+        # Create credentials object manually. With the expiry set, the token store can
+        # refresh the access token before it runs out instead of after a failed call.
         creds = Credentials(
             token=token['access_token'],
+            expiry=datetime.utcfromtimestamp(token['expires_at']) if 'expires_at' in token else None,
             refresh_token=token.get('refresh_token'),
             token_uri='https://oauth2.googleapis.com/token',
             client_id=client_id,
@@ -123,67 +138,155 @@ def fetch_token_safely(flow, authorization_response):
         else:
             raise Exception(f"OAuth authentication failed: {e}")
 
-def is_today(event_time_str):
-    event_date = parse(event_time_str).date()
-    return event_date == datetime.now().date()
-
 def get_credentials_from_session(session):
-    if "credentials" not in session:
+    """The user's live credentials from the server-side store (the session only holds their key)"""
+    if "user_key" not in session:
         return None
-    return Credentials(**session["credentials"])
+    return credential_store().get(session["user_key"])
+
+def account_key_for(creds):
+    """User key of the Google account behind `creds` (one Gmail getProfile round-trip).
+
+    Keyed by account rather than by token: every sign-in with prompt=consent
+    issues a new refresh token, and the user's schedules, briefing history and
+    push channels must survive it.
+    """
+    with pooled_service("gmail", "v1", creds) as service:
+        profile = service.users().getProfile(userId="me").execute()
+    return account_key(profile["emailAddress"])
 
 def store_credentials_in_session(session, creds):
-    session["credentials"] = {
-        "token": creds.token,
-        "refresh_token": creds.refresh_token,
-        "token_uri": creds.token_uri,
-        "client_id": creds.client_id,
-        "client_secret": creds.client_secret,
-        "scopes": creds.scopes
-    }
-
-def fetch_gmail_summary(session):
-    creds = get_credentials_from_session(session)
-    if not creds:
-        return "⚠️ Not logged in to Google."
+    user_key = account_key_for(creds)
+    credential_store().save(creds, user_key)
+    credential_store().touch(user_key, force=True)
+    session["user_key"] = user_key
 
-    service = build("gmail", "v1", credentials=creds)
-    response = service.users().messages().list(userId="me", labelIds=["INBOX"], maxResults=10).execute()
+def get_header(message, name):
+    """Return the value of a message header (case-insensitive), or an empty string"""
+    for header in message.get("payload", {}).get("headers", []):
+        if header.get("name", "").lower() == name.lower():
+            return header.get("value", "")
+    return ""
 
-    messages = response.get("messages", [])
-    summaries = []
+@timed("gmail_list")
+def list_gmail_message_ids(service, max_results=GMAIL_MAX_RESULTS, label_ids=("INBOX",)):
+    """List up to max_results message ids, following nextPageToken as needed"""
+    ids = []
+    page_token = None
+    while len(ids) < max_results:
+        response = service.users().messages().list(
+            userId="me",
+            labelIds=list(label_ids),
+            maxResults=min(max_results - len(ids), GMAIL_LIST_PAGE_SIZE),
+            pageToken=page_token,
+            fields="messages/id,nextPageToken"
+        ).execute()
+        ids.extend(m["id"] for m in response.get("messages", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return ids[:max_results]
 
-    for msg in messages:
-        msg_data = service.users().messages().get(userId="me", id=msg["id"]).execute()
-        snippet = msg_data.get("snippet", "")
-        summaries.append(snippet)
+@timed("gmail_get")
+def batch_get_gmail_messages(service, message_ids, batch_size=GMAIL_BATCH_SIZE):
+    """Fetch message metadata for message_ids using batched HTTP requests.
+
+    Each batch is a single round-trip carrying up to batch_size get() calls and
+    asks only for the fields we use. Sub-requests that fail (e.g. per-user rate
+    limits) are retried once in a follow-up batch. Results keep the order of
+    message_ids; messages that still fail are skipped.
+    """
+    results = {}
+    failed = []
+
+    def handle(request_id, response, exception):
+        if exception is not None:
+            failed.append(request_id)
+        else:
+            results[request_id] = response
 
-    return " ".join(summaries) if summaries else "No unread emails."
+    def run_batches(ids):
+        for start in range(0, len(ids), batch_size):
+            batch = service.new_batch_http_request(callback=handle)
+            for message_id in ids[start:start + batch_size]:
+                batch.add(
+                    service.users().messages().get(
+                        userId="me",
+                        id=message_id,
+                        format="metadata",
+                        metadataHeaders=GMAIL_METADATA_HEADERS,
+                        fields=GMAIL_MESSAGE_FIELDS
+                    ),
+                    request_id=message_id
+                )
+            batch.execute()
+
+    run_batches(list(message_ids))
+    if failed:
+        retry_ids, failed[:] = list(failed), []
+        logger.warning(f"Retrying {len(retry_ids)} failed Gmail message fetches...")
+        run_batches(retry_ids)
+        if failed:
+            logger.warning(f"Skipping {len(failed)} Gmail messages that could not be fetched")
+
+    return [results[message_id] for message_id in message_ids if message_id in results]
+
+def fetch_gmail_messages(service, max_results=GMAIL_MAX_RESULTS):
+    """List the newest INBOX messages and fetch their metadata in batches"""
+    message_ids = list_gmail_message_ids(service, max_results)
+    return batch_get_gmail_messages(service, message_ids)
+
+def fetch_gmail_summary(session, report=None):
+    """The newest INBOX messages packed into a token budget, with junk mail collapsed into counts.
+
+    If a `report` dict is given it is filled with sync, triage and packing statistics.
+    """
+    from utils.gmail_sync import sync_mailbox
+    from utils.email_triage import triage_messages
+    from utils.input_packer import pack_emails, render_email
 
-def fetch_calendar_summary(session):
     creds = get_credentials_from_session(session)
     if not creds:
         return "⚠️ Not logged in to Google."
 
-    service = build("calendar", "v3", credentials=creds)
-    now = datetime.utcnow().isoformat() + "Z"
+    with pooled_service("gmail", "v1", creds) as service:
+        messages, sync_report = sync_mailbox(service, session["user_key"])
+
+    if not messages:
+        return NO_EMAILS_TEXT
 
-    events_result = service.events().list(
-        calendarId="primary",
-        timeMin=now,
-        maxResults=5,
-        singleEvents=True,
-        orderBy="startTime"
-    ).execute()
+    triage = triage_messages(messages, render=render_email)
+    if triage.dropped:
+        logger.info(f"Email triage dropped {sum(triage.dropped.values())} of {len(messages)} messages "
+                    f"(~{triage.tokens_removed} tokens)")
+    if not triage.kept:
+        text, packing = triage.summary_line(), None
+    else:
+        text, packing = pack_emails(triage.kept, footer=triage.summary_line())
+        logger.info(f"Packed {len(triage.kept)} emails into ~{packing['tokens']}/{packing['budget']} tokens "
+                    f"({packing['omitted']} threads not shown)")
 
-    events = events_result.get("items", [])
-    if not events:
-        return "You have no events today."
+    if report is not None:
+        report["sync"] = sync_report
+        report["triage"] = triage.report()
+        if packing:
+            report["packing"] = packing
+    return text
+
+def fetch_calendar_summary(session, report=None):
+    from utils.calendar_sync import sync_calendar_day, format_calendar_analysis
+    from utils.input_packer import calendar_budget, estimate_tokens
+
+    creds = get_credentials_from_session(session)
+    if not creds:
+        return "⚠️ Not logged in to Google."
 
-    summary_lines = []
-    for event in events:
-        start = event["start"].get("dateTime", event["start"].get("date"))
-        if is_today(start):
-            summary_lines.append(f"{start}: {event.get('summary', 'No title')}")
+    with pooled_service("calendar", "v3", creds) as service:
+        analysis, sync_report = sync_calendar_day(service, session["user_key"])
 
-    return "\n".join(summary_lines)
\ No newline at end of file
+    text = format_calendar_analysis(analysis, budget=calendar_budget())
+    if report is not None:
+        report["sync"] = sync_report
+        report["conflicts"] = len(analysis["conflicts"])
+        report["tokens"] = estimate_tokens(text)
+    return text
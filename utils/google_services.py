@@ -0,0 +1,120 @@
+"""
+Per-process factory for Google API service objects.
+
+googleapiclient.discovery.build() re-reads and parses the discovery document
+and creates a fresh httplib2 transport on every call. This module parses each
+discovery document once (preload_discovery_documents() runs at app startup)
+and keeps a pool of built, authorized services per user so a briefing can
+reuse the transport - and its open TLS connection - from the previous one.
+
+httplib2.Http is not thread-safe, so services are leased: pooled_service()
+hands out an idle instance (or builds one) and returns it to the pool when the
+block exits without an error; a service whose block raised is dropped. Idle
+instances expire after SERVICE_POOL_TTL seconds.
+"""
+import os
+import time
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import httplib2
+import google_auth_httplib2
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+SERVICE_POOL_TTL = float(os.getenv("SERVICE_POOL_TTL", "600"))
+SERVICE_POOL_MAX_IDLE = int(os.getenv("SERVICE_POOL_MAX_IDLE", "256"))
+HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "30"))
+# Serve the Google APIs from another host, e.g. the fake server of benchmarks/e2e.py
+GOOGLE_API_ROOT_URL = os.getenv("GOOGLE_API_ROOT_URL")
+
+# APIs used by the briefing assistant
+DISCOVERY_APIS = [("gmail", "v1"), ("calendar", "v3")]
+
+_discovery_docs = {}
+_pool = {}  # (user_key, api, version) -> [(service, idle_since), ...]
+_lock = threading.Lock()
+
+
+def preload_discovery_documents(apis=DISCOVERY_APIS):
+    """Parse the bundled discovery documents once and keep them in memory"""
+    for api, version in apis:
+        get_discovery_document(api, version)
+
+
+def get_discovery_document(api, version):
+    key = (api, version)
+    doc = _discovery_docs.get(key)
+    if doc is None:
+        content = discovery_cache.get_static_doc(api, version)
+        if content is None:
+            raise ValueError(f"No bundled discovery document for {api} {version}")
+        doc = json.loads(content)
+        if GOOGLE_API_ROOT_URL:
+            # Requests and batch requests are both addressed relative to rootUrl
+            doc["rootUrl"] = GOOGLE_API_ROOT_URL.rstrip("/") + "/"
+        _discovery_docs[key] = doc
+    return doc
+
+
+def user_key_for(creds):
+    """Pool key for a set of credentials (the refresh token outlives access tokens, not a sign-in)"""
+    secret = creds.refresh_token or creds.token or ""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+def account_key(account_id):
+    """User key for a Google account id (its email address); the same on every sign-in"""
+    return hashlib.sha256(account_id.encode("utf-8")).hexdigest()[:16]
+
+
+def build_service(api, version, creds):
+    """Build an authorized service from the cached discovery document"""
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+    return build_from_document(get_discovery_document(api, version), http=http)
+
+
+def _evict_expired(now):
+    for key in list(_pool):
+        idle = [(s, t) for s, t in _pool[key] if now - t < SERVICE_POOL_TTL]
+        if idle:
+            _pool[key] = idle
+        else:
+            del _pool[key]
+
+
+@contextmanager
+def pooled_service(api, version, creds):
+    """Lease a service for `creds`, building one only if none is idle"""
+    key = (user_key_for(creds), api, version)
+    service = None
+    with _lock:
+        _evict_expired(time.monotonic())
+        idle = _pool.get(key)
+        if idle:
+            service, _ = idle.pop()
+
+    if service is None:
+        service = build_service(api, version, creds)
+
+    # Not returned to the pool if the block raised: its connection may be half-read or its auth broken
+    yield service
+    with _lock:
+        if sum(len(v) for v in _pool.values()) < SERVICE_POOL_MAX_IDLE:
+            _pool.setdefault(key, []).append((service, time.monotonic()))
+
+
+def clear_service_pool():
+    with _lock:
+        _pool.clear()
+
+
+def pool_stats():
+    with _lock:
+        return {
+            "users": len({key[0] for key in _pool}),
+            "idle_services": sum(len(v) for v in _pool.values()),
+            "discovery_documents": len(_discovery_docs),
+        }
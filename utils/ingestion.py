@@ -0,0 +1,93 @@
+"""
+Concurrent ingestion of the briefing's data sources.
+
+Gmail and Calendar only share credentials, so they are fetched in parallel on
+a shared thread pool. Each source has its own timeout; a source that fails or
+times out is replaced by a short note so the briefing can still be built from
+the data that did arrive.
+"""
+import os
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from utils.google_auth import fetch_gmail_summary, fetch_calendar_summary
+
+logger = logging.getLogger(__name__)
+
+GMAIL_FETCH_TIMEOUT = float(os.getenv("GMAIL_FETCH_TIMEOUT", "20"))
+CALENDAR_FETCH_TIMEOUT = float(os.getenv("CALENDAR_FETCH_TIMEOUT", "15"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INGESTION_WORKERS", "8")),
+    thread_name_prefix="ingestion"
+)
+
+# input name, fetcher, timeout, text passed to the crew when the source is unavailable
+SOURCES = {
+    "gmail": ("emails_data", fetch_gmail_summary, GMAIL_FETCH_TIMEOUT,
+              "Email data is unavailable right now ({reason}), so this briefing does not cover email."),
+    "calendar": ("calendar_data", fetch_calendar_summary, CALENDAR_FETCH_TIMEOUT,
+                 "Calendar data is unavailable right now ({reason}), so this briefing does not cover today's events."),
+}
+
+
+def _timed(fetcher, session):
+    details = {}
+    start = time.perf_counter()
+    result = fetcher(session, details)
+    return result, time.perf_counter() - start, details
+
+
+def fetch_briefing_sources(session, sources=SOURCES):
+    """Fetch all sources concurrently and return (inputs, report).
+
+    `session` must be a plain mapping (e.g. dict(flask.session)) because the
+    fetchers run outside the request context. Fetchers are called as
+    fetcher(session, details) and may add statistics to the details dict.
+    `inputs` is ready for crew.kickoff(); `report` holds per-source status,
+    timings and details plus any warnings about degraded sources, and
+    started_at: the epoch time the data was read from, which a stored
+    briefing is dated by. Raises RuntimeError if no source succeeds.
+    """
+    started_at = time.time()
+    start = time.perf_counter()
+    # Each fetch runs in a copy of the caller's context so its log lines keep the job id
+    futures = {
+        name: _executor.submit(contextvars.copy_context().run, _timed, fetcher, session)
+        for name, (_, fetcher, _, _) in sources.items()
+    }
+
+    inputs = {}
+    report = {"started_at": started_at, "sources": {}, "warnings": []}
+    for name, future in futures.items():
+        input_name, _, timeout, fallback = sources[name]
+        remaining = max(timeout - (time.perf_counter() - start), 0)
+        try:
+            data, seconds, details = future.result(timeout=remaining)
+            inputs[input_name] = data
+            report["sources"][name] = {"status": "ok", "seconds": round(seconds, 3), **details}
+            logger.info(f"{name} ingestion finished in {seconds:.2f}s ({len(data)} characters)")
+        except FutureTimeoutError:
+            future.cancel()
+            reason = f"timed out after {timeout:g}s"
+            inputs[input_name] = fallback.format(reason=reason)
+            report["sources"][name] = {"status": "timeout", "seconds": round(timeout, 3)}
+            report["warnings"].append(f"{name} {reason}")
+            logger.warning(f"{name} ingestion {reason}")
+        except Exception as e:
+            seconds = time.perf_counter() - start
+            inputs[input_name] = fallback.format(reason="fetch failed")
+            report["sources"][name] = {"status": "error", "seconds": round(seconds, 3), "error": str(e)}
+            report["warnings"].append(f"{name} fetch failed: {e}")
+            logger.error(f"{name} ingestion failed: {e}", exc_info=True)
+
+    if not any(s["status"] == "ok" for s in report["sources"].values()):
+        raise RuntimeError("All data sources failed: " + "; ".join(report["warnings"]))
+
+    wall = time.perf_counter() - start
+    report["wall_seconds"] = round(wall, 3)
+    report["sequential_seconds"] = round(sum(s["seconds"] for s in report["sources"].values()), 3)
+    report["saved_seconds"] = round(max(report["sequential_seconds"] - wall, 0), 3)
+    return inputs, report
@@ -0,0 +1,170 @@
+"""
+Token-budgeted packing of the crew's inputs.
+
+Emails and calendar data are rendered as compact, structured lines and fitted
+to a token budget that depends on the models routed to the agent reading
+them (<AGENT>_AGENT_MODELS and the fallbacks, see utils/llm_router.py; the
+smallest budget wins, since any of them may get the prompt), so the prompt (and
+the OpenRouter latency and cost that come with it) stays bounded no matter
+how many messages a user has.
+
+Emails: one line per thread (the newest message, with a count of collapsed
+replies), ordered by priority - IMPORTANT/STARRED, then UNREAD, then recency.
+Whatever does not fit is summarized as a single "N more emails in M threads"
+line.
+
+Token counts are estimated offline (no tokenizer download or API call).
+"""
+import os
+import math
+import html
+from datetime import datetime, timezone
+from email.utils import parseaddr
+
+from utils.google_auth import get_header
+
+# Tokens available for emails_data + calendar_data, by model name prefix.
+# These are deliberately far below the context windows: the same data is
+# repeated in task context and the agents' own prompts need room too.
+MODEL_INPUT_BUDGETS = {
+    "mistralai/mistral-7b-instruct": 3000,
+    "meta-llama/llama-3": 3000,
+    "openai/gpt-4o": 8000,
+    "anthropic/claude": 8000,
+    "google/gemini": 8000,
+}
+DEFAULT_INPUT_BUDGET = 3000
+
+INPUT_TOKEN_BUDGET = int(os.getenv("INPUT_TOKEN_BUDGET", "0"))  # 0 = per-model default
+INPUT_EMAIL_SHARE = float(os.getenv("INPUT_EMAIL_SHARE", "0.7"))
+EMAIL_SNIPPET_CHARS = int(os.getenv("EMAIL_SNIPPET_CHARS", "160"))
+
+PRIORITY_LABELS = {"IMPORTANT": 2, "STARRED": 2, "UNREAD": 1}
+
+
+def estimate_tokens(text):
+    """Offline token estimate (about four characters per token for English/Spanish text)"""
+    return math.ceil(len(text) / 4)
+
+
+def input_budget(model=None):
+    """Total token budget for the crew's data inputs"""
+    if INPUT_TOKEN_BUDGET:
+        return INPUT_TOKEN_BUDGET
+    model = (model or os.getenv("OPENROUTER_MODEL", "")).removeprefix("openrouter/")
+    for prefix, budget in MODEL_INPUT_BUDGETS.items():
+        if model.startswith(prefix):
+            return budget
+    return DEFAULT_INPUT_BUDGET
+
+
+def agent_input_budget(agent):
+    """Smallest input budget among the models routed to `agent` ("email", "calendar")"""
+    from utils.llm_router import agent_models
+    return min(input_budget(model.split("@")[0]) for model in agent_models(agent))
+
+
+def email_budget(model=None):
+    """Tokens for emails_data; without `model`, for the email agent's routed models"""
+    total = input_budget(model) if model else agent_input_budget("email")
+    return int(total * INPUT_EMAIL_SHARE)
+
+
+def calendar_budget(model=None):
+    """Tokens for calendar_data; without `model`, for the calendar agent's routed models"""
+    total = input_budget(model) if model else agent_input_budget("calendar")
+    return total - int(total * INPUT_EMAIL_SHARE)
+
+
+def fit_lines(lines, budget, overflow=lambda n: f"- ... and {n} more"):
+    """Take lines in order while they fit in `budget` tokens.
+
+    Returns (included lines, number omitted). When lines are omitted the
+    overflow line is appended and counted against the budget.
+    """
+    included, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1  # newline
+        if used + cost > budget:
+            break
+        included.append(line)
+        used += cost
+    omitted = len(lines) - len(included)
+    if omitted:
+        # Make room for the overflow line itself
+        while included and used + estimate_tokens(overflow(omitted)) + 1 > budget:
+            used -= estimate_tokens(included.pop()) + 1
+            omitted += 1
+        included.append(overflow(omitted))
+    return included, omitted
+
+
+def _truncate(text, limit):
+    text = " ".join(html.unescape(text).split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def _sender(message):
+    name, address = parseaddr(get_header(message, "From"))
+    return name or address or "Unknown sender"
+
+
+def render_email(message, replies=0):
+    """One compact line: date, sender, subject and a truncated snippet"""
+    sent = datetime.fromtimestamp(int(message.get("internalDate", 0)) / 1000, tz=timezone.utc)
+    flags = [label.lower() for label in ("IMPORTANT", "STARRED") if label in message.get("labelIds", [])]
+    thread = f" (+{replies} earlier in thread)" if replies else ""
+    line = f"- [{sent:%d %b %H:%M}] {_sender(message)}: {get_header(message, 'Subject') or '(no subject)'}{thread}"
+    if flags:
+        line += f" [{', '.join(flags)}]"
+    snippet = _truncate(message.get("snippet", ""), EMAIL_SNIPPET_CHARS)
+    return f"{line} | {snippet}" if snippet else line
+
+
+def _priority(message):
+    labels = message.get("labelIds", [])
+    return (sum(weight for label, weight in PRIORITY_LABELS.items() if label in labels),
+            int(message.get("internalDate", 0)))
+
+
+def pack_emails(messages, budget=None, footer=""):
+    """Structured, deduplicated and budgeted text for the email agent.
+
+    Returns (text, report). `footer` (e.g. the triage counts) is always kept.
+    """
+    budget = budget if budget is not None else email_budget()
+    threads = {}
+    for message in sorted(messages, key=lambda m: int(m.get("internalDate", 0)), reverse=True):
+        thread_id = message.get("threadId", message.get("id"))
+        if thread_id in threads:
+            threads[thread_id][1] += 1
+        else:
+            threads[thread_id] = [message, 0]
+
+    ordered = sorted(threads.values(), key=lambda item: _priority(item[0]), reverse=True)
+    lines = [render_email(message, replies) for message, replies in ordered]
+    header = f"{len(messages)} emails in {len(lines)} threads, most important first:"
+
+    reserved = estimate_tokens(header) + (estimate_tokens(footer) + 1 if footer else 0) + 1
+    senders = [_sender(message) for message, _ in ordered]
+    sizes = [1 + replies for _, replies in ordered]
+
+    def overflow(n):
+        # n is a number of threads; count the emails in them too
+        names = list(dict.fromkeys(senders[-n:]))
+        shown = ", ".join(names[:5]) + (f" and {len(names) - 5} others" if len(names) > 5 else "")
+        return f"- {sum(sizes[-n:])} more emails in {n} threads not shown (from {shown})"
+
+    included, omitted = fit_lines(lines, max(budget - reserved, 0), overflow)
+    text = "\n".join([header] + included + ([footer] if footer else []))
+    report = {
+        "budget": budget,
+        "tokens": estimate_tokens(text),
+        "tokens_unpacked": sum(estimate_tokens(m.get("snippet", "")) + 1 for m in messages),
+        "threads": len(lines),
+        "replies_collapsed": len(messages) - len(lines),
+        "omitted": omitted,
+    }
+    return text, report
@@ -0,0 +1,249 @@
+"""
+Background job queue for briefing generation.
+
+POST /briefing/jobs enqueues a job and returns immediately; a bounded thread
+pool in each gunicorn worker runs the crew. Job state lives in a small SQLite
+file so any worker process can answer status polls for a job started by
+another one, and so the queue-depth limit applies across all workers.
+
+While a job runs, the briefing text streamed so far is kept in its `partial`
+column (flushed at most every JOB_STREAM_FLUSH seconds) so the SSE endpoint in
+any worker can forward new tokens. The SSE endpoint answers with what is new
+and closes; the browser reconnects after JOB_EVENTS_RETRY_MS with the offset
+it has reached as Last-Event-ID, so a viewer never holds a worker. When a
+model fails mid-answer and another one starts over, `partial` is emptied and
+`restarts` counted, and viewers are told to clear the text they have.
+
+Each process stamps a heartbeat on its queued and running jobs every
+JOB_HEARTBEAT_SECONDS. A job whose heartbeat is older than
+JOB_ORPHAN_SECONDS belonged to a worker that was killed or restarted; it is
+marked failed when a queue starts, before the queue depth is counted and
+when the job is looked up, so it neither blocks the queue nor keeps its
+viewers waiting.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.log_stream import log_context
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "/tmp/briefing_jobs.db")
+BRIEFING_WORKERS = int(os.getenv("BRIEFING_WORKERS", "1"))
+BRIEFING_QUEUE_MAX = int(os.getenv("BRIEFING_QUEUE_MAX", "10"))
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+JOB_STREAM_FLUSH = float(os.getenv("JOB_STREAM_FLUSH", "0.1"))
+# Browser reconnect interval of /briefing/jobs/<id>/events, which answers with what is new and closes
+JOB_EVENTS_RETRY_MS = int(os.getenv("JOB_EVENTS_RETRY_MS", "500"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_ORPHAN_SECONDS = float(os.getenv("JOB_ORPHAN_SECONDS", "60"))
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    status TEXT NOT NULL,
+    progress TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    partial TEXT,
+    restarts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat_at REAL
+)
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when the briefing queue is at capacity"""
+
+
+class BriefingJobQueue:
+    """Bounded worker pool plus a shared SQLite job table.
+
+    `run` is called as run(payload, progress, on_token, on_restart) on a worker
+    thread, where progress(message) records a human-readable step, on_token(text)
+    appends streamed briefing text and on_restart() discards the text so far.
+    Its return value must be JSON-serializable and becomes the job result.
+    """
+
+    def __init__(self, run, db_path=JOB_DB_PATH, workers=BRIEFING_WORKERS,
+                 max_queue=BRIEFING_QUEUE_MAX, ttl=JOB_TTL):
+        self.run = run
+        self.db_path = db_path
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="briefing-job")
+        self._local_active = 0
+        self._local_lock = threading.Lock()
+        self._worker = None  # (pid, id) of the process whose jobs the heartbeat covers
+        self._heartbeat = None
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            for column in ("partial TEXT", "restarts INTEGER NOT NULL DEFAULT 0", "worker TEXT", "heartbeat_at REAL"):
+                try:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")  # databases created before it
+                except sqlite3.OperationalError:
+                    pass
+            self._fail_orphans(conn, time.time())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _worker_id(self):
+        """Id of this process for the heartbeat, renewed in a forked child; starts the heartbeat thread"""
+        with self._local_lock:
+            if self._worker is None or self._worker[0] != os.getpid():
+                self._worker = (os.getpid(), uuid.uuid4().hex)
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, args=(self._worker[1],),
+                                                   name="briefing-job-heartbeat", daemon=True)
+                self._heartbeat.start()
+            return self._worker[1]
+
+    def _heartbeat_loop(self, worker):
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            if not self._local_active:
+                continue
+            try:
+                with closing(self._connect()) as conn:
+                    conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE worker = ? AND status IN ('queued', 'running')",
+                                 (time.time(), worker))
+            except sqlite3.Error as e:
+                logger.warning(f"Briefing job heartbeat failed: {e}")
+
+    @staticmethod
+    def _fail_orphans(conn, now, job_id=None):
+        """Mark failed the unfinished jobs whose worker stopped sending heartbeats"""
+        query = ("UPDATE jobs SET status = 'failed', finished_at = ?, progress = 'Failed', "
+                 "error = 'The worker running this job stopped, please try again' "
+                 "WHERE status IN ('queued', 'running') AND COALESCE(heartbeat_at, created_at) < ?")
+        params = [now, now - JOB_ORPHAN_SECONDS]
+        if job_id is not None:
+            query += " AND id = ?"
+            params.append(job_id)
+        orphans = conn.execute(query, params).rowcount
+        if orphans and job_id is None:
+            logger.warning(f"Marked {orphans} briefing jobs of stopped workers as failed")
+
+    def submit(self, owner, payload):
+        """Enqueue a job and return its id. Raises QueueFullError at capacity."""
+        job_id = uuid.uuid4().hex
+        worker = self._worker_id()
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM jobs WHERE created_at < ?", (now - self.ttl,))
+            self._fail_orphans(conn, now)
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queue:
+                conn.execute("COMMIT")  # keeps the expiry and orphan cleanup
+                raise QueueFullError(f"Briefing queue is full ({queued} jobs waiting)")
+            conn.execute(
+                "INSERT INTO jobs (id, owner, status, progress, created_at, worker, heartbeat_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, owner, "Waiting for a free worker", now, worker, now)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        with self._local_lock:
+            self._local_active += 1
+        self._executor.submit(self._execute, job_id, payload)
+        logger.info(f"Briefing job {job_id} queued ({queued + 1} waiting)")
+        return job_id
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def _execute(self, job_id, payload):
+        self._update(job_id, status="running", started_at=time.time(), progress="Started")
+        streamed = []
+        last_flush = 0.0
+        restarts = 0
+
+        def on_token(text):
+            nonlocal last_flush
+            streamed.append(text)
+            if time.monotonic() - last_flush >= JOB_STREAM_FLUSH:
+                last_flush = time.monotonic()
+                self._update(job_id, partial="".join(streamed))
+
+        def on_restart():
+            nonlocal last_flush, restarts
+            streamed.clear()
+            restarts += 1
+            last_flush = time.monotonic()
+            self._update(job_id, partial="", restarts=restarts)
+
+        try:
+            with log_context(job_id):
+                result = self.run(payload, lambda message: self._update(job_id, progress=message),
+                                  on_token, on_restart)
+            self._update(job_id, status="succeeded", finished_at=time.time(),
+                         progress="Completed", result=json.dumps(result), partial=None)
+            logger.info(f"Briefing job {job_id} succeeded")
+        except Exception as e:
+            logger.error(f"Briefing job {job_id} failed: {e}", exc_info=True)
+            self._update(job_id, status="failed", finished_at=time.time(),
+                         progress="Failed", error=str(e))
+        finally:
+            with self._local_lock:
+                self._local_active -= 1
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it does not exist (or expired)"""
+        with closing(self._connect()) as conn:
+            self._fail_orphans(conn, time.time(), job_id)
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        if job["status"] == "queued":
+            with closing(self._connect()) as conn:
+                job["queue_position"] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at <= ?",
+                    (job["created_at"],)
+                ).fetchone()[0]
+        return job
+
+    def stats(self):
+        """Queue depth and job counts across all workers sharing the database"""
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            durations = conn.execute(
+                "SELECT AVG(started_at - created_at), AVG(finished_at - started_at) "
+                "FROM jobs WHERE status = 'succeeded'"
+            ).fetchone()
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "succeeded": counts.get("succeeded", 0),
+            "failed": counts.get("failed", 0),
+            "max_queue": self.max_queue,
+            "workers_per_process": self.workers,
+            "active_in_this_process": self._local_active,
+            "avg_wait_seconds": round(durations[0] or 0, 3),
+            "avg_run_seconds": round(durations[1] or 0, 3),
+        }
@@ -0,0 +1,302 @@
+"""
+Content-addressed cache for LLM responses.
+
+Each crew task is one LLM conversation whose messages contain the agent's role,
+goal and backstory, the task description and the interpolated emails_data /
+calendar_data. Hashing the model name, sampling settings and those messages
+therefore gives a key that only repeats when a task would be asked exactly the
+same question again - e.g. a refresh while the inbox and calendar are
+unchanged - and the stored answer can be returned without calling OpenRouter.
+compose_briefing's prompt embeds the other two outputs, so it hits as well
+once they do.
+
+Backends:
+    memory - per-process LRU (default)
+    sqlite - file shared by all gunicorn workers (LLM_CACHE_PATH)
+    none   - disabled
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+
+from crewai import LLM
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+
+from utils import metrics
+from utils.input_packer import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "900"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "/tmp/llm_cache.db")
+
+
+def cache_key(model, messages, **params):
+    """sha256 over the model, sampling parameters and the full message list"""
+    payload = json.dumps(
+        {"model": model, "params": params, "messages": messages},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Interface for response stores. Counters are per process."""
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key):
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        evicted = self._set(key, value)
+        if evicted:
+            with self._stats_lock:
+                self.evictions += evicted
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "entries": self.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    @abstractmethod
+    def _get(self, key):
+        """The stored value, or None on a miss"""
+
+    @abstractmethod
+    def _set(self, key, value):
+        """Store value and return the number of entries evicted"""
+
+    @abstractmethod
+    def size(self):
+        """Number of stored entries"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every entry"""
+
+
+class NullCache(CacheBackend):
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value):
+        return 0
+
+    def size(self):
+        return 0
+
+    def clear(self):
+        pass
+
+
+class MemoryLRUCache(CacheBackend):
+    """In-process LRU with TTL expiry"""
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """SQLite store shared across processes, evicting expired then least recently used entries"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        stored_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self.SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _get(self, key):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND stored_at > ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _set(self, key, value):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, stored_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            evicted = conn.execute("DELETE FROM llm_cache WHERE stored_at <= ?", (now - self.ttl,)).rowcount
+            evicted += conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            conn.execute("COMMIT")
+            return evicted
+
+    def size(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def clear(self):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+
+def make_cache(backend=LLM_CACHE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteCache()
+    if backend == "memory":
+        return MemoryLRUCache()
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown LLM_CACHE_BACKEND: {backend}")
+
+
+# Process-wide cache shared by every CachedLLM unless one is passed in
+response_cache = make_cache()
+
+
+class UsageRecorder:
+    """LLM callback keeping the token usage CrewAI passes to log_success_event"""
+
+    def __init__(self):
+        self.usage = None
+
+    def log_success_event(self, kwargs=None, response_obj=None, start_time=None, end_time=None):
+        self.usage = (response_obj or {}).get("usage")
+
+    def tokens(self, name):
+        value = self.usage.get(name) if isinstance(self.usage, dict) else getattr(self.usage, name, None)
+        return value if isinstance(value, int) else None
+
+
+class LLMCacheMixin:
+    """Adds response caching to any crewai LLM class (see CachedLLM)"""
+
+    def __init__(self, *args, cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache if cache is not None else response_cache
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        # Tool calls have side effects; never cache those
+        if tools or available_functions:
+            return super().call(messages, tools, callbacks, available_functions)
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        # The executor appends to this list after the call, so hash it first
+        key = cache_key(self.model, messages,
+                        temperature=getattr(self, "temperature", None),
+                        max_tokens=getattr(self, "max_tokens", None))
+        cached = self.cache.get(key)
+        if not isinstance(self.cache, NullCache):
+            metrics.record_cache_lookup(self.model, hit=cached is not None)
+        if cached is not None:
+            logger.info(f"LLM cache hit for {self.model} ({key[:12]})")
+            if getattr(self, "stream", False):
+                # Streaming listeners still expect the answer, just in one chunk
+                crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=cached))
+            return cached
+
+        response = self._timed_call(messages, callbacks)
+        if isinstance(response, str) and response.strip():
+            self.cache.set(key, response)
+        return response
+
+    def _timed_call(self, messages, callbacks):
+        """super().call() recorded in llm_call_seconds and llm_tokens_total"""
+        recorder = UsageRecorder()
+        start = time.perf_counter()
+        try:
+            response = super().call(messages, None, [*(callbacks or []), recorder], None)
+        except Exception:
+            metrics.record_llm_call(self.model, time.perf_counter() - start, error=True)
+            raise
+        prompt_tokens = recorder.tokens("prompt_tokens")
+        completion_tokens = recorder.tokens("completion_tokens")
+        if recorder.usage is None:
+            # Providers that report no usage: estimate, as the input packer does
+            prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+            completion_tokens = estimate_tokens(response) if isinstance(response, str) else None
+        metrics.record_llm_call(self.model, time.perf_counter() - start, prompt_tokens, completion_tokens)
+        return response
+
+
+class CachedLLM(LLMCacheMixin, LLM):
+    """crewai LLM whose plain-text responses are served from response_cache when possible"""
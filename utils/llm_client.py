@@ -0,0 +1,118 @@
+"""
+The OpenRouter LLM, configured once per worker process.
+
+There is one CachedLLM per model (plus a streaming twin for the summary
+agent), shared by every agent that uses that model, and every completion goes
+through one litellm HTTPHandler, so requests from concurrent briefings reuse
+the same keep-alive connection pool instead of each agent module configuring
+its own client. utils/llm_router.py picks the models for each agent.
+"""
+import os
+import json
+import threading
+
+import httpx
+from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+from utils.llm_cache import CachedLLM
+
+# Overridden to point the app at a local OpenAI-compatible server (benchmarks/e2e.py)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+_http_handler = None
+_llms = {}
+_lock = threading.Lock()
+
+
+def _finishes_stream(line):
+    """True for the SSE line that carries a finish_reason (or is the final [DONE])"""
+    if not line.startswith("data:"):
+        return False
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return True
+    if '"finish_reason"' not in data:
+        return False
+    try:
+        chunk = json.loads(data)
+    except ValueError:
+        return False
+    return any(choice.get("finish_reason") for choice in chunk.get("choices") or [])
+
+
+def _release_at_end(response, iter_lines):
+    """response.iter_lines() that hands the connection back to the pool when the answer is complete.
+
+    litellm stops reading a completion stream once it has seen the
+    finish_reason and never closes the response, which would keep its
+    connection checked out until the pool is exhausted and every further call
+    waits for a free one. The rest of the body (a usage chunk and [DONE] at
+    most) is read ahead at that point and the lines are passed on unchanged.
+    """
+    lines = iter_lines()
+    try:
+        for line in lines:
+            if _finishes_stream(line):
+                rest = list(lines)
+                response.close()
+                yield line
+                yield from rest
+                return
+            yield line
+    finally:
+        # Also reached when the reader gives up on the stream early
+        response.close()
+
+
+class StreamReleasingHTTPHandler(HTTPHandler):
+    """HTTPHandler whose streamed responses release their connection (see _release_at_end)"""
+
+    def post(self, *args, stream=False, **kwargs):
+        response = super().post(*args, stream=stream, **kwargs)
+        if stream:
+            iter_lines = response.iter_lines
+            response.iter_lines = lambda: _release_at_end(response, iter_lines)
+        return response
+
+
+def shared_http_handler():
+    """Process-wide litellm HTTP handler with a bounded connection pool"""
+    global _http_handler
+    with _lock:
+        if _http_handler is None:
+            _http_handler = StreamReleasingHTTPHandler(
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=5.0),
+                concurrent_limit=LLM_MAX_CONNECTIONS
+            )
+        return _http_handler
+
+
+def model_llm(model, stream=False):
+    """Process-wide OpenRouter LLM for one model, or None when OPENAI_API_KEY is not set.
+
+    "model@provider" pins the requests to one OpenRouter provider.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")  # OpenRouter key stored as OPENAI_API_KEY
+    if not api_key:
+        return None
+    client = shared_http_handler()
+    with _lock:
+        if (model, stream) not in _llms:
+            model_name, _, provider = model.partition("@")
+            extra = {"extra_body": {"provider": {"order": [provider], "allow_fallbacks": False}}} if provider else {}
+            _llms[model, stream] = CachedLLM(
+                model=f"openrouter/{model_name}",  # MODEL IDENTIFIER with openrouter/ prefix
+                api_key=api_key,
+                base_url=OPENROUTER_BASE_URL,
+                stream=stream,
+                client=client,                     # passed through to litellm.completion()
+                **extra
+            )
+        return _llms[model, stream]
+
+
+def shared_llm(stream=False):
+    """Process-wide LLM for OPENROUTER_MODEL, or None when OPENAI_API_KEY is not set"""
+    return model_llm(os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct"), stream)
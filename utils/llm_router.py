@@ -0,0 +1,284 @@
+"""
+Per-agent model routing with ordered fallback and hedged requests.
+
+Each agent has an ordered list of OpenRouter models: <AGENT>_AGENT_MODELS
+(comma separated; OPENROUTER_MODEL when unset) followed by
+LLM_FALLBACK_MODELS. A model can pin an OpenRouter provider with
+"model@provider". The first model is the primary; when it fails, the next
+one is tried, and so on.
+
+With LLM_HEDGE_ENABLED, a call whose model has produced no output within its
+hedge deadline also starts the next model, and the first of the two to
+produce output wins. Output is the first streamed token (only the winner's
+tokens reach the page) or the whole answer when not streaming; the loser
+runs to completion in the background and its answer is kept only in case
+the winner fails.
+
+Every attempt keeps the chunks it has streamed. When the model whose
+chunks reach the page fails, the caller's sink is restarted (the page drops
+the partial answer) and the attempt taking over replays its chunks from the
+start, so the page never shows two answers run together. The deadline
+is the LLM_HEDGE_PERCENTILE of that model's recent times to first output for
+this agent, so only the slow tail of calls pays for a second request.
+
+Outcomes are counted per agent and model (routing_stats(), /llm-routes, and
+llm_route_calls_total / llm_hedges_total on /metrics):
+
+    primary    the first model answered
+    hedge      a backup started by the hedge deadline answered first
+    fallback   a later model answered after the ones before it failed
+    lost       a model was overtaken in a hedge race
+    failed     a model raised an error
+"""
+import os
+import time
+import queue
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from crewai import LLM
+
+from utils import metrics
+from utils.briefing_stream import current_sink, redirect_chunks
+from utils.llm_client import model_llm
+
+logger = logging.getLogger(__name__)
+
+LLM_FALLBACK_MODELS = os.getenv("LLM_FALLBACK_MODELS", "")
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1"))
+# Deadline used until a model has LLM_HEDGE_MIN_SAMPLES timings for the agent
+LLM_HEDGE_INITIAL_SECONDS = float(os.getenv("LLM_HEDGE_INITIAL_SECONDS", "10"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "10"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "100"))
+
+OUTCOMES = ("primary", "hedge", "fallback", "lost", "failed")
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_ROUTER_WORKERS", "16")), thread_name_prefix="llm-route")
+_routers = []
+_routers_lock = threading.Lock()
+
+
+def agent_models(agent):
+    """Ordered model list for an agent ("email", "calendar", "summary")"""
+    primary = os.getenv(f"{agent.upper()}_AGENT_MODELS") or os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
+    models = []
+    for model in f"{primary},{LLM_FALLBACK_MODELS}".split(","):
+        model = model.strip()
+        if model and model not in models:
+            models.append(model)
+    return models
+
+
+def agent_llm(agent, stream=False):
+    """The LLM for an agent: its primary model's shared LLM, or a RoutedLLM when it has several models"""
+    models = agent_models(agent)
+    routes = [model_llm(model, stream) for model in models]
+    if routes[0] is None:
+        return None
+    if len(routes) == 1:
+        return routes[0]
+    router = RoutedLLM(agent, routes)
+    with _routers_lock:
+        _routers.append(router)
+    return router
+
+
+def routing_stats():
+    """Per-agent route outcomes and current hedge deadlines in this process"""
+    with _routers_lock:
+        routers = list(_routers)
+    return {"hedging": LLM_HEDGE_ENABLED, "agents": {router.agent: router.stats() for router in routers}}
+
+
+class _Attempt:
+    """One model's try at a routed call; receives that call's stream chunks"""
+
+    def __init__(self, router, race, route, kind):
+        self.router = router
+        self.race = race
+        self.route = route
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.first_output = None
+        self.chunks = []
+
+    def feed(self, chunk):
+        if self.first_output is None:
+            self.output_started()
+        with self.race.lock:
+            self.chunks.append(chunk)
+            if self.race.leader is self:
+                self.race.forward(chunk)
+
+    def output_started(self):
+        self.first_output = time.perf_counter() - self.start
+        self.router.observe(self.route.model, self.first_output)
+        with self.race.lock:
+            if self.race.leader is None:
+                self.race.leader = self
+        self.race.events.put(("first", self, None))
+
+
+class _Race:
+    def __init__(self, sink):
+        self.sink = sink
+        self.lock = threading.Lock()
+        self.leader = None
+        self.fed = False  # the sink has chunks from an attempt
+        self.events = queue.Queue()
+
+    def forward(self, chunk):
+        if self.sink is not None:
+            self.sink.feed(chunk)
+            self.fed = True
+
+    def hand_over(self, leader):
+        """Stream `leader` (None: the next attempt to produce output) instead of the failed leader"""
+        with self.lock:
+            self.leader = leader
+            if self.fed:
+                self.sink.restart()
+                self.fed = False
+            for chunk in leader.chunks if leader else ():
+                self.forward(chunk)
+
+
+class RoutedLLM(LLM):
+    """crewai LLM that sends each call to an agent's models (see module docstring).
+
+    `routes` are LLM objects (normally CachedLLMs from model_llm), primary
+    first. Tool calls are not hedged: they only go through the fallback order.
+    """
+
+    def __init__(self, agent, routes, hedge=LLM_HEDGE_ENABLED):
+        super().__init__(model=routes[0].model, stream=getattr(routes[0], "stream", False))
+        self.agent = agent
+        self.routes = routes
+        self.hedge = hedge
+        self._latencies = {route.model: deque(maxlen=LLM_HEDGE_WINDOW) for route in routes}
+        self._outcomes = {route.model: dict.fromkeys(OUTCOMES, 0) for route in routes}
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def observe(self, model, seconds):
+        with self._lock:
+            self._latencies[model].append(seconds)
+
+    def hedge_deadline(self, model):
+        """Seconds without output after which a call to `model` is hedged"""
+        with self._lock:
+            samples = sorted(self._latencies[model])
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_INITIAL_SECONDS
+        return max(LLM_HEDGE_MIN_SECONDS, samples[int(LLM_HEDGE_PERCENTILE * (len(samples) - 1))])
+
+    def _record(self, model, outcome):
+        with self._lock:
+            self._outcomes[model][outcome] += 1
+        metrics.count("llm_route_calls_total", agent=self.agent, model=model, outcome=outcome)
+
+    def stats(self):
+        with self._lock:
+            hedges = self._hedges
+            outcomes = {model: dict(counts) for model, counts in self._outcomes.items()}
+        return {"models": [route.model for route in self.routes], "hedges": hedges, "outcomes": outcomes,
+                "hedge_deadline_seconds": round(self.hedge_deadline(self.routes[0].model), 3)}
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        for route in self.routes:
+            route.stop = self.stop  # set on this object by the agent executor
+        if self.hedge and not (tools or available_functions):
+            return self._hedged_call(messages, callbacks)
+        return self._fallback_call(messages, tools, callbacks, available_functions)
+
+    def _fallback_call(self, messages, tools, callbacks, available_functions):
+        race = _Race(current_sink())
+        for n, route in enumerate(self.routes):
+            attempt = _Attempt(self, race, route, "primary" if n == 0 else "fallback")
+            try:
+                with redirect_chunks(attempt):
+                    response = route.call(messages, tools, callbacks, available_functions)
+            except Exception as e:
+                self._record(route.model, "failed")
+                if n == len(self.routes) - 1:
+                    raise
+                logger.warning(f"{self.agent} agent: {route.model} failed ({e}), "
+                               f"falling back to {self.routes[n + 1].model}")
+                race.hand_over(None)
+                continue
+            if attempt.first_output is None:
+                attempt.output_started()
+            self._record(route.model, attempt.kind)
+            return response
+
+    def _run_attempt(self, attempt, messages, callbacks, state):
+        try:
+            with metrics.adopt_thread_state(state), redirect_chunks(attempt):
+                response = attempt.route.call(messages, None, callbacks, None)
+        except Exception as e:
+            attempt.race.events.put(("error", attempt, e))
+            return
+        if attempt.first_output is None:
+            attempt.output_started()
+        attempt.race.events.put(("done", attempt, response))
+
+    def _hedged_call(self, messages, callbacks):
+        race = _Race(current_sink())
+        state = metrics.thread_state()
+        waiting = list(self.routes)
+        running, finished, errors = [], {}, []
+
+        def launch(kind):
+            attempt = _Attempt(self, race, waiting.pop(0), kind)
+            running.append(attempt)
+            _executor.submit(contextvars.copy_context().run, self._run_attempt, attempt, messages, callbacks, state)
+            return time.monotonic() + self.hedge_deadline(attempt.route.model)
+
+        hedge_at = launch("primary")
+        while True:
+            timeout = None if hedge_at is None else max(hedge_at - time.monotonic(), 0)
+            try:
+                kind, attempt, value = race.events.get(timeout=timeout)
+            except queue.Empty:
+                hedge_at = None
+                if waiting and race.leader is None:
+                    with self._lock:
+                        self._hedges += 1
+                    metrics.count("llm_hedges_total", agent=self.agent)
+                    logger.info(f"{self.agent} agent: no output from {running[0].route.model} yet, "
+                                f"hedging with {waiting[0].model}")
+                    hedge_at = launch("hedge")
+                continue
+
+            if kind == "first":
+                hedge_at = None  # output is flowing, no need for a backup
+            elif kind == "done":
+                running.remove(attempt)
+                if race.leader is not attempt:
+                    finished[attempt] = value  # kept in case the leader fails
+                    continue
+                self._record(attempt.route.model, attempt.kind)
+                for other in running + list(finished):
+                    self._record(other.route.model, "lost")
+                return value
+            else:
+                running.remove(attempt)
+                errors.append(value)
+                self._record(attempt.route.model, "failed")
+                logger.warning(f"{self.agent} agent: {attempt.route.model} failed ({value})")
+                if race.leader is attempt:
+                    race.hand_over(next((a for a in running if a.first_output is not None), None))
+                if race.leader is None and finished:
+                    winner, response = next(iter(finished.items()))
+                    race.hand_over(winner)
+                    self._record(winner.route.model, winner.kind)
+                    return response
+                if not running:
+                    if not waiting:
+                        raise errors[-1]
+                    hedge_at = launch("fallback")
@@ -0,0 +1,250 @@
+"""
+Log broadcaster for the /logs endpoint, shared by every worker process.
+
+LogBroadcaster is a logging.Handler that appends formatted records, each
+with the id of the briefing job that produced it (see log_context), to a
+`log_lines` table in SQLite (by default the jobs database). The table's
+autoincrement key is the sequence number, so Last-Event-ID means the same
+thing in every gunicorn worker and /logs?job=<id> sees a job's lines no
+matter which worker ran it. Records are written by a background thread in
+batches every LOG_FLUSH_SECONDS, and the table is trimmed to the newest
+LOG_BUFFER_LINES.
+
+Viewers never tail a file: they ask for the lines after the last sequence
+number they saw and, if there are none yet, optionally wait. Waiting costs
+no queries: each process keeps the newest sequence number it knows of, a
+flush in this process advances it and wakes waiting readers at once, and
+while anyone waits the flusher thread checks the table for other workers'
+lines once every LOG_POLL_SECONDS - one query per process, however many
+viewers are waiting.
+
+/logs answers with whatever is new and closes the response, so a log viewer
+holds a worker for milliseconds; EventSource reconnects on its own after the
+`retry` interval and resumes from Last-Event-ID. Async servers (asgi.py)
+instead keep the stream open and await new records via wait_async().
+"""
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+import contextvars
+from contextlib import closing, contextmanager
+
+# Same file as the job table unless overridden (not imported from utils.jobs, which imports this module)
+LOG_DB_PATH = os.getenv("LOG_DB_PATH", os.getenv("JOB_DB_PATH", "/tmp/briefing_jobs.db"))
+LOG_BUFFER_LINES = int(os.getenv("LOG_BUFFER_LINES", "2000"))
+LOG_REPLAY_LINES = int(os.getenv("LOG_REPLAY_LINES", "100"))
+# Seconds between batched writes
+LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "0.2"))
+# Seconds between checks for other workers' lines while a viewer is waiting
+LOG_POLL_SECONDS = float(os.getenv("LOG_POLL_SECONDS", "1"))
+# Seconds a /logs request may wait for new lines before returning (0 = never wait)
+LOG_STREAM_HOLD = float(os.getenv("LOG_STREAM_HOLD", "0"))
+LOG_STREAM_RETRY_MS = int(os.getenv("LOG_STREAM_RETRY_MS", "1000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_lines (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT,
+    line TEXT NOT NULL,
+    logged_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS log_lines_job ON log_lines (job, seq);
+"""
+
+_log_job = contextvars.ContextVar("log_job", default=None)
+
+
+@contextmanager
+def log_context(job_id):
+    """Tag every record logged in this context (and copied contexts) with job_id"""
+    token = _log_job.set(job_id)
+    try:
+        yield
+    finally:
+        _log_job.reset(token)
+
+
+class LogBroadcaster(logging.Handler):
+    """Shared SQLite table of (sequence, job id, formatted line) with wake-ups for waiting readers"""
+
+    def __init__(self, db_path=LOG_DB_PATH, capacity=LOG_BUFFER_LINES, flush_interval=LOG_FLUSH_SECONDS,
+                 poll_interval=LOG_POLL_SECONDS):
+        super().__init__()
+        self.db_path = db_path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self._pending = []  # (job id, line, time) not yet written
+        self._changed = threading.Condition()
+        self._latest = 0  # newest sequence number this process knows of; waiters compare against it
+        self._waiting = 0  # threads blocked in wait()
+        self._subscribers = set()  # (event loop, asyncio.Event) of async readers
+        self._flusher = None
+        self._ready = False
+        # A preloaded gunicorn master may have started the flusher; each worker needs its own
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._changed = threading.Condition()
+        self._pending = []
+        self._waiting = 0
+        self._subscribers = set()
+        self._flusher = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._ready = True
+        return conn
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._changed:
+            self._pending.append((_log_job.get(), line, record.created))
+            self._start_flusher()
+
+    def _start_flusher(self):
+        # Called with self._changed held
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="log-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        next_poll = time.monotonic()
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            with self._changed:
+                waiting = self._waiting or self._subscribers
+            if waiting and time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll_interval
+                try:
+                    self._advance(self.latest())
+                except sqlite3.Error:
+                    pass  # try again at the next poll
+
+    def _advance(self, seq):
+        """Record that lines up to `seq` are stored, waking waiting readers if that is news"""
+        with self._changed:
+            if seq <= self._latest:
+                return
+            self._latest = seq
+            self._changed.notify_all()
+            subscribers = list(self._subscribers)
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # loop already closed
+                pass
+
+    def flush(self):
+        """Write pending records in one transaction, trim the table and wake local readers.
+
+        Also called by logging.shutdown() at exit, so the last lines are not lost.
+        """
+        with self._changed:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT INTO log_lines (job, line, logged_at) VALUES (?, ?, ?)", batch)
+                latest = conn.execute("SELECT MAX(seq) FROM log_lines").fetchone()[0]
+                conn.execute("DELETE FROM log_lines WHERE seq <= ?", (latest - self.capacity,))
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # Logging here would feed the records straight back into this handler
+            sys.stderr.write(f"Dropped {len(batch)} log lines for /logs: {e}\n")
+            return
+        self._advance(latest)
+
+    def latest(self):
+        """Highest sequence number written by any worker (0 if none)"""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM log_lines").fetchone()[0]
+
+    def since(self, after=None, job_id=None, limit=LOG_REPLAY_LINES):
+        """Lines of `job_id` (None = lines outside any job) newer than `after`.
+
+        Returns ([(seq, line), ...], latest seq). With after=None the last
+        `limit` matching lines are replayed.
+        """
+        with closing(self._connect()) as conn:
+            latest = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM log_lines").fetchone()[0]
+            if after is not None and after > latest:
+                after = None  # the client saw a database that has since been replaced; replay instead
+            if after is None:
+                rows = conn.execute("SELECT seq, line FROM log_lines WHERE job IS ? ORDER BY seq DESC LIMIT ?",
+                                    (job_id, limit)).fetchall()[::-1]
+            else:
+                rows = conn.execute("SELECT seq, line FROM log_lines WHERE job IS ? AND seq > ? AND seq <= ? "
+                                    "ORDER BY seq", (job_id, after, latest)).fetchall()
+        self._advance(latest)
+        return rows, latest
+
+    def wait(self, after, timeout):
+        """Block until a record newer than `after` is stored or `timeout` passes (no queries of its own)"""
+        with self._changed:
+            self._start_flusher()
+            self._waiting += 1
+            try:
+                return self._changed.wait_for(lambda: self._latest > after, timeout)
+            finally:
+                self._waiting -= 1
+
+    async def wait_async(self, after, timeout):
+        """Async counterpart of wait() that does not tie up a thread"""
+        event = asyncio.Event()
+        subscriber = (asyncio.get_running_loop(), event)
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            self._start_flusher()
+            self._subscribers.add(subscriber)
+        try:
+            while True:
+                with self._changed:
+                    if self._latest > after:
+                        return True
+                    event.clear()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return False
+        finally:
+            with self._changed:
+                self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            stored, last_seq = conn.execute("SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM log_lines").fetchone()
+        with self._changed:
+            return {"stored": stored, "capacity": self.capacity, "pending": len(self._pending),
+                    "last_seq": last_seq, "async_subscribers": len(self._subscribers)}
+
+
+def format_events(lines, latest, retry_ms=LOG_STREAM_RETRY_MS):
+    """Server-Sent Events body for `lines`, ending with the id to resume from"""
+    parts = [f"retry: {retry_ms}\n\n"]
+    for seq, line in lines:
+        data = "\n".join(f"data: {part}" for part in line.splitlines() or [""])
+        parts.append(f"id: {seq}\n{data}\n\n")
+    # An id-only event moves Last-Event-ID forward even when nothing matched
+    parts.append(f"id: {latest}\n\n")
+    return "".join(parts)
+
+
+log_broadcaster = LogBroadcaster()
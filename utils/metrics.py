@@ -0,0 +1,371 @@
+"""
+Per-stage latency and token metrics, exported on /metrics in the Prometheus
+text format, plus an optional per-request timing breakdown.
+
+    briefing_stage_seconds{stage}        OAuth refresh, Gmail/Calendar calls, ingestion, engines
+    briefing_task_seconds{task}          each crew task
+    llm_call_seconds{model}              each LLM completion (cache hits excluded)
+    llm_tokens_total{model,kind}         prompt / completion tokens reported by the provider
+    llm_cache_requests_total{result}     response cache hits and misses
+    llm_retries_total{task}              extra LLM calls an agent needed for one task
+    briefing_errors_total{stage}         failed stages and LLM calls
+    briefings_total{mode}                briefings written, per engine
+    briefing_sections_total{task,result}  sections written, templated or reused from the last briefing
+    llm_route_calls_total{agent,model,outcome}  routed attempts that won, lost a hedge race or failed
+    llm_hedges_total{agent}              backup requests started for slow LLM calls
+    push_notifications_total{source,result}  Gmail/Calendar notifications that marked data changed or were dropped
+
+Recording is a dict update under a lock, cheap enough to leave on. Each
+worker keeps its own registry and writes a snapshot to METRICS_DB_PATH every
+METRICS_FLUSH_SECONDS; /metrics adds up the snapshots of all live workers so
+a scrape sees the whole server, whichever worker answers it.
+
+A request that calls trace_request() also gets a list of its stages with
+durations (and token counts for LLM calls). The trace follows the request
+through contextvars-copied threads, and crew tasks running on CrewAI's own
+threads find it through their crew (see trace_crew). The CrewAI task event
+handlers are registered by the first trace_crew() or watch_crew_tasks(), so
+importing this module does not import CrewAI.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import contextvars
+from bisect import bisect_left
+from functools import wraps
+from contextlib import closing, contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_DB_PATH = os.getenv("METRICS_DB_PATH", "/tmp/briefing_metrics.db")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+# Snapshots of workers that stopped flushing this long ago are dropped
+METRICS_STALE_SECONDS = 600
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HELP = {
+    "briefing_stage_seconds": ("histogram", "Duration of pipeline stages"),
+    "briefing_task_seconds": ("histogram", "Duration of crew tasks"),
+    "llm_call_seconds": ("histogram", "Duration of LLM completions"),
+    "llm_tokens_total": ("counter", "Tokens reported by the LLM provider"),
+    "llm_cache_requests_total": ("counter", "LLM response cache lookups"),
+    "llm_retries_total": ("counter", "LLM calls beyond the first within a crew task"),
+    "briefing_errors_total": ("counter", "Failed stages and LLM calls"),
+    "briefings_total": ("counter", "Briefings written"),
+    "briefing_sections_total": ("counter", "Briefing sections written by the LLM, templated or reused"),
+    "llm_route_calls_total": ("counter", "Routed LLM attempts per agent, model and outcome"),
+    "llm_hedges_total": ("counter", "Backup LLM requests started because the first was slow"),
+    "push_notifications_total": ("counter", "Gmail and Calendar push notifications received"),
+}
+
+
+def _key(name, labels):
+    """Snapshot key: name followed by the labels as a JSON object"""
+    return name + json.dumps(dict(labels), separators=(",", ":"))
+
+
+class Registry:
+    """Counters and fixed-bucket histograms keyed by name and labels"""
+
+    def __init__(self):
+        # (name, sorted label items) -> value; histograms hold [bucket counts..., +Inf count, sum]
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            histogram[bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = [(key, list(values)) for key, values in self._histograms.items()]
+        return {"counters": {_key(*key): value for key, value in counters},
+                "histograms": {_key(*key): values for key, values in histograms}}
+
+
+def merge(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for key, value in snapshot["counters"].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, values in snapshot["histograms"].items():
+            total = histograms.setdefault(key, [0] * len(values))
+            for n, value in enumerate(values):
+                total[n] += value
+    return {"counters": counters, "histograms": histograms}
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def render(snapshot):
+    """Prometheus text exposition format (version 0.0.4)"""
+    series = {}
+    for key, value in snapshot["counters"].items():
+        name, _, labels = key.partition("{")
+        series.setdefault(name, []).append((json.loads("{" + labels), value))
+    for key, values in snapshot["histograms"].items():
+        name, _, labels = key.partition("{")
+        series.setdefault(name, []).append((json.loads("{" + labels), values))
+
+    lines = []
+    for name in sorted(series):
+        kind, help_text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series[name], key=lambda item: sorted(item[0].items())):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {value:g}")
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {value[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class SnapshotStore:
+    """Latest registry snapshot of every worker, in a SQLite file they share"""
+
+    def __init__(self, path=METRICS_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS snapshots (pid INTEGER PRIMARY KEY, updated_at REAL, data TEXT)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def write(self, snapshot):
+        with closing(self._connect()) as conn:
+            conn.execute("INSERT OR REPLACE INTO snapshots (pid, updated_at, data) VALUES (?, ?, ?)",
+                         (os.getpid(), time.time(), json.dumps(snapshot)))
+
+    def read_all(self):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM snapshots WHERE updated_at < ?", (time.time() - METRICS_STALE_SECONDS,))
+            return [json.loads(data) for (data,) in conn.execute("SELECT data FROM snapshots")]
+
+
+registry = Registry()
+_store = None
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _snapshot_store():
+    global _store, _flusher
+    with _flusher_lock:
+        if _store is None:
+            _store = SnapshotStore()
+            _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+            _flusher.start()
+        return _store
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            _store.write(registry.snapshot())
+        except Exception as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+
+def start_flushing():
+    """Begin sharing this worker's metrics with the others (called at app startup)"""
+    if METRICS_ENABLED:
+        _snapshot_store()
+
+
+def exposition():
+    """Metrics of all live workers, as served on /metrics"""
+    store = _snapshot_store()
+    store.write(registry.snapshot())
+    return render(merge(store.read_all()))
+
+
+# ---- per-request traces ----
+
+_trace = contextvars.ContextVar("briefing_trace", default=None)
+_thread = threading.local()  # .trace and .task on CrewAI task threads
+_crew_traces = {}  # id(crew) -> trace list
+_crew_lock = threading.Lock()
+
+
+def current_trace():
+    trace = _trace.get()
+    return trace if trace is not None else getattr(_thread, "trace", None)
+
+
+@contextmanager
+def trace_request():
+    """Collect the stages of the work done inside the block; yields the list of entries"""
+    trace = []
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def _record(entry):
+    trace = current_trace()
+    if trace is not None:
+        trace.append(entry)
+
+
+@contextmanager
+def stage(name, metric="briefing_stage_seconds", label="stage", **labels):
+    """Time the block as one stage; failures also count in briefing_errors_total"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.inc("briefing_errors_total", stage=name)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        registry.observe(metric, seconds, **{label: name}, **labels)
+        _record({"stage": name, **labels, "seconds": round(seconds, 4)})
+
+
+def timed(name):
+    """Decorator form of stage()"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1, **labels):
+    if METRICS_ENABLED:
+        registry.inc(name, value, **labels)
+
+
+def record_cache_lookup(model, hit):
+    if not METRICS_ENABLED:
+        return
+    registry.inc("llm_cache_requests_total", result="hit" if hit else "miss")
+    if hit:
+        task = getattr(_thread, "task", None)
+        _record({"stage": "llm_call", "model": model, "task": task["name"] if task else None, "cached": True})
+
+
+def record_llm_call(model, seconds, prompt_tokens=None, completion_tokens=None, error=False):
+    if not METRICS_ENABLED:
+        return
+    registry.observe("llm_call_seconds", seconds, model=model)
+    if prompt_tokens is not None:
+        registry.inc("llm_tokens_total", prompt_tokens, model=model, kind="prompt")
+    if completion_tokens is not None:
+        registry.inc("llm_tokens_total", completion_tokens, model=model, kind="completion")
+    if error:
+        registry.inc("briefing_errors_total", stage="llm_call")
+    task = getattr(_thread, "task", None)
+    if task is not None:
+        task["llm_calls"] += 1
+    _record({"stage": "llm_call", "model": model, "task": task["name"] if task else None,
+             "seconds": round(seconds, 4), "prompt_tokens": prompt_tokens,
+             "completion_tokens": completion_tokens, "error": error})
+
+
+def thread_state():
+    """This thread's trace and crew task, to hand an LLM call over to a helper thread"""
+    return current_trace(), getattr(_thread, "task", None)
+
+
+@contextmanager
+def adopt_thread_state(state):
+    """Record the block's stages and LLM calls as if made on the thread that gave `state`"""
+    _thread.trace, _thread.task = state
+    try:
+        yield
+    finally:
+        _thread.trace = _thread.task = None
+
+
+@contextmanager
+def trace_crew(crew):
+    """Attribute the crew's tasks (and the LLM calls they make on their threads) to the current trace"""
+    watch_crew_tasks()
+    with _crew_lock:
+        _crew_traces[id(crew)] = current_trace()
+    try:
+        yield
+    finally:
+        with _crew_lock:
+            _crew_traces.pop(id(crew), None)
+
+
+def _on_task_started(source, event):
+    if not METRICS_ENABLED:
+        return
+    crew = getattr(getattr(event.task, "agent", None), "crew", None)
+    with _crew_lock:
+        _thread.trace = _crew_traces.get(id(crew))
+    _thread.task = {"name": event.task.name, "start": time.perf_counter(), "llm_calls": 0}
+
+
+def _on_task_finished(source, event, failed=False):
+    task = getattr(_thread, "task", None)
+    if task is None or task["name"] != event.task.name:
+        return
+    seconds = time.perf_counter() - task["start"]
+    registry.observe("briefing_task_seconds", seconds, task=task["name"])
+    if task["llm_calls"] > 1:
+        registry.inc("llm_retries_total", task["llm_calls"] - 1, task=task["name"])
+    if failed:
+        registry.inc("briefing_errors_total", stage=f"task:{task['name']}")
+    _record({"stage": "task", "task": task["name"], "seconds": round(seconds, 4), "llm_calls": task["llm_calls"]})
+    _thread.task = None
+    _thread.trace = None
+
+
+_watching_tasks = False
+
+
+def watch_crew_tasks():
+    """Record crew task durations and retries from CrewAI's events (once per process)"""
+    global _watching_tasks
+    if not METRICS_ENABLED:
+        return
+    with _crew_lock:
+        if _watching_tasks:
+            return
+        _watching_tasks = True
+    from crewai.utilities.events import crewai_event_bus
+    from crewai.utilities.events.task_events import TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent
+    crewai_event_bus.register_handler(TaskStartedEvent, _on_task_started)
+    crewai_event_bus.register_handler(TaskCompletedEvent, _on_task_finished)
+    crewai_event_bus.register_handler(TaskFailedEvent, lambda source, event: _on_task_finished(source, event, True))
@@ -0,0 +1,452 @@
+"""
+Push notifications from Gmail and Calendar: mark briefings stale, optionally pre-warm them.
+
+Instead of waiting for a user to ask (or for BRIEFING_MAX_AGE to pass), the
+app subscribes to each signed-in user's changes:
+
+    Calendar   events.watch on the primary calendar; Google POSTs a channel
+               notification (X-Goog-* headers, no body) to /webhooks/calendar
+    Gmail      users.watch on the INBOX, published to the Cloud Pub/Sub topic
+               GMAIL_PUSH_TOPIC; a push subscription on that topic delivers
+               {"message": {"data": base64({"emailAddress", "historyId"})}}
+               to /webhooks/gmail?token=PUSH_WEBHOOK_TOKEN
+
+The topic, its push subscription and the publish grant for
+gmail-api-push@system.gserviceaccount.com are set up once in Google Cloud;
+without GMAIL_PUSH_TOPIC only the calendar is watched. Calendar channels carry
+a random per-channel token that the webhook checks; Gmail notifications carry
+the shared PUSH_WEBHOOK_TOKEN in the push endpoint's query string.
+
+A notification records that the user's data changed. /briefing then treats a
+stored briefing whose data was read before the change (its generated_at is
+when ingestion started) as stale, so the next visit gets a
+new one (section reuse in utils/briefing_history.py keeps that to the changed
+source). With PUSH_PREWARM_ENABLED the briefing is also regenerated in the
+background: every notification pushes the user's pre-warm back to
+PUSH_DEBOUNCE_SECONDS after it, so a burst of mail costs one briefing, but
+never later than PUSH_DEBOUNCE_MAX_SECONDS after the first change.
+
+Channels expire (PUSH_CHANNEL_TTL for calendar, 7 days for Gmail) and are
+renewed PUSH_RENEW_MARGIN before. Subscriptions, changes and pending
+pre-warms live in a SQLite file shared by all gunicorn workers; every worker
+runs a PushManager thread and renewals and pre-warms are claimed atomically.
+"""
+import os
+import json
+import time
+import uuid
+import base64
+import random
+import secrets
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+from utils.google_services import pooled_service
+from utils.log_stream import log_context
+
+logger = logging.getLogger(__name__)
+
+PUSH_NOTIFICATIONS_ENABLED = os.getenv("PUSH_NOTIFICATIONS_ENABLED", "false").lower() == "true"
+PUSH_DB_PATH = os.getenv("PUSH_DB_PATH", "/tmp/briefing_push.db")
+# Public https base URL Google posts calendar notifications to (e.g. https://briefing.example.com)
+PUSH_WEBHOOK_URL = os.getenv("PUSH_WEBHOOK_URL", "")
+PUSH_WEBHOOK_TOKEN = os.getenv("PUSH_WEBHOOK_TOKEN", "")
+GMAIL_PUSH_TOPIC = os.getenv("GMAIL_PUSH_TOPIC", "")
+PUSH_CHANNEL_TTL = int(os.getenv("PUSH_CHANNEL_TTL", str(7 * 86400)))
+PUSH_RENEW_MARGIN = float(os.getenv("PUSH_RENEW_MARGIN", "86400"))
+PUSH_POLL_SECONDS = float(os.getenv("PUSH_POLL_SECONDS", "5"))
+PUSH_PREWARM_ENABLED = os.getenv("PUSH_PREWARM_ENABLED", "false").lower() == "true"
+PUSH_DEBOUNCE_SECONDS = float(os.getenv("PUSH_DEBOUNCE_SECONDS", "60"))
+PUSH_DEBOUNCE_MAX_SECONDS = float(os.getenv("PUSH_DEBOUNCE_MAX_SECONDS", "300"))
+PUSH_WORKERS = int(os.getenv("PUSH_WORKERS", "1"))
+# A claimed renewal that has not finished after this long is retried by another worker
+RENEW_LEASE = 600
+
+SOURCES = ("calendar", "gmail")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    user_key TEXT NOT NULL,
+    source TEXT NOT NULL,
+    channel_id TEXT,
+    resource_id TEXT,
+    token TEXT,
+    email TEXT,
+    history_id INTEGER,
+    expires_at REAL NOT NULL,
+    renew_lease REAL,
+    PRIMARY KEY (user_key, source)
+);
+CREATE INDEX IF NOT EXISTS subscriptions_by_channel ON subscriptions (channel_id);
+CREATE INDEX IF NOT EXISTS subscriptions_by_email ON subscriptions (email);
+CREATE TABLE IF NOT EXISTS changes (
+    user_key TEXT NOT NULL,
+    source TEXT NOT NULL,
+    changed_at REAL NOT NULL,
+    notifications INTEGER NOT NULL,
+    PRIMARY KEY (user_key, source)
+);
+CREATE TABLE IF NOT EXISTS prewarm (
+    user_key TEXT PRIMARY KEY,
+    first_change_at REAL NOT NULL,
+    due_at REAL NOT NULL
+);
+"""
+
+
+class PushStore:
+    """SQLite record of push subscriptions, data changes and pending pre-warms"""
+
+    def __init__(self, path=PUSH_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        try:
+            os.chmod(path, 0o600)  # holds users' email addresses and channel tokens
+        except OSError:
+            pass
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def save_subscription(self, user_key, source, expires_at, channel_id=None, resource_id=None, token=None,
+                          email=None, history_id=None):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO subscriptions (user_key, source, channel_id, resource_id, token, email, "
+                "history_id, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_key, source, channel_id, resource_id, token, email, history_id, expires_at)
+            )
+
+    def subscriptions(self, user_key):
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM subscriptions WHERE user_key = ? ORDER BY source",
+                                (user_key,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_subscriptions(self, user_key):
+        """Forget the user's subscriptions and return them (so their channels can be stopped)"""
+        rows = self.subscriptions(user_key)
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM subscriptions WHERE user_key = ?", (user_key,))
+        return rows
+
+    def channel(self, channel_id):
+        """The calendar subscription behind a channel id, or None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM subscriptions WHERE source = 'calendar' AND channel_id = ?",
+                               (channel_id,)).fetchone()
+        return dict(row) if row else None
+
+    def advance_gmail_history(self, email, history_id):
+        """Users watching `email` whose last seen historyId is older than `history_id`.
+
+        Their historyId is moved forward in the same transaction, so a
+        notification Pub/Sub redelivers (or delivers late) marks nobody twice.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [row["user_key"] for row in conn.execute(
+                "SELECT user_key FROM subscriptions WHERE source = 'gmail' AND email = ? "
+                "AND (history_id IS NULL OR history_id < ?)", (email, history_id)
+            )]
+            conn.execute("UPDATE subscriptions SET history_id = ? WHERE source = 'gmail' AND email = ? "
+                         "AND (history_id IS NULL OR history_id < ?)", (history_id, email, history_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return keys
+
+    def mark_changed(self, user_key, source, prewarm=False, debounce=PUSH_DEBOUNCE_SECONDS,
+                     debounce_max=PUSH_DEBOUNCE_MAX_SECONDS, now=None):
+        """Record a change to the user's `source` and (re)schedule its pre-warm"""
+        now = now or time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO changes (user_key, source, changed_at, notifications) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(user_key, source) DO UPDATE SET changed_at = excluded.changed_at, "
+                "notifications = notifications + 1", (user_key, source, now)
+            )
+            if prewarm:
+                conn.execute(
+                    "INSERT INTO prewarm (user_key, first_change_at, due_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_key) DO UPDATE SET due_at = MIN(excluded.due_at, first_change_at + ?)",
+                    (user_key, now, now + debounce, debounce_max)
+                )
+
+    def changed_since(self, user_key, since):
+        """Sources of the user's data that changed after `since` (epoch seconds)"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT source FROM changes WHERE user_key = ? AND changed_at > ? ORDER BY source",
+                                (user_key, since)).fetchall()
+        return [row["source"] for row in rows]
+
+    def claim_prewarms(self, limit=1, now=None):
+        """Atomically take the users whose debounced pre-warm is due"""
+        now = now or time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            keys = [row["user_key"] for row in conn.execute(
+                "SELECT user_key FROM prewarm WHERE due_at <= ? ORDER BY due_at LIMIT ?", (now, limit)
+            )]
+            conn.executemany("DELETE FROM prewarm WHERE user_key = ?", [(key,) for key in keys])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return keys
+
+    def claim_expiring(self, margin=PUSH_RENEW_MARGIN, now=None):
+        """Atomically lease the subscriptions that expire within `margin` seconds"""
+        now = now or time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [dict(row) for row in conn.execute(
+                "SELECT * FROM subscriptions WHERE expires_at < ? AND (renew_lease IS NULL OR renew_lease < ?)",
+                (now + margin, now)
+            )]
+            conn.executemany("UPDATE subscriptions SET renew_lease = ? WHERE user_key = ? AND source = ?",
+                             [(now + RENEW_LEASE, row["user_key"], row["source"]) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return rows
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            subscriptions = dict(conn.execute("SELECT source, COUNT(*) FROM subscriptions GROUP BY source").fetchall())
+            notifications = dict(conn.execute("SELECT source, SUM(notifications) FROM changes GROUP BY source").fetchall())
+            pending = conn.execute("SELECT COUNT(*) FROM prewarm").fetchone()[0]
+        return {"subscriptions": subscriptions, "notifications": notifications, "pending_prewarms": pending}
+
+
+def _expiration(response):
+    """Epoch seconds from a watch response's "expiration" (milliseconds, as a string)"""
+    return int(response["expiration"]) / 1000
+
+
+def watch_calendar(creds, address, ttl=PUSH_CHANNEL_TTL):
+    """Open a notification channel on the primary calendar; returns the subscription fields"""
+    channel_id, token = uuid.uuid4().hex, secrets.token_urlsafe(24)
+    with pooled_service("calendar", "v3", creds) as service:
+        response = service.events().watch(calendarId="primary", body={
+            "id": channel_id, "type": "web_hook", "address": address, "token": token,
+            "params": {"ttl": str(ttl)},
+        }).execute()
+    return {"channel_id": channel_id, "resource_id": response["resourceId"], "token": token,
+            "expires_at": _expiration(response)}
+
+
+def stop_calendar(creds, channel_id, resource_id):
+    with pooled_service("calendar", "v3", creds) as service:
+        service.channels().stop(body={"id": channel_id, "resourceId": resource_id}).execute()
+
+
+def watch_gmail(creds, topic=GMAIL_PUSH_TOPIC):
+    """Publish the user's INBOX changes to `topic` (renews an existing watch); returns the subscription fields"""
+    with pooled_service("gmail", "v1", creds) as service:
+        email = service.users().getProfile(userId="me").execute()["emailAddress"]
+        response = service.users().watch(userId="me", body={
+            "topicName": topic, "labelIds": ["INBOX"], "labelFilterBehavior": "include",
+        }).execute()
+    return {"email": email.lower(), "history_id": int(response["historyId"]), "expires_at": _expiration(response)}
+
+
+def stop_gmail(creds):
+    with pooled_service("gmail", "v1", creds) as service:
+        service.users().stop(userId="me").execute()
+
+
+def decode_gmail_notification(envelope):
+    """(emailAddress, historyId) from a Pub/Sub push body; ValueError if it is not a Gmail notification"""
+    try:
+        data = json.loads(base64.b64decode(envelope["message"]["data"]))
+        return data["emailAddress"].lower(), int(data["historyId"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Not a Gmail push notification: {e}") from e
+
+
+class PushManager:
+    """Subscribes users, handles notifications and runs renewals and pre-warms.
+
+    `run` is called as run(session_data) and returns the briefing result,
+    which is saved in `briefing_store` (a ScheduleStore) with source "push".
+    `credentials` is the CredentialStore the users' credentials come from.
+    """
+
+    def __init__(self, run, store, briefing_store, credentials, prewarm=PUSH_PREWARM_ENABLED,
+                 poll_seconds=PUSH_POLL_SECONDS, workers=PUSH_WORKERS):
+        self.run = run
+        self.store = store
+        self.briefing_store = briefing_store
+        self.credentials = credentials
+        self.prewarm = prewarm
+        self.poll_seconds = poll_seconds
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="push-prewarm")
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Subscriptions
+
+    def subscribe(self, user_key, creds):
+        """Watch the user's calendar (and INBOX, with GMAIL_PUSH_TOPIC); returns each source's outcome"""
+        if not PUSH_WEBHOOK_URL:
+            raise RuntimeError("PUSH_WEBHOOK_URL is not set, Google has nowhere to send notifications")
+        previous = {row["source"]: row for row in self.store.subscriptions(user_key)}
+        outcome = {}
+        for source in SOURCES:
+            if source == "gmail" and not GMAIL_PUSH_TOPIC:
+                continue
+            try:
+                outcome[source] = self._watch(user_key, source, creds, previous.get(source))
+            except Exception as e:
+                logger.warning(f"Could not watch {source} for {user_key}: {e}")
+                outcome[source] = {"error": str(e)}
+        return outcome
+
+    def _watch(self, user_key, source, creds, previous=None):
+        if source == "calendar":
+            fields = watch_calendar(creds, f"{PUSH_WEBHOOK_URL.rstrip('/')}/webhooks/calendar")
+        else:
+            fields = watch_gmail(creds, GMAIL_PUSH_TOPIC)
+        self.store.save_subscription(user_key, source, **fields)
+        if source == "calendar" and previous and previous["channel_id"]:
+            # The new channel is open before the old one stops, so no change falls in between
+            try:
+                stop_calendar(creds, previous["channel_id"], previous["resource_id"])
+            except Exception as e:
+                logger.info(f"Old calendar channel for {user_key} not stopped (it expires anyway): {e}")
+        logger.info(f"Watching {source} for {user_key} until {time.ctime(fields['expires_at'])}")
+        return {"expires_at": fields["expires_at"]}
+
+    def unsubscribe(self, user_key, creds):
+        """Stop the user's channels; False if there were none"""
+        rows = self.store.delete_subscriptions(user_key)
+        for row in rows:
+            try:
+                if row["source"] == "calendar":
+                    stop_calendar(creds, row["channel_id"], row["resource_id"])
+                else:
+                    stop_gmail(creds)
+            except Exception as e:
+                logger.info(f"Stopping the {row['source']} watch for {user_key} failed: {e}")
+        return bool(rows)
+
+    def renew_expiring(self):
+        """Renew every subscription close to expiry; returns the number renewed"""
+        renewed = 0
+        for row in self.store.claim_expiring():
+            creds = self.credentials.get(row["user_key"])
+            if creds is None:
+                # Signed out or refresh refused: let the channel lapse
+                self.store.delete_subscriptions(row["user_key"])
+                continue
+            try:
+                self._watch(row["user_key"], row["source"], creds, row)
+                renewed += 1
+            except Exception as e:
+                logger.warning(f"Renewing the {row['source']} watch for {row['user_key']} failed, retrying later: {e}")
+        return renewed
+
+    # Notifications
+
+    def _changed(self, user_key, source):
+        self.store.mark_changed(user_key, source, prewarm=self.prewarm)
+        metrics.count("push_notifications_total", source=source, result="changed")
+
+    def handle_gmail(self, envelope):
+        """Mark every user watching the notified mailbox as changed; returns how many were"""
+        email, history_id = decode_gmail_notification(envelope)
+        user_keys = self.store.advance_gmail_history(email, history_id)
+        for user_key in user_keys:
+            self._changed(user_key, "gmail")
+        if not user_keys:
+            metrics.count("push_notifications_total", source="gmail", result="ignored")
+        return len(user_keys)
+
+    def handle_calendar(self, channel_id, token, state):
+        """Handle a channel notification; returns its result (see push_notifications_total)"""
+        channel = self.store.channel(channel_id)
+        if channel is None:
+            result = "ignored"  # an old channel still running out its TTL
+        elif not secrets.compare_digest(channel["token"] or "", token or ""):
+            result = "rejected"
+        elif state == "sync":
+            result = "sync"  # sent once when the channel opens
+        else:
+            self._changed(channel["user_key"], "calendar")
+            return "changed"
+        metrics.count("push_notifications_total", source="calendar", result=result)
+        return result
+
+    # Background renewals and pre-warms
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="push-manager", daemon=True)
+            self._thread.start()
+            logger.info(f"Push notification manager started (every {self.poll_seconds:g}s, "
+                        f"pre-warm {'on' if self.prewarm else 'off'})")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        # Spread workers' ticks so they do not all hit the database at once
+        self._stop.wait(random.uniform(0, self.poll_seconds))
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Push manager tick failed: {e}", exc_info=True)
+            self._stop.wait(self.poll_seconds)
+
+    def tick(self):
+        """Renew expiring channels, then start the due pre-warms this process has room for"""
+        renewed = self.renew_expiring()
+        if renewed:
+            logger.info(f"Renewed {renewed} push subscriptions ahead of expiry")
+        with self._running_lock:
+            free = self.workers - self._running
+        if free <= 0:
+            return 0
+        claimed = self.store.claim_prewarms(limit=free)
+        for user_key in claimed:
+            with self._running_lock:
+                self._running += 1
+            self._executor.submit(self._prewarm, user_key)
+        return len(claimed)
+
+    def _prewarm(self, user_key):
+        try:
+            with log_context(f"push-{user_key}"):
+                logger.info(f"Pre-warming the briefing of {user_key} after a change")
+                result = self.run({"user_key": user_key})
+            self.briefing_store.save_briefing(user_key, result, "push", result["ingestion"].get("started_at"))
+            logger.info(f"Pre-warmed briefing for {user_key} ready in {result.get('processing_time')}")
+        except Exception as e:
+            logger.error(f"Pre-warming the briefing of {user_key} failed: {e}")
+        finally:
+            with self._running_lock:
+                self._running -= 1
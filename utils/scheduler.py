@@ -0,0 +1,331 @@
+"""
+Scheduled pre-generation of briefings.
+
+Users can save a cron-like schedule ("30 7 * * 1-5" = 07:30 on weekdays) in
+their own time zone. The scheduler pre-generates their briefing shortly
+before each scheduled time using their credentials from the server-side
+credential store (kept fresh by its token refresher), and stores the result so
+/briefing can answer immediately with the precomputed briefing and its age.
+
+To avoid spiking the OpenRouter quota when many users pick the same time:
+    - each run starts at a random point of a window before the scheduled
+      time (SCHEDULER_LEAD_MINUTES early, spread over SCHEDULER_JITTER_SECONDS)
+    - runs are admitted by a token bucket shared by all workers
+      (SCHEDULER_RATE_PER_MINUTE, bursts of SCHEDULER_BURST)
+    - a run that is rate limited waits for the next tick; it is not dropped
+
+Schedules, the rate bucket and the latest briefing per user live in a SQLite
+file shared by all gunicorn workers. Every worker runs a scheduler thread;
+a due schedule is claimed atomically, so each run happens exactly once.
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.log_stream import log_context
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_DB_PATH = os.getenv("SCHEDULE_DB_PATH", "/tmp/briefing_schedules.db")
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+SCHEDULER_LEAD_MINUTES = int(os.getenv("SCHEDULER_LEAD_MINUTES", "15"))
+SCHEDULER_JITTER_SECONDS = float(os.getenv("SCHEDULER_JITTER_SECONDS", "600"))
+SCHEDULER_RATE_PER_MINUTE = float(os.getenv("SCHEDULER_RATE_PER_MINUTE", "6"))
+SCHEDULER_BURST = float(os.getenv("SCHEDULER_BURST", "3"))
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "1"))
+# Precomputed briefings older than this are regenerated instead of served
+BRIEFING_MAX_AGE = float(os.getenv("BRIEFING_MAX_AGE", str(3 * 3600)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    user_key TEXT PRIMARY KEY,
+    cron TEXT NOT NULL,
+    timezone TEXT NOT NULL,
+    next_run REAL NOT NULL,
+    last_run REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS schedules_by_next_run ON schedules (next_run);
+CREATE TABLE IF NOT EXISTS briefings (
+    user_key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    generated_at REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_bucket (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def session_user_key(session_data):
+    """Key of the signed-in user's schedule and stored briefing, or None when signed out"""
+    return session_data.get("user_key")
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week).
+
+    Fields accept *, numbers, ranges (1-5), lists (1,3,5) and steps (*/15).
+    Day of week runs 0-6 from Sunday (7 is also Sunday). As in cron, when both
+    day fields are restricted a day matches if either does.
+    """
+
+    FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(parts)}: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = [
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        ]
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+            if not (low <= start <= end <= high):
+                raise ValueError(f"Cron field {item!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, day):
+        in_month = day.day in self.days
+        in_week = (day.isoweekday() % 7) in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """First matching minute strictly after `moment` (an aware datetime)"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 5):
+            if candidate.month in self.months and self._day_matches(candidate):
+                for hour in sorted(h for h in self.hours if h >= candidate.hour):
+                    first_minute = candidate.minute if hour == candidate.hour else 0
+                    minutes = sorted(m for m in self.minutes if m >= first_minute)
+                    if minutes:
+                        return candidate.replace(hour=hour, minute=minutes[0])
+            candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+
+def next_run_time(cron, timezone, after=None, jitter=SCHEDULER_JITTER_SECONDS):
+    """Epoch seconds at which to start pre-generating for the next scheduled time"""
+    tz = ZoneInfo(timezone)
+    after = datetime.fromtimestamp(after or time.time(), tz)
+    lead = timedelta(minutes=SCHEDULER_LEAD_MINUTES)
+    # Look from `after + lead` so a run that just happened is not scheduled again
+    target = CronSchedule(cron).next_after(after + lead)
+    return (target - lead).timestamp() + random.uniform(0, jitter)
+
+
+class ScheduleStore:
+    """SQLite tables for schedules, the shared rate bucket and precomputed briefings"""
+
+    def __init__(self, path=SCHEDULE_DB_PATH, jitter=SCHEDULER_JITTER_SECONDS):
+        self.path = path
+        self.jitter = jitter
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        try:
+            os.chmod(path, 0o600)  # holds users' briefings
+        except OSError:
+            pass
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def save_schedule(self, user_key, cron, timezone):
+        CronSchedule(cron)  # validate before storing
+        ZoneInfo(timezone)
+        # Include a scheduled time that is already inside the lead window
+        after = time.time() - SCHEDULER_LEAD_MINUTES * 60
+        next_run = next_run_time(cron, timezone, after=after, jitter=self.jitter)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO schedules (user_key, cron, timezone, next_run) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_key) DO UPDATE SET cron = excluded.cron, timezone = excluded.timezone, "
+                "next_run = excluded.next_run, last_error = NULL",
+                (user_key, cron, timezone, next_run)
+            )
+        return self.get_schedule(user_key)
+
+    def get_schedule(self, user_key):
+        """The user's schedule as a dict, or None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT cron, timezone, next_run, last_run, last_error FROM schedules WHERE user_key = ?",
+                (user_key,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def delete_schedule(self, user_key):
+        with closing(self._connect()) as conn:
+            return conn.execute("DELETE FROM schedules WHERE user_key = ?", (user_key,)).rowcount > 0
+
+    def claim_due(self, now=None, limit=10, rate_per_minute=SCHEDULER_RATE_PER_MINUTE, burst=SCHEDULER_BURST):
+        """Atomically take due schedules the rate bucket allows and move them to their next run.
+
+        Returns the claimed user keys. Schedules left over because the
+        bucket ran dry stay due and are picked up on a later tick.
+        """
+        now = now or time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            bucket = conn.execute("SELECT tokens, updated_at FROM rate_bucket WHERE id = 1").fetchone()
+            tokens = burst if bucket is None else min(
+                burst, bucket["tokens"] + (now - bucket["updated_at"]) * rate_per_minute / 60
+            )
+            due = conn.execute(
+                "SELECT user_key, cron, timezone FROM schedules WHERE next_run <= ? "
+                "ORDER BY next_run LIMIT ?", (now, limit)
+            ).fetchall()
+            claimed = []
+            for row in due:
+                if tokens < 1:
+                    break
+                tokens -= 1
+                conn.execute(
+                    "UPDATE schedules SET next_run = ?, last_run = ? WHERE user_key = ?",
+                    (next_run_time(row["cron"], row["timezone"], after=now, jitter=self.jitter), now, row["user_key"])
+                )
+                claimed.append(row["user_key"])
+            conn.execute(
+                "INSERT INTO rate_bucket (id, tokens, updated_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if len(due) > len(claimed):
+            logger.info(f"Scheduler rate limit: {len(due) - len(claimed)} due briefings deferred")
+        return claimed
+
+    def record_error(self, user_key, error):
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE schedules SET last_error = ? WHERE user_key = ?", (error, user_key))
+
+    def save_briefing(self, user_key, result, source, generated_at=None):
+        """Keep `result` as the user's briefing, dated by when ingestion started (default: now).
+
+        Changes that arrive while the briefing is being written are newer than
+        generated_at, so they still mark it stale (see app.stored_briefing).
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO briefings (user_key, result, generated_at, source) VALUES (?, ?, ?, ?)",
+                (user_key, json.dumps(result), generated_at or time.time(), source)
+            )
+
+    def latest_briefing(self, user_key, max_age=BRIEFING_MAX_AGE):
+        """The stored briefing with age information, or None if missing or too old"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT result, generated_at, source FROM briefings WHERE user_key = ?", (user_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row["generated_at"]
+        if age > max_age:
+            return None
+        result = json.loads(row["result"])
+        result.update(precomputed=row["source"] != "on_demand", generated_at=row["generated_at"],
+                      age_seconds=round(age))
+        return result
+
+
+class BriefingScheduler:
+    """Background thread that claims due schedules and pre-generates their briefings.
+
+    `run` is called as run(session_data) and returns the briefing result; it
+    runs on a small executor so slow generations do not delay the next tick.
+    """
+
+    def __init__(self, run, store, poll_seconds=SCHEDULER_POLL_SECONDS, workers=SCHEDULER_WORKERS):
+        self.run = run
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="briefing-scheduler")
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="briefing-scheduler", daemon=True)
+            self._thread.start()
+            logger.info(f"Briefing scheduler started (every {self.poll_seconds:g}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        # Spread workers' ticks so they do not all hit the database at once
+        self._stop.wait(random.uniform(0, self.poll_seconds))
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Scheduler tick failed: {e}", exc_info=True)
+            self._stop.wait(self.poll_seconds)
+
+    def tick(self):
+        """Claim what this process has room for and start it"""
+        with self._running_lock:
+            free = self.workers - self._running
+        if free <= 0:
+            return 0
+        claimed = self.store.claim_due(limit=free)
+        for user_key in claimed:
+            with self._running_lock:
+                self._running += 1
+            self._executor.submit(self._pregenerate, user_key)
+        return len(claimed)
+
+    def _pregenerate(self, user_key):
+        try:
+            with log_context(f"scheduled-{user_key}"):
+                logger.info(f"Pre-generating scheduled briefing for {user_key}")
+                result = self.run({"user_key": user_key})
+            self.store.save_briefing(user_key, result, "scheduled", result["ingestion"].get("started_at"))
+            logger.info(f"Scheduled briefing for {user_key} ready in {result.get('processing_time')}")
+        except Exception as e:
+            logger.error(f"Scheduled briefing for {user_key} failed: {e}")
+            self.store.record_error(user_key, str(e))
+        finally:
+            with self._running_lock:
+                self._running -= 1
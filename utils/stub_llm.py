@@ -0,0 +1,213 @@
+"""
+Offline stand-in for the OpenRouter LLM.
+
+StubLLM is a drop-in crewai LLM that never touches the network. It answers in
+the "Final Answer:" format CrewAI agents expect, with a deterministic reply
+derived from the prompt, so whole crews can be run, timed and compared
+without an API key. With stream=True the answer is also emitted word by word
+as LLMStreamChunkEvents, like a real streaming completion.
+
+StubCompletionServer is the same idea one level down: an OpenAI-compatible
+chat completions endpoint on localhost that the real OpenRouter client can be
+pointed at with OPENROUTER_BASE_URL, with a scripted time to first token and
+token throughput.
+"""
+import re
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crewai import LLM
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+
+ROLE_PATTERN = re.compile(r"You are (.+?)\.")
+
+
+def default_reply(messages):
+    """Deterministic answer naming the agent and fingerprinting its prompt"""
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    prompt = "\n".join(m.get("content", "") for m in messages)
+    role = ROLE_PATTERN.search(system)
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"[{role.group(1) if role else 'assistant'}] stub answer {digest}"
+
+
+class StubLLM(LLM):
+    """Scripted LLM: sleeps `latency` seconds, then returns reply(messages).
+
+    `reply` receives the message list and returns the answer text. Calls are
+    recorded in `calls` (thread-safe) so tests and benchmarks can count them.
+    When streaming, `latency` is the time to the first chunk and each further
+    chunk takes `chunk_latency` seconds.
+    """
+
+    def __init__(self, model="stub/briefing", latency=0.0, reply=default_reply, chunk_latency=0.0, **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.reply = reply
+        self.calls = []
+        self._calls_lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        snapshot = [dict(m) for m in messages]
+        with self._calls_lock:
+            self.calls.append(snapshot)
+        if self.latency:
+            time.sleep(self.latency)
+        answer = f"Thought: I now can give a great answer\nFinal Answer: {self.reply(snapshot)}"
+        if self.stream:
+            for n, chunk in enumerate(re.findall(r"\S+\s*", answer)):
+                if n and self.chunk_latency:
+                    time.sleep(self.chunk_latency)
+                crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=chunk))
+        return answer
+
+    def supports_function_calling(self):
+        return False
+
+    @property
+    def call_count(self):
+        with self._calls_lock:
+            return len(self.calls)
+
+
+class StubCompletionServer:
+    """OpenAI-compatible POST .../chat/completions on localhost, streaming or not.
+
+    Every answer is reply(messages) in the "Final Answer:" format, padded with
+    filler words to `completion_tokens` words (one word counts as one token).
+    The first token arrives after `ttft` seconds and the rest at
+    `tokens_per_second`; a non-streaming response waits for all of them.
+    Usage is reported like OpenRouter does, prompt tokens estimated at four
+    characters each. GET requests under /models answer 200 for health probes.
+
+    `ttft` may also be a function of the requested model name, to script a
+    slow tail or a slow model, and `fail(model)` returning True answers that
+    request with HTTP 500 instead. Calls per model are kept in `model_calls`.
+    """
+
+    FILLER = "(more briefing text)"
+
+    def __init__(self, ttft=0.5, tokens_per_second=50.0, completion_tokens=120, reply=default_reply,
+                 fail=None, host="127.0.0.1", port=0):
+        self.ttft = ttft
+        self.fail = fail
+        self.model_calls = {}
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.reply = reply
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def answer_words(self, messages):
+        words = f"Thought: I now can give a great answer\nFinal Answer: {self.reply(messages)}".split(" ")
+        filler = self.FILLER.split(" ")
+        while len(words) < self.completion_tokens:
+            words.extend(filler)
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if "/models" in self.path:
+                    self._send_json(200, {"data": {"id": "stub", "endpoints": [{"status": 0}]}})
+                else:
+                    self._send_json(404, {"error": {"message": f"Not found: {self.path}"}})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Not found: {self.path}"}})
+                    return
+                model = request.get("model", "stub")
+                with server._calls_lock:
+                    server.calls += 1
+                    server.model_calls[model] = server.model_calls.get(model, 0) + 1
+                ttft = server.ttft(model) if callable(server.ttft) else server.ttft
+                if server.fail and server.fail(model):
+                    time.sleep(ttft)
+                    self._send_json(500, {"error": {"message": f"Stub failure for {model}", "code": 500}})
+                    return
+                messages = request.get("messages", [])
+                words = server.answer_words(messages)
+                prompt = "\n".join(str(m.get("content") or "") for m in messages)
+                usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(words),
+                         "total_tokens": len(prompt) // 4 + len(words)}
+                completion = {"id": f"stub-{time.time_ns()}", "created": int(time.time()),
+                              "model": model}
+                time.sleep(ttft)
+                if request.get("stream"):
+                    self._stream(completion, words, usage)
+                    return
+                time.sleep((len(words) - 1) / server.tokens_per_second)
+                self._send_json(200, {**completion, "object": "chat.completion", "usage": usage, "choices": [
+                    {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(words)}}
+                ]})
+
+            def _stream(self, completion, words, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                chunk = {**completion, "object": "chat.completion.chunk"}
+                for n, word in enumerate(words):
+                    if n:
+                        time.sleep(1 / server.tokens_per_second)
+                    delta = {"role": "assistant", "content": word} if n == 0 else {"content": word}
+                    self._event({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                self._event({**chunk, "usage": usage, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+            def _event(self, payload):
+                self._chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+            def _chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def _send_json(self, status, payload):
+                content = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-completions", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,170 @@
+"""
+Background health monitor for the LLM provider (OpenRouter), with a circuit breaker.
+
+Instead of sending a chat completion for every /api-status hit, each worker
+probes the provider every UPSTREAM_PROBE_INTERVAL seconds with a GET that
+costs no tokens (by default the configured model's endpoint listing) over a
+keep-alive session, and keeps the last UPSTREAM_WINDOW results. /api-status
+reads that state without any network call.
+
+After UPSTREAM_BREAKER_FAILURES failed probes in a row the breaker opens:
+briefings that need the LLM fail with UpstreamUnavailableError (HTTP 503)
+just before the engine would run, instead of waiting out LLM timeouts, and
+the provider is probed every UPSTREAM_RETRY_SECONDS. Templated and reused
+briefings (see pipeline.write_briefing) are still served. The first
+successful probe closes it again.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Same endpoint as utils/llm_client.py, read here so the monitor does not import litellm
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+UPSTREAM_MONITOR_ENABLED = os.getenv("UPSTREAM_MONITOR_ENABLED", "true").lower() == "true"
+UPSTREAM_PROBE_PATH = os.getenv("UPSTREAM_PROBE_PATH", "/models/{model}/endpoints")
+UPSTREAM_PROBE_INTERVAL = float(os.getenv("UPSTREAM_PROBE_INTERVAL", "30"))
+UPSTREAM_PROBE_TIMEOUT = float(os.getenv("UPSTREAM_PROBE_TIMEOUT", "5"))
+UPSTREAM_RETRY_SECONDS = float(os.getenv("UPSTREAM_RETRY_SECONDS", "10"))
+UPSTREAM_WINDOW = int(os.getenv("UPSTREAM_WINDOW", "20"))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "3"))
+
+
+class UpstreamUnavailableError(Exception):
+    """The circuit breaker is open; `retry_after` is the number of seconds until the next probe"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _percentile(ordered, fraction):
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+class UpstreamMonitor:
+    """Probes the provider on a background thread and keeps rolling stats and the breaker state"""
+
+    def __init__(self, base_url=OPENROUTER_BASE_URL, probe_path=UPSTREAM_PROBE_PATH,
+                 interval=UPSTREAM_PROBE_INTERVAL, retry_seconds=UPSTREAM_RETRY_SECONDS,
+                 window=UPSTREAM_WINDOW, breaker_failures=UPSTREAM_BREAKER_FAILURES):
+        self.model = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
+        self.url = base_url.rstrip("/") + probe_path.format(model=self.model)
+        self.interval = interval
+        self.retry_seconds = retry_seconds
+        self.breaker_failures = breaker_failures
+        self._probes = deque(maxlen=window)  # (finished_at, ok, seconds, error)
+        self._consecutive_failures = 0
+        self._next_probe_at = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="upstream-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop = True
+        self._wake.set()
+
+    @property
+    def breaker_open(self):
+        with self._lock:
+            return self._consecutive_failures >= self.breaker_failures
+
+    def _loop(self):
+        while not self._stop:
+            self.probe()
+            delay = self.retry_seconds if self.breaker_open else self.interval
+            with self._lock:
+                self._next_probe_at = time.time() + delay
+            self._wake.wait(delay)
+
+    def probe(self):
+        """One probe; returns True when the provider answered 200"""
+        api_key = os.getenv("OPENAI_API_KEY")  # OpenRouter key stored as OPENAI_API_KEY
+        start = time.perf_counter()
+        error = None
+        try:
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY is required (contains OpenRouter key)")
+            response = self._session.get(self.url, headers={"Authorization": f"Bearer {api_key}"},
+                                         timeout=UPSTREAM_PROBE_TIMEOUT)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+        except Exception as e:
+            error = str(e)
+        self.record(error is None, time.perf_counter() - start, error)
+        return error is None
+
+    def record(self, ok, seconds, error=None):
+        with self._lock:
+            was_open = self._consecutive_failures >= self.breaker_failures
+            self._probes.append((time.time(), ok, seconds, error))
+            self._consecutive_failures = 0 if ok else self._consecutive_failures + 1
+            is_open = self._consecutive_failures >= self.breaker_failures
+        if is_open and not was_open:
+            logger.error(f"LLM provider unreachable after {self._consecutive_failures} probes, "
+                         f"failing briefings fast: {error}")
+        elif was_open and not is_open:
+            logger.info("LLM provider reachable again, accepting briefings")
+        elif not ok and not is_open:
+            logger.warning(f"LLM provider probe failed: {error}")
+
+    def check(self):
+        """Raise UpstreamUnavailableError while the breaker is open"""
+        with self._lock:
+            if self._consecutive_failures < self.breaker_failures:
+                return
+            retry_after = max(1, int((self._next_probe_at or time.time()) - time.time()) + 1)
+            error = self._probes[-1][3] if self._probes else None
+        raise UpstreamUnavailableError(f"The AI provider is unavailable ({error})", retry_after)
+
+    def status(self):
+        """Cached health summary for /api-status"""
+        with self._lock:
+            probes = list(self._probes)
+            consecutive_failures = self._consecutive_failures
+        body = {"api": "openrouter", "model": self.model, "probes": len(probes),
+                "breaker": "open" if consecutive_failures >= self.breaker_failures else "closed",
+                "timestamp": datetime.now().isoformat()}
+        if not probes:
+            return {**body, "status": "checking" if self._thread else "unknown"}
+
+        finished_at, ok, seconds, error = probes[-1]
+        latencies = sorted(p[2] for p in probes if p[1])
+        failures = sum(1 for p in probes if not p[1])
+        if consecutive_failures >= self.breaker_failures:
+            status = "down"
+        elif not ok or failures:
+            status = "degraded"
+        else:
+            status = "healthy"
+        body.update({
+            "status": status,
+            "response_time": f"{seconds:.2f}s",
+            "latency_p50": round(_percentile(latencies, 0.5), 3) if latencies else None,
+            "latency_p95": round(_percentile(latencies, 0.95), 3) if latencies else None,
+            "error_rate": round(failures / len(probes), 3),
+            "consecutive_failures": consecutive_failures,
+            "last_checked": datetime.fromtimestamp(finished_at).isoformat(),
+        })
+        if error:
+            body["error"] = error
+        return body
+
+
+upstream_monitor = UpstreamMonitor()